@@ -1,4 +1,3 @@
 __version__ = "1.2.0"
 
 from .zodiaqParser import set_args_from_command_line_input, check_for_conflicting_args
-import zodiaq.loaders
@@ -2,25 +2,37 @@ from zodiaq.loaders import LibraryLoaderContext, QueryLoaderContext
 from zodiaq.identification.poolingFunctions import (
     generate_pooled_library_and_query_spectra_by_mz_windows,
 )
+from zodiaq.identification.precursorMzIndex import PrecursorMzIndex
+from zodiaq.identification.parallelMatchingFunctions import (
+    generate_library_to_query_matches_by_mz_windows_in_parallel,
+)
+from zodiaq.identification.matchSpill import MatchSpill
 from zodiaq.identification.matchingFunctions import (
     match_library_to_query_pooled_spectra,
     eliminate_low_count_matches,
     filter_matches_by_ppm_offset_and_tolerance,
     calculate_ppm_offset_tolerance,
+    calculate_ppm_offset_tolerance_from_standardized_histogram,
     create_ppm_histogram,
+    plot_ppm_histogram,
+)
+from zodiaq.identification.matchScoringFunctions import (
+    score_library_to_query_matches,
+    summarize_library_to_query_matches,
+    score_summarized_library_to_query_matches,
 )
-from zodiaq.scoring import score_library_to_query_matches
 from zodiaq.identification.outputFormattingFunctions import (
-    extract_metadata_from_match_and_score_dataframes,
-    format_output_line,
     format_output_as_pandas_dataframe,
-    identify_all_decoys,
+    create_query_metadata_dataframe,
+    select_rows_covering_output_values,
 )
 
 
 import pandas as pd
 import os
-from zodiaq.utils import Printer
+from zodiaq.utils import Printer, write_table_file_in_chunks
+
+outputChunkSize = 100000
 
 
 class Identifier:
@@ -39,13 +51,12 @@ class Identifier:
     ----------
     _args : dictionary
         This dictionary references the arguments inserted by the end user.
-    _libraryDict : dictionary
-        A standardized representation of the library input file for use of the program.
-            It is the output of the LibraryLoaderContext class.
-    _decoySet : set
-        A set containing all the keys of self._libraryDict that represent a decoy insert.
-            Decoys are used to calculate the probability that a non-decoy match is a
-            false positive.
+    _library : ZodiaqLibrary
+        A standardized, columnar representation of the library input file for use of the
+            program. It is the output of the LibraryLoaderContext class.
+    _precursorIndex : PrecursorMzIndex
+        An index of library precursor m/z values, built once for finding the library spectra
+            within each m/z window of the query files.
     """
 
     def __init__(self, commandLineArgs, isTesting=False):
@@ -53,30 +64,104 @@ class Identifier:
         if not isTesting:
             printer = Printer()
             printer("Loading Library File")
-        self._libraryDict = LibraryLoaderContext(
-            self._commandLineArgs["library"]
-        ).load_zodiaq_library_dict()
+        self._library = LibraryLoaderContext(
+            self._commandLineArgs["library"],
+            isCached=self._commandLineArgs.get("libraryCache", False),
+            cacheDirectory=self._commandLineArgs.get("cacheDirectory"),
+        ).load_zodiaq_library(numWorkers=self._commandLineArgs.get("workers", 1))
+        self._precursorIndex = PrecursorMzIndex(self._library.precursorMz)
 
     def identify_library_spectra_in_query_file(self, queryFile):
         """
         The primary function called for matching library spectra to query spectra.
-            This is the only public-facing function of the class.
+            Returns the identifications as a dataframe, or a message if none were found.
+        """
+        identifications = self._identify_library_to_query_spectrum_matches(queryFile)
+        if isinstance(identifications, str):
+            return identifications
+        scoreDf, queryDict = identifications
+        printer = Printer()
+        printer("Formatting spectral matches for output")
+        return self._format_identifications_as_dataframe(scoreDf, queryDict)
+
+    def write_identifications_of_query_file(
+        self, queryFile, outFileHeader, outputFormat="csv"
+    ):
+        """
+        Equivalent of writing the output of self.identify_library_spectra_in_query_file() with
+            write_table_file, where identifications are formatted and written a chunk at a time
+            rather than as a single dataframe. Returns a message if no identifications were
+            found.
+        """
+        identifications = self._identify_library_to_query_spectrum_matches(queryFile)
+        if isinstance(identifications, str):
+            return identifications
+        scoreDf, queryDict = identifications
+        printer = Printer()
+        printer("Formatting spectral matches for output")
+        queryDf = create_query_metadata_dataframe(queryDict, scoreDf["queryIdx"])
+        schemaDf = None
+        if outputFormat == "parquet":
+            schemaDf = self._format_identifications_as_dataframe(
+                select_rows_covering_output_values(scoreDf), queryDict, queryDf
+            )
+        write_table_file_in_chunks(
+            (
+                self._format_identifications_as_dataframe(
+                    scoreDf.iloc[chunkStart : chunkStart + outputChunkSize],
+                    queryDict,
+                    queryDf,
+                )
+                for chunkStart in range(0, len(scoreDf.index), outputChunkSize)
+            ),
+            outFileHeader,
+            outputFormat,
+            schemaDf,
+        )
+
+    def _identify_library_to_query_spectrum_matches(self, queryFile):
+        """
+        Matches, corrects and scores the library-query spectrum matches of a query file.
+
+        Returns
+        -------
+        scoreDf : pandas DataFrame
+            See output of self._score_spectra_matches().
+
+        queryDict : dict
+            See output of QueryLoaderContext.extract_metadata_from_query_scans().
+
+        A message string is returned instead if no matches are found.
         """
         printer = Printer()
-        self._queryContext = QueryLoaderContext(queryFile)
+        self._queryContext = QueryLoaderContext(
+            queryFile,
+            isCached=self._commandLineArgs.get("queryCache", False),
+            cacheDirectory=self._commandLineArgs.get("cacheDirectory"),
+        )
         printer("Begin matching library spectra to query spectra")
-        matchDf = self._match_library_to_query_spectra()
-        printer(f"Total number of peaks matched (pre-correction): {len(matchDf.index)}")
-        if self._correction_process_is_to_be_applied():
-            matchDf = self._apply_correction_to_match_dataframe(matchDf)
+        if self._commandLineArgs.get("maxMemory"):
+            queryDict = self._queryContext.extract_metadata_from_query_scans()
+            scoreDf = self._match_and_score_spectra_within_memory_budget(queryDict)
+            if scoreDf is None:
+                return "No matches found between library and query spectra."
+            return scoreDf, queryDict
+        if self._streaming_correction_process_is_to_be_applied():
+            matchDf = self._match_library_to_query_spectra_with_streaming_correction()
+        else:
+            matchDf = self._match_library_to_query_spectra()
             printer(
-                f"Total number of peaks matched (post-correction): {len(matchDf.index)}"
+                f"Total number of peaks matched (pre-correction): {len(matchDf.index)}"
             )
+            if self._correction_process_is_to_be_applied():
+                matchDf = self._apply_correction_to_match_dataframe(matchDf)
+                printer(
+                    f"Total number of peaks matched (post-correction): {len(matchDf.index)}"
+                )
         if len(matchDf) == 0:
             return "No matches found between library and query spectra."
-        scoreDf = self._score_spectra_matches(matchDf)
-        printer("Formatting spectral matches for output")
-        return self._format_identifications_as_dataframe(matchDf, scoreDf)
+        queryDict = self._queryContext.extract_metadata_from_query_scans()
+        return self._score_spectra_matches(matchDf, queryDict), queryDict
 
     def _match_library_to_query_spectra(self):
         """
@@ -91,26 +176,42 @@ class Identifier:
                 match, containing library/query identifiers, intensity, and parts-per-million (PPM)
                 relative differences between their m/z values.
         """
-        matchDfs = []
+        return pd.concat(list(self._generate_match_dataframes_by_mz_window()))
+
+    def _generate_match_dataframes_by_mz_window(self):
+        """
+        Yields the match dataframe of each m/z window, in the order the windows appear in the
+            query file. Windows are matched in parallel if more than one worker is requested.
+        """
+        numWorkers = self._commandLineArgs.get("workers", 1)
+        if numWorkers > 1:
+            yield from generate_library_to_query_matches_by_mz_windows_in_parallel(
+                self._library,
+                self._precursorIndex,
+                self._queryContext,
+                self._commandLineArgs["matchTolerance"],
+                numWorkers,
+            )
+            return
         for (
             pooledLibPeaks,
             pooledQueryPeaks,
         ) in generate_pooled_library_and_query_spectra_by_mz_windows(
-            self._libraryDict, self._queryContext
+            self._library, self._queryContext, self._precursorIndex
         ):
             matchDf = match_library_to_query_pooled_spectra(
                 pooledLibPeaks,
                 pooledQueryPeaks,
                 self._commandLineArgs["matchTolerance"],
             )
-            matchDf = eliminate_low_count_matches(matchDf)
-            matchDfs.append(matchDf)
-        return pd.concat(matchDfs)
+            yield eliminate_low_count_matches(matchDf)
 
-    def _score_spectra_matches(self, matchDf):
+    def _score_spectra_matches(self, matchDf, queryDict):
         """
         This function applies a cosine similarity score to each library-query spectrum match.
-            Additional scoring is used to enhance the elimination of false positives.
+            Additional scoring is used to enhance the elimination of false positives. The
+            peak match counts and ion counts reported in the output are calculated in the
+            same pass.
 
         Extended Summary
         ----------------
@@ -124,6 +225,9 @@ class Identifier:
         matchDf : pandas DataFrame
             See output of self._match_library_to_query_spectra().
 
+        queryDict : dict
+            See output of QueryLoaderContext.extract_metadata_from_query_scans().
+
         Returns
         -------
         scoreDf : pandas DataFrame
@@ -131,11 +235,21 @@ class Identifier:
                 spectrum match containing library/query identifiers and scores calculated for
                 that match (including the cosine similarity score).
         """
-        return score_library_to_query_matches(matchDf)
+        queryPrecursorMzs = {
+            int(scan): queryMetadata["precursorMz"]
+            for scan, queryMetadata in queryDict.items()
+        }
+        return score_library_to_query_matches(matchDf, queryPrecursorMzs)
 
     def _correction_process_is_to_be_applied(self):
         return not self._commandLineArgs["noCorrection"]
 
+    def _streaming_correction_process_is_to_be_applied(self):
+        return (
+            self._correction_process_is_to_be_applied()
+            and self._commandLineArgs.get("streamCorrection", False)
+        )
+
     def _apply_correction_to_match_dataframe(self, matchDf):
         """
         An expected ppm tolerance range is defined and applied to the match and score dataframes.
@@ -171,44 +285,163 @@ class Identifier:
             and tolerance < toleranceMinimumCutoff
         ):
             _, tolerance = calculate_ppm_offset_tolerance(matchDf["ppmDifference"], 0.5)
-        queryFile = self._queryContext.filePath.split("/")[-1]
-        outFile = os.path.splitext(queryFile)[0] + "_correctionHistogram.png"
         if self._commandLineArgs["histogram"]:
             create_ppm_histogram(
                 matchDf["ppmDifference"],
                 offset,
                 tolerance,
-                os.path.join(self._commandLineArgs["output"], outFile),
+                self._create_histogram_file_path(),
             )
         matchDf = filter_matches_by_ppm_offset_and_tolerance(matchDf, offset, tolerance)
         return eliminate_low_count_matches(matchDf)
 
-    def _format_identifications_as_dataframe(self, matchDf, scoreDf):
+    def _match_library_to_query_spectra_with_streaming_correction(self):
         """
-        The final match/score identifications are consolidated into a dataframe.
+        Equivalent of self._match_library_to_query_spectra() followed by
+            self._apply_correction_to_match_dataframe(), without holding the uncorrected
+            matches of every m/z window in memory at once.
+
+        Extended Summary
+        ----------------
+        The uncorrected matches of each m/z window are written to a temporary MatchSpill as they
+            are created, which accumulates the mean and variance of their ppm differences. The
+            ppm histogram is then created by streaming the ppm differences back from disk, and
+            each window is re-read and filtered with the calculated offset and tolerance. Peak
+            memory use is bounded by the largest window and the corrected matches, or by the
+            largest workers + 1 windows when windows are matched in parallel (see
+            generate_library_to_query_matches_by_mz_windows_in_parallel). Each query scan
+            belongs to a single m/z window, so filtering windows separately removes the same
+            matches as filtering all of them at once.
+
+        Returns
+        -------
+        matchDf : pandas DataFrame
+            See output of self._apply_correction_to_match_dataframe().
         """
-        queryDict = self._queryContext.extract_metadata_from_query_scans()
-        matchDict = extract_metadata_from_match_and_score_dataframes(
-            matchDf, scoreDf, queryDict
+        printer = Printer()
+        with MatchSpill() as matchSpill:
+            for matchDf in self._generate_match_dataframes_by_mz_window():
+                matchSpill.append(matchDf)
+            printer(
+                f"Total number of peaks matched (pre-correction): {matchSpill.numMatches}"
+            )
+            offset, tolerance = self._calculate_ppm_offset_and_tolerance_of_match_spill(
+                matchSpill
+            )
+            matchDfs = [
+                filter_matches_by_ppm_offset_and_tolerance(matchDf, offset, tolerance)
+                for matchDf in matchSpill.read_partitions()
+            ]
+        matchDf = pd.concat(matchDfs)
+        printer(
+            f"Total number of peaks matched (post-correction): {len(matchDf.index)}"
         )
-        sortedLibKeys = sorted(self._libraryDict.keys())
-        outputs = []
-        for key, matchMetadata in matchDict.items():
-            libKeyIdx, queryScan = key
-            libraryMetadata = self._prepare_library_dictionary_for_output(
-                libKeyIdx, sortedLibKeys
+        return matchDf
+
+    def _calculate_ppm_offset_and_tolerance_of_match_spill(self, matchSpill):
+        """
+        Equivalent of the offset and tolerance calculation of
+            self._apply_correction_to_match_dataframe() for the matches of a MatchSpill,
+            creating the histogram file if requested.
+        """
+        correctionDegree = self._commandLineArgs["correctionDegree"]
+        if not correctionDegree or self._commandLineArgs["histogram"]:
+            binHeights, bins = matchSpill.calculate_ppm_histogram()
+        if correctionDegree:
+            offset = matchSpill.ppmMean
+            tolerance = matchSpill.calculate_ppm_standard_deviation() * correctionDegree
+        else:
+            offset, tolerance = (
+                calculate_ppm_offset_tolerance_from_standardized_histogram(
+                    binHeights, bins
+                )
             )
-            queryMetadata = queryDict[str(queryScan)]
-            queryMetadata["scan"] = queryScan
-            outputLine = format_output_line(
-                libraryMetadata, queryMetadata, matchMetadata
+            toleranceMinimumCutoff = 5
+            if tolerance < toleranceMinimumCutoff:
+                tolerance = matchSpill.calculate_ppm_standard_deviation() * 0.5
+        if self._commandLineArgs["histogram"]:
+            plot_ppm_histogram(
+                binHeights,
+                bins,
+                offset,
+                tolerance,
+                self._create_histogram_file_path(),
             )
-            outputs.append(outputLine)
-        return format_output_as_pandas_dataframe(self._queryContext.filePath, outputs)
-
-    def _prepare_library_dictionary_for_output(self, libKeyIdx, sortedLibKeys):
-        libKey = sortedLibKeys[libKeyIdx]
-        libraryMetadata = self._libraryDict[libKey]
-        libraryMetadata["precursorMz"] = libKey[0]
-        libraryMetadata["peptide"] = libKey[1]
-        return libraryMetadata
+        return offset, tolerance
+
+    def _match_and_score_spectra_within_memory_budget(self, queryDict):
+        """
+        Equivalent of matching, correcting and scoring library-query spectrum matches with
+            self._match_library_to_query_spectra(), self._apply_correction_to_match_dataframe()
+            and self._score_spectra_matches(), keeping resident matches within the maxMemory
+            budget (in gigabytes).
+
+        Extended Summary
+        ----------------
+        The uncorrected matches of each m/z window are added to a MatchSpill, which writes them
+            to a temporary directory once the matches held in memory exceed half of the budget.
+            Each window is then read back, corrected and reduced to its spectrum matches, which
+            are added to a second MatchSpill with the other half of the budget. Each query scan
+            belongs to a single m/z window, so the spectrum matches of all windows are finally
+            combined into the same scores as scoring all matches at once. When windows are
+            matched in parallel, at most workers + 1 windows of matches wait to be added to the
+            first MatchSpill (see generate_library_to_query_matches_by_mz_windows_in_parallel).
+
+        Returns
+        -------
+        scoreDf : pandas DataFrame
+            See output of self._score_spectra_matches(). None is returned if no matches are
+                found.
+        """
+        printer = Printer()
+        maxResidentBytes = int(self._commandLineArgs["maxMemory"] * 2**30 / 2)
+        queryPrecursorMzs = {
+            int(scan): queryMetadata["precursorMz"]
+            for scan, queryMetadata in queryDict.items()
+        }
+        isCorrecting = self._correction_process_is_to_be_applied()
+        with MatchSpill(maxResidentBytes=maxResidentBytes) as matchSpill, MatchSpill(
+            maxResidentBytes=maxResidentBytes
+        ) as scoreSpill:
+            for matchDf in self._generate_match_dataframes_by_mz_window():
+                matchSpill.append(matchDf)
+            printer(
+                f"Total number of peaks matched (pre-correction): {matchSpill.numMatches}"
+            )
+            if isCorrecting:
+                offset, tolerance = (
+                    self._calculate_ppm_offset_and_tolerance_of_match_spill(matchSpill)
+                )
+            numMatches = 0
+            for matchDf in matchSpill.read_partitions():
+                if isCorrecting:
+                    matchDf = filter_matches_by_ppm_offset_and_tolerance(
+                        matchDf, offset, tolerance
+                    )
+                numMatches += len(matchDf.index)
+                if len(matchDf.index):
+                    scoreSpill.append(
+                        summarize_library_to_query_matches(matchDf, queryPrecursorMzs)
+                    )
+            if isCorrecting:
+                printer(
+                    f"Total number of peaks matched (post-correction): {numMatches}"
+                )
+            if numMatches == 0:
+                return None
+            return score_summarized_library_to_query_matches(
+                scoreSpill.read_partitions()
+            )
+
+    def _create_histogram_file_path(self):
+        queryFile = self._queryContext.filePath.split("/")[-1]
+        outFile = os.path.splitext(queryFile)[0] + "_correctionHistogram.png"
+        return os.path.join(self._commandLineArgs["output"], outFile)
+
+    def _format_identifications_as_dataframe(self, scoreDf, queryDict, queryDf=None):
+        """
+        The final match/score identifications are consolidated into a dataframe.
+        """
+        return format_output_as_pandas_dataframe(
+            self._queryContext.filePath, scoreDf, self._library, queryDict, queryDf
+        )
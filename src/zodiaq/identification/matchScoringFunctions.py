@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+from numba import njit
+
+
+def score_library_to_query_matches(matches, queryPrecursorMzs=None):
+    """
+    Scores each library-query spectrum match, sorted from highest to lowest cosine score.
+        See summarize_library_to_query_matches for the output columns.
+    """
+    scoreDf = summarize_library_to_query_matches(matches, queryPrecursorMzs)
+    return scoreDf.sort_values("cosineScore", ascending=False).reset_index(drop=True)
+
+
+def score_summarized_library_to_query_matches(scoreDfs):
+    """
+    Combines the outputs of summarize_library_to_query_matches for disjoint sets of spectrum
+        matches (such as the matches of separate m/z windows) into the output of
+        score_library_to_query_matches for all matches at once.
+    """
+    scoreDf = pd.concat(scoreDfs, ignore_index=True)
+    sortIdx = np.lexsort((scoreDf["queryIdx"], scoreDf["libraryIdx"]))
+    scoreDf = scoreDf.iloc[sortIdx].reset_index(drop=True)
+    return scoreDf.sort_values("cosineScore", ascending=False).reset_index(drop=True)
+
+
+def summarize_library_to_query_matches(matches, queryPrecursorMzs=None):
+    """
+    Reduces peak matches to library-query spectrum matches in a single compiled pass.
+
+    Extended Summary
+    ----------------
+    Peak matches are stably sorted by library and query index, so the peaks of each spectrum
+        match form a contiguous segment in their original order. Each segment is then reduced
+        to the cosine similarity score of the square root of the matched intensities (computed
+        identically to calculate_cosine_similarity_score) and, if query precursor m/z values
+        are provided, the number of matched peaks, the summed query intensity of matches above
+        the query precursor m/z (ionCount) and the number of matches at or below it
+        (exclude_num).
+
+    Parameters
+    ----------
+    matches : pandas DataFrame
+        Peak matches. See output of match_library_to_query_pooled_spectra.
+
+    queryPrecursorMzs : dict
+        key: queryIdx value of a query spectrum.
+        value: precursor m/z value of the query spectrum.
+
+    Returns
+    -------
+    scoreDf : pandas DataFrame
+        A dataframe with one row per library-query spectrum match, sorted by libraryIdx and
+            queryIdx. Columns are 'libraryIdx', 'queryIdx' and 'cosineScore', followed by
+            'shared', 'ionCount' and 'exclude_num' if queryPrecursorMzs is provided.
+    """
+    libraryIdxs = matches["libraryIdx"].to_numpy()
+    queryIdxs = matches["queryIdx"].to_numpy()
+    sortIdx = np.lexsort((queryIdxs, libraryIdxs))
+    libraryIdxs, queryIdxs = libraryIdxs[sortIdx], queryIdxs[sortIdx]
+    isGroupStart = np.ones(len(sortIdx), dtype=bool)
+    isGroupStart[1:] = (libraryIdxs[1:] != libraryIdxs[:-1]) | (
+        queryIdxs[1:] != queryIdxs[:-1]
+    )
+    groupStarts = np.flatnonzero(isGroupStart)
+    groupOffsets = np.append(groupStarts, len(sortIdx))
+    isSummarizingIons = queryPrecursorMzs is not None
+    if isSummarizingIons:
+        queryMzs = matches["queryMz"].to_numpy(dtype=np.float64)[sortIdx]
+        groupPrecursorMzs = (
+            pd.Series(queryIdxs[groupStarts])
+            .map(queryPrecursorMzs)
+            .to_numpy(dtype=np.float64)
+        )
+    else:
+        queryMzs = np.empty(0, dtype=np.float64)
+        groupPrecursorMzs = np.empty(0, dtype=np.float64)
+    (
+        cosineScores,
+        ionCounts,
+        excludeNums,
+    ) = numba_enhanced_aggregation_of_sorted_matches(
+        groupOffsets,
+        matches["libraryIntensity"].to_numpy(dtype=np.float64)[sortIdx],
+        matches["queryIntensity"].to_numpy(dtype=np.float64)[sortIdx],
+        queryMzs,
+        groupPrecursorMzs,
+        isSummarizingIons,
+    )
+    scoreDf = pd.DataFrame(
+        {
+            "libraryIdx": libraryIdxs[groupStarts],
+            "queryIdx": queryIdxs[groupStarts],
+            "cosineScore": cosineScores,
+        }
+    )
+    if isSummarizingIons:
+        scoreDf["shared"] = np.diff(groupOffsets)
+        scoreDf["ionCount"] = ionCounts
+        scoreDf["exclude_num"] = excludeNums
+    return scoreDf
+
+
+@njit(cache=True, error_model="numpy")
+def numba_enhanced_aggregation_of_sorted_matches(
+    groupOffsets,
+    libraryIntensities,
+    queryIntensities,
+    queryMzs,
+    groupPrecursorMzs,
+    isSummarizingIons,
+):
+    numGroups = len(groupOffsets) - 1
+    cosineScores = np.empty(numGroups, dtype=np.float64)
+    ionCounts = np.zeros(numGroups, dtype=np.float64)
+    excludeNums = np.zeros(numGroups, dtype=np.int64)
+    for groupIdx in range(numGroups):
+        start, stop = groupOffsets[groupIdx], groupOffsets[groupIdx + 1]
+        libraryVector = np.sqrt(libraryIntensities[start:stop])
+        queryVector = np.sqrt(queryIntensities[start:stop])
+        cosineDistance = 1.0 - np.dot(libraryVector, queryVector) / np.sqrt(
+            np.dot(libraryVector, libraryVector) * np.dot(queryVector, queryVector)
+        )
+        if cosineDistance < 0.0:
+            cosineDistance = 0.0
+        elif cosineDistance > 2.0:
+            cosineDistance = 2.0
+        cosineScores[groupIdx] = 1 - cosineDistance
+        if not isSummarizingIons:
+            continue
+        for matchIdx in range(start, stop):
+            if queryMzs[matchIdx] > groupPrecursorMzs[groupIdx]:
+                ionCounts[groupIdx] += queryIntensities[matchIdx]
+            else:
+                excludeNums[groupIdx] += 1
+    return cosineScores, ionCounts, excludeNums
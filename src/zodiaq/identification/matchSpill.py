@@ -0,0 +1,181 @@
+from zodiaq.identification.matchingFunctions import (
+    normalize_bin_position_from_left_to_center_of_each_bin,
+)
+from tempfile import TemporaryDirectory
+import pandas as pd
+import numpy as np
+import os
+
+
+class MatchSpill:
+    """
+    Temporary store of match dataframes, written one partition (m/z window) at a time, that is
+        kept on disk once it exceeds a memory budget.
+
+    Extended Summary
+    ----------------
+    Correcting the ppm offset of peak matches requires statistics of every match in a query
+        file, which would otherwise require keeping the uncorrected matches of all m/z windows
+        in memory at once. This class writes each partition to a temporary directory as one
+        .npy file per column, accumulating the count, range, mean and variance of the
+        'ppmDifference' column as it goes. The ppm histogram is computed by streaming the
+        'ppmDifference' column of each partition back from disk, and partitions can then be
+        re-read one at a time for filtering. Memory use is bounded by the largest partition.
+
+    Partitions are kept in memory while their total size is within maxResidentBytes. Once a
+        new partition would exceed it, all partitions held in memory are written to disk.
+        With the default budget of 0 bytes every partition is written to disk.
+
+    Attributes
+    ----------
+    directory : string
+        Path to the temporary directory the partitions are written to.
+    numPartitions : int
+        Number of partitions written.
+    numMatches : int
+        Total number of rows written across all partitions.
+    maxResidentBytes : int
+        Maximum total size of the partitions held in memory.
+    residentBytes : int
+        Total size of the partitions currently held in memory.
+    ppmMin : float
+        Smallest 'ppmDifference' value written.
+    ppmMax : float
+        Largest 'ppmDifference' value written.
+    ppmMean : float
+        Mean of the 'ppmDifference' values written.
+    _ppmSumOfSquaredDeviations : float
+        Sum of the squared deviations of the 'ppmDifference' values from their mean, combined
+            across partitions with Chan's parallel variance algorithm.
+    _columns : list
+        Column names of the partitions, in order.
+    _residentPartitions : dict
+        key: partition number.
+        value: partition dataframe held in memory.
+    """
+
+    def __init__(self, parentDirectory=None, maxResidentBytes=0):
+        self._temporaryDirectory = TemporaryDirectory(
+            prefix="zodiaq_match_spill_", dir=parentDirectory
+        )
+        self.directory = self._temporaryDirectory.name
+        self.numPartitions = 0
+        self.numMatches = 0
+        self.ppmMin = np.inf
+        self.ppmMax = -np.inf
+        self.ppmMean = 0.0
+        self._ppmSumOfSquaredDeviations = 0.0
+        self._columns = None
+        self.maxResidentBytes = maxResidentBytes
+        self.residentBytes = 0
+        self._residentPartitions = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        """Removes the temporary directory and all partitions written to it."""
+        self._residentPartitions = {}
+        self.residentBytes = 0
+        self._temporaryDirectory.cleanup()
+
+    def append(self, df: pd.DataFrame) -> None:
+        """
+        Adds a dataframe as a new partition, held in memory or written to disk depending on the
+            memory budget. Every partition must have the same columns.
+        """
+        if self._columns is None:
+            self._columns = list(df.columns)
+        elif list(df.columns) != self._columns:
+            raise ValueError(
+                "Every partition written to a MatchSpill must have the same columns."
+            )
+        partitionBytes = int(df.memory_usage(index=True).sum())
+        if self.residentBytes + partitionBytes <= self.maxResidentBytes:
+            self._residentPartitions[self.numPartitions] = df
+            self.residentBytes += partitionBytes
+        else:
+            for partition, residentDf in self._residentPartitions.items():
+                self._write_partition_to_disk(partition, residentDf)
+            self._residentPartitions = {}
+            self.residentBytes = 0
+            self._write_partition_to_disk(self.numPartitions, df)
+        if "ppmDifference" in self._columns:
+            self._update_ppm_statistics(df["ppmDifference"].to_numpy())
+        self.numPartitions += 1
+        self.numMatches += len(df.index)
+
+    def read_partitions(self, columns=None):
+        """
+        Yields the partitions written, in order, as dataframes.
+
+        Parameters
+        ----------
+        columns : list, optional
+            Columns to read. All columns are read by default.
+        """
+        if columns is None:
+            columns = self._columns
+        for partition in range(self.numPartitions):
+            if partition in self._residentPartitions:
+                yield self._residentPartitions[partition][columns]
+                continue
+            partitionDirectory = self._partition_directory(partition)
+            yield pd.DataFrame(
+                {
+                    column: np.load(os.path.join(partitionDirectory, f"{column}.npy"))
+                    for column in columns
+                }
+            )
+
+    def calculate_ppm_histogram(self, numBins=200):
+        """
+        Streams the 'ppmDifference' column of each partition to create a histogram identical to
+            create_standardized_histogram in matchingFunctions.py applied to all values at once.
+        """
+        binHeights = np.zeros(numBins, dtype=np.int64)
+        binRange = (self.ppmMin, self.ppmMax) if self.numMatches else None
+        for df in self.read_partitions(columns=["ppmDifference"]):
+            partitionBinHeights, bins = np.histogram(
+                df["ppmDifference"], bins=numBins, range=binRange
+            )
+            binHeights += partitionBinHeights
+        if self.numPartitions == 0:
+            _, bins = np.histogram([], bins=numBins)
+        return binHeights, normalize_bin_position_from_left_to_center_of_each_bin(bins)
+
+    def calculate_ppm_standard_deviation(self) -> float:
+        """Returns the (population) standard deviation of the 'ppmDifference' values written."""
+        if self.numMatches == 0:
+            return np.nan
+        return np.sqrt(self._ppmSumOfSquaredDeviations / self.numMatches)
+
+    def _partition_directory(self, partition):
+        return os.path.join(self.directory, f"partition_{partition:06d}")
+
+    def _write_partition_to_disk(self, partition, df):
+        partitionDirectory = self._partition_directory(partition)
+        os.mkdir(partitionDirectory)
+        for column in self._columns:
+            np.save(
+                os.path.join(partitionDirectory, f"{column}.npy"),
+                df[column].to_numpy(),
+            )
+
+    def _update_ppm_statistics(self, ppms):
+        if len(ppms) == 0:
+            return
+        self.ppmMin = min(self.ppmMin, float(np.min(ppms)))
+        self.ppmMax = max(self.ppmMax, float(np.max(ppms)))
+        partitionMean = np.mean(ppms)
+        partitionSumOfSquaredDeviations = np.sum((ppms - partitionMean) ** 2)
+        totalMatches = self.numMatches + len(ppms)
+        delta = partitionMean - self.ppmMean
+        self.ppmMean += delta * len(ppms) / totalMatches
+        self._ppmSumOfSquaredDeviations += (
+            partitionSumOfSquaredDeviations
+            + delta**2 * self.numMatches * len(ppms) / totalMatches
+        )
@@ -3,7 +3,6 @@ import numpy as np
 from numba import njit
 from numba.experimental import jitclass
 from enum import Enum
-import matplotlib.pyplot as plt
 
 
 class Increment(Enum):
@@ -12,17 +11,17 @@ class Increment(Enum):
     QUERY = 2
 
 
-@njit
+@njit(cache=True)
 def calculate_parts_per_million_relative_difference(referenceMz, targetMz):
     return (referenceMz - targetMz) * (1e6) / referenceMz
 
 
-@njit
+@njit(cache=True)
 def is_within_tolerance(ppm, tolerance):
     return abs(ppm) <= tolerance
 
 
-@njit
+@njit(cache=True)
 def determine_smallest_peak_outside_ppm_tolerance(libMz, queryMz, ppmTolerance):
     ppm = calculate_parts_per_million_relative_difference(libMz, queryMz)
     if is_within_tolerance(ppm, ppmTolerance):
@@ -33,7 +32,7 @@ def determine_smallest_peak_outside_ppm_tolerance(libMz, queryMz, ppmTolerance):
         return Increment.LIBRARY
 
 
-@njit
+@njit(cache=True)
 def match_query_peak_to_all_succeeding_library_peaks_within_tolerance(
     baselineLibraryIdx: int, libraryPeaks, queryPeak, ppmTolerance
 ):
@@ -63,14 +62,22 @@ def match_query_peak_to_all_succeeding_library_peaks_within_tolerance(
     return
 
 
-@njit
+@njit(cache=True)
 def numba_enhanced_matching_of_library_to_query_pooled_spectra(
-    libraryPeaks, queryPeaks, ppmTolerance, baselineLibraryIdx, baselineQueryIdx
+    libraryPeaks,
+    queryPeaks,
+    ppmTolerance,
+    libraryTags,
+    libraryIntensities,
+    queryTags,
+    queryIntensities,
+    queryMzs,
+    ppms,
+    isFilling,
 ):
     mzIdx, intensityIdx, tagIdx = 0, 1, 2
-    rowNum = 1000000
-    data = np.empty(shape=(rowNum, 6))
-    dataInsertIdx = 0
+    baselineLibraryIdx, baselineQueryIdx = 0, 0
+    numMatches = 0
     while baselineLibraryIdx < len(libraryPeaks) and baselineQueryIdx < len(queryPeaks):
         incrementation = determine_smallest_peak_outside_ppm_tolerance(
             libraryPeaks[baselineLibraryIdx][mzIdx],
@@ -91,22 +98,36 @@ def numba_enhanced_matching_of_library_to_query_pooled_spectra(
             )
             if not is_within_tolerance(ppm, ppmTolerance):
                 break
-            if dataInsertIdx == rowNum:
-                return data, baselineLibraryIdx, baselineQueryIdx
-
-            data[dataInsertIdx] = [
-                libraryPeaks[tempLibraryIdx][tagIdx],
-                libraryPeaks[tempLibraryIdx][intensityIdx],
-                queryPeaks[baselineQueryIdx][tagIdx],
-                queryPeaks[baselineQueryIdx][intensityIdx],
-                queryPeaks[baselineQueryIdx][mzIdx],
-                ppm,
-            ]
+            if isFilling:
+                libraryTags[numMatches] = int(libraryPeaks[tempLibraryIdx][tagIdx])
+                libraryIntensities[numMatches] = libraryPeaks[tempLibraryIdx][
+                    intensityIdx
+                ]
+                queryTags[numMatches] = int(queryPeaks[baselineQueryIdx][tagIdx])
+                queryIntensities[numMatches] = queryPeaks[baselineQueryIdx][
+                    intensityIdx
+                ]
+                queryMzs[numMatches] = queryPeaks[baselineQueryIdx][mzIdx]
+                ppms[numMatches] = ppm
 
             tempLibraryIdx += 1
-            dataInsertIdx += 1
+            numMatches += 1
         baselineQueryIdx += 1
-    return data[:dataInsertIdx], baselineLibraryIdx, baselineQueryIdx
+    return numMatches
+
+
+def remove_duplicate_peaks(peaks):
+    """
+    Removes peaks identical to the preceding peak. As pooled peaks are sorted, this removes
+        all duplicate peaks.
+    """
+    if len(peaks) < 2:
+        return peaks
+    isUnique = np.ones(len(peaks), dtype=bool)
+    isUnique[1:] = np.any(peaks[1:] != peaks[:-1], axis=1)
+    if isUnique.all():
+        return peaks
+    return peaks[isUnique]
 
 
 def match_library_to_query_pooled_spectra(libraryPeaks, queryPeaks, ppmTolerance):
@@ -114,11 +135,19 @@ def match_library_to_query_pooled_spectra(libraryPeaks, queryPeaks, ppmTolerance
     Peaks between library and query spectra are compared, and peaks with an m/z ppm tolerance
         are returned as matches.
 
+    Extended Summary
+    ----------------
+    Matching is done in two passes of the same compiled kernel. The first pass only counts
+        the matches, so the second pass can fill output arrays of exactly the required size.
+        Identical peaks (same m/z, intensity and tag) can only produce identical matches, so
+        they are removed from both inputs beforehand rather than removing duplicate matches
+        afterwards.
 
     Parameters
     ----------
-    libraryPeaks : list
-        Each value in the list is a 3-length tuple with the following characteristics:
+    libraryPeaks : list or np.ndarray
+        Each value in the list is a 3-length tuple (or row of a 2D array) with the following
+            characteristics:
             m/z - the m/z value of the peak.
             intensity - the intensity value of the peak.
             tag - an int representing the library spectrum to which the peak belongs.
@@ -126,7 +155,7 @@ def match_library_to_query_pooled_spectra(libraryPeaks, queryPeaks, ppmTolerance
                 together and being able to parse them out from each other after the
                 analysis.
 
-    queryPeaks : list
+    queryPeaks : list or np.ndarray
         Uses the same format as libraryPeaks, but the tag identifies query spectra
             instead.
 
@@ -138,49 +167,41 @@ def match_library_to_query_pooled_spectra(libraryPeaks, queryPeaks, ppmTolerance
     -------
     matchDf : pandas DataFrame
         A dataframe containing the library peak to query peak matches. Data includes
-            the library/query tags of the peaks, their intensities, and the ppm
-            difference between the two.
+            the library/query tags of the peaks (as int32), their intensities, the query
+            m/z values and the ppm difference between the two.
     """
-    libraryArray = np.array(libraryPeaks)
-    queryArray = np.array(queryPeaks)
-    dataArrays = []
-    baselineLibraryIdx, baselineQueryIdx = np.int64(0), np.int64(0)
-    while baselineLibraryIdx < len(libraryArray) and baselineQueryIdx < len(queryArray):
-        (
-            dataArray,
-            baselineLibraryIdx,
-            baselineQueryIdx,
-        ) = numba_enhanced_matching_of_library_to_query_pooled_spectra(
-            libraryArray, queryArray, ppmTolerance, baselineLibraryIdx, baselineQueryIdx
-        )
-        dataArrays.append(dataArray)
-    if len(dataArrays) == 0:
-        data = []
-    else:
-        data = np.concatenate(dataArrays, axis=0)
-    matchDf = pd.DataFrame(
-        data,
-        columns=[
-            "libraryIdx",
-            "libraryIntensity",
-            "queryIdx",
-            "queryIntensity",
-            "queryMz",
-            "ppmDifference",
-        ],
+    libraryArray = remove_duplicate_peaks(
+        np.ascontiguousarray(libraryPeaks, dtype=np.float64).reshape(-1, 3)
+    )
+    queryArray = remove_duplicate_peaks(
+        np.ascontiguousarray(queryPeaks, dtype=np.float64).reshape(-1, 3)
     )
-    matchDf[["libraryIdx", "queryIdx"]] = matchDf[["libraryIdx", "queryIdx"]].astype(
-        int
+    matchArrays = {
+        "libraryIdx": np.empty(0, dtype=np.int32),
+        "libraryIntensity": np.empty(0, dtype=np.float64),
+        "queryIdx": np.empty(0, dtype=np.int32),
+        "queryIntensity": np.empty(0, dtype=np.float64),
+        "queryMz": np.empty(0, dtype=np.float64),
+        "ppmDifference": np.empty(0, dtype=np.float64),
+    }
+    numMatches = numba_enhanced_matching_of_library_to_query_pooled_spectra(
+        libraryArray, queryArray, ppmTolerance, *matchArrays.values(), False
     )
-    return matchDf.drop_duplicates()
+    matchArrays = {
+        column: np.empty(numMatches, dtype=array.dtype)
+        for column, array in matchArrays.items()
+    }
+    numba_enhanced_matching_of_library_to_query_pooled_spectra(
+        libraryArray, queryArray, ppmTolerance, *matchArrays.values(), True
+    )
+    return pd.DataFrame(matchArrays)
 
 
 def eliminate_low_count_matches(matches, minNumMatches=3):
-    return (
-        matches.groupby(["libraryIdx", "queryIdx"])
-        .filter(lambda x: x.shape[0] >= minNumMatches)
-        .reset_index(drop=True)
+    matchCounts = matches.groupby(["libraryIdx", "queryIdx"])["libraryIdx"].transform(
+        "size"
     )
+    return matches[matchCounts >= minNumMatches].reset_index(drop=True)
 
 
 def eliminate_matches_below_fdr_cutoff(matches, groupsAboveCutoff):
@@ -191,6 +212,12 @@ def eliminate_matches_below_fdr_cutoff(matches, groupsAboveCutoff):
 
 def create_ppm_histogram(ppms, offset, tolerance, histogramFile):
     binHeights, bins = create_standardized_histogram(ppms)
+    plot_ppm_histogram(binHeights, bins, offset, tolerance, histogramFile)
+
+
+def plot_ppm_histogram(binHeights, bins, offset, tolerance, histogramFile):
+    import matplotlib.pyplot as plt
+
     barReductionForVisibility = 0.7
     binWidth = barReductionForVisibility * (bins[1] - bins[0])
     plt.clf()
@@ -235,6 +262,10 @@ def create_standardized_histogram(ppms, numBins=200):
 
 def calculate_ppm_offset_tolerance_using_tallest_bin_peak(ppms):
     binHeights, bins = create_standardized_histogram(ppms)
+    return calculate_ppm_offset_tolerance_from_standardized_histogram(binHeights, bins)
+
+
+def calculate_ppm_offset_tolerance_from_standardized_histogram(binHeights, bins):
     tallestBinIdx = max(range(len(binHeights)), key=binHeights.__getitem__)
     nearestNoiseBinIdx = identify_index_of_max_distance_to_noise_from_tallest_bin(
         binHeights, tallestBinIdx
@@ -0,0 +1,49 @@
+from zodiaq.identification.matchingFunctions import (
+    match_library_to_query_pooled_spectra,
+)
+from zodiaq.loaders.peakPoolingFunctions import pool_sorted_peak_runs
+from zodiaq.identification.matchScoringFunctions import (
+    score_library_to_query_matches,
+)
+from timeit import default_timer as timer
+import numpy as np
+
+supportedMatchTolerances = [30, 30.0]
+
+
+def compile_numba_functions(matchTolerances=supportedMatchTolerances) -> float:
+    """
+    Compiles every numba function used in identification for the argument types zoDIAq calls
+        them with, returning the time taken in seconds.
+
+    Extended Summary
+    ----------------
+    The numba functions are decorated with cache=True, so compiled machine code is written to
+        the numba cache (the __pycache__ directory of each module, or NUMBA_CACHE_DIR if set)
+        the first time they are compiled, and loaded from it by later processes. Running this
+        function once, as done by the 'zodiaq warmup' command, fills the cache. Peaks are
+        always pooled as float64 arrays, so only the match tolerance (an int or a float) can
+        change the compiled signature.
+
+    Parameters
+    ----------
+    matchTolerances : list
+        Match tolerances to compile the matching function for, one per supported type.
+
+    Returns
+    -------
+    compilationTime : float
+        Time taken to compile (or load from the cache) the numba functions, in seconds.
+    """
+    startTime = timer()
+    peakMz = np.array([100.0, 200.0, 100.0, 150.0])
+    pooledPeaks = pool_sorted_peak_runs(
+        peakMz, np.ones(len(peakMz)), np.array([0, 0, 1, 1]), np.array([0, 2, 4])
+    )
+    for matchTolerance in matchTolerances:
+        matchDf = match_library_to_query_pooled_spectra(
+            pooledPeaks, pooledPeaks, matchTolerance
+        )
+    score_library_to_query_matches(matchDf)
+    score_library_to_query_matches(matchDf, {0: 0.0, 1: 0.0})
+    return timer() - startTime
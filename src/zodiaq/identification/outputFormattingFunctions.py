@@ -2,80 +2,117 @@ import pandas as pd
 import numpy as np
 
 
-def format_output_line(libMetadata, queMetadata, matchMetadata):
-    return [
-        queMetadata["scan"],
-        queMetadata["precursorMz"],
-        libMetadata["peptide"],
-        libMetadata["proteinName"],
-        libMetadata["isDecoy"],
-        libMetadata["precursorMz"],
-        libMetadata["precursorCharge"],
-        matchMetadata["cosineSimilarityScore"],
-        libMetadata["identification"],
-        queMetadata["peaksCount"],
-        len(libMetadata["peaks"]),
-        matchMetadata["shared"],
-        matchMetadata["ionCount"],
-        queMetadata["CV"],
-        queMetadata["windowWidth"],
-        matchMetadata["exclude_num"],
-        queMetadata["retentionTime"],
-    ]
-
-
-def extract_metadata_from_match_and_score_dataframes(matchDf, scoreDf, queryDict):
-    matchDict = {
-        k: extract_metadata_from_match_dataframe_groupby(v, queryDict[str(k[1])])
-        for k, v in matchDf.groupby(["libraryIdx", "queryIdx"])
-    }
-    scoreDict = extract_metadata_from_score_dataframe(scoreDf)
-    metadataDict = {k: {**matchDict[k], **scoreDict[k]} for k in scoreDict.keys()}
-    return metadataDict
-
-
-def extract_metadata_from_match_dataframe_groupby(group, queryMetadata):
-    precursorMz = queryMetadata["precursorMz"]
-    groupRowsAbovePrecursorMz = group[group["queryMz"] > precursorMz]
-    return {
-        "shared": len(group.index),
-        "ionCount": sum(groupRowsAbovePrecursorMz["queryIntensity"]),
-        "exclude_num": len(group.index) - len(groupRowsAbovePrecursorMz),
-    }
-
-
-def extract_metadata_from_score_dataframe(df):
-    cosineDict = df.set_index(["libraryIdx", "queryIdx"])["cosineScore"].to_dict()
-    outputDict = {
-        k: {"cosineSimilarityScore": cosineDict[k]} for k in cosineDict.keys()
-    }
-    return outputDict
-
-
-def format_output_as_pandas_dataframe(inputFileName, outputData):
-    columns = [
-        "scan",
-        "MzEXP",
-        "peptide",
-        "protein",
-        "isDecoy",
-        "MzLIB",
-        "zLIB",
-        "cosine",
-        "name",
-        "Peak(Query)",
-        "Peaks(Library)",
-        "shared",
-        "ionCount",
-        "CompensationVoltage",
-        "totalWindowWidth",
-        "exclude_num",
-        "retentionTime",
-    ]
-    outputDf = pd.DataFrame(outputData, columns=columns)
+def format_output_as_pandas_dataframe(
+    inputFileName, scoreDf, library, queryDict, queryDf=None
+):
+    """
+    Joins library-query spectrum match scores with the metadata of their library and query
+        spectra to create the full identification output.
+
+    Extended Summary
+    ----------------
+    Each output column is created in a single vectorized operation. Library metadata is taken
+        from the columnar library arrays by libraryIdx, and query metadata from a table built
+        once from queryDict by queryIdx. Neither the library nor queryDict is modified.
+
+    When the output is formatted a chunk of scoreDf at a time, the query metadata table can
+        be built once for all chunks with create_query_metadata_dataframe and passed as
+        queryDf, so that it is neither rebuilt for every chunk nor given column types that
+        differ between chunks.
+
+    Parameters
+    ----------
+    inputFileName : string
+        Name of the query file, written in the 'fileName' column.
+
+    scoreDf : pandas DataFrame
+        Spectrum match scores. See output of score_library_to_query_matches.
+
+    library : ZodiaqLibrary
+        The library that was matched against the query file.
+
+    queryDict : dict
+        See output of QueryLoaderContext.extract_metadata_from_query_scans().
+
+    queryDf : pandas DataFrame
+        Optional. See output of create_query_metadata_dataframe. Must contain every scan in
+            scoreDf. Built from queryDict if not given.
+
+    Returns
+    -------
+    outputDf : pandas DataFrame
+        One row per spectrum match, in the order of scoreDf.
+    """
+    libraryIdxs = scoreDf["libraryIdx"].to_numpy()
+    queryIdxs = scoreDf["queryIdx"].to_numpy()
+    if queryDf is None:
+        queryDf = create_query_metadata_dataframe(queryDict, queryIdxs)
+    queryDf = _select_query_metadata_of_scans(queryDf, queryIdxs)
+    outputDf = pd.DataFrame(
+        {
+            "scan": queryIdxs,
+            "MzEXP": queryDf["precursorMz"],
+            "peptide": library.metadata["peptide"][libraryIdxs],
+            "protein": library.metadata["proteinName"][libraryIdxs],
+            "isDecoy": library.metadata["isDecoy"][libraryIdxs],
+            "MzLIB": library.metadata["precursorMz"][libraryIdxs],
+            "zLIB": library.metadata["precursorCharge"][libraryIdxs],
+            "cosine": scoreDf["cosineScore"].to_numpy(),
+            "name": library.metadata["identification"][libraryIdxs],
+            "Peak(Query)": queryDf["peaksCount"],
+            "Peaks(Library)": np.diff(library.peakOffsets)[libraryIdxs],
+            "shared": scoreDf["shared"].to_numpy(),
+            "ionCount": scoreDf["ionCount"].to_numpy(),
+            "CompensationVoltage": queryDf["CV"],
+            "totalWindowWidth": queryDf["windowWidth"],
+            "exclude_num": scoreDf["exclude_num"].to_numpy(),
+            "retentionTime": queryDf["retentionTime"],
+        }
+    )
     outputDf.insert(0, "fileName", [inputFileName] * len(outputDf.index))
     return outputDf
 
 
+def create_query_metadata_dataframe(queryDict, queryIdxs):
+    """
+    Returns the metadata of the query scans of the given query indices as a dataframe
+        indexed by scan, with one row per distinct scan. Columns of mixed types (such as
+        text and numeric retention times) are kept as object columns.
+    """
+    scans = np.unique(queryIdxs)
+    queryKeys = list(queryDict.keys())
+    scanRows = pd.Index(queryKeys).get_indexer(scans.astype(str))
+    if np.any(scanRows < 0):
+        raise KeyError(f"Query scans {scans[scanRows < 0].tolist()} have no metadata.")
+    queryDf = pd.DataFrame(
+        [queryDict[queryKeys[scanRow]] for scanRow in scanRows],
+        index=scans,
+        dtype=object,
+    )
+    return queryDf.infer_objects()
+
+
+def select_rows_covering_output_values(scoreDf):
+    """
+    Returns the rows of scoreDf holding the first match of every distinct query scan and
+        library spectrum. Formatted for output, these rows hold every value found in the
+        metadata columns of the full output, which determines the column types of a table
+        written in chunks (see write_table_file_in_chunks).
+    """
+    isFirstMatch = (
+        ~scoreDf["queryIdx"].duplicated() | ~scoreDf["libraryIdx"].duplicated()
+    )
+    return scoreDf[isFirstMatch.to_numpy()]
+
+
+def _select_query_metadata_of_scans(queryDf, queryIdxs):
+    queryRows = queryDf.index.get_indexer(queryIdxs)
+    if np.any(queryRows < 0):
+        raise KeyError(
+            f"Query scans {sorted(set(queryIdxs[queryRows < 0].tolist()))} have no metadata."
+        )
+    return queryDf.iloc[queryRows].reset_index(drop=True)
+
+
 def identify_all_decoys(decoySet, scoreDf):
     return np.where(scoreDf["libraryIdx"].isin(decoySet), 1, 0)
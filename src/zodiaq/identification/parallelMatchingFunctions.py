@@ -0,0 +1,119 @@
+from multiprocessing.util import Finalize
+from collections import deque
+from itertools import islice
+
+from zodiaq.identification.poolingFunctions import (
+    find_library_index_range_of_mz_window,
+)
+from zodiaq.identification.matchingFunctions import (
+    match_library_to_query_pooled_spectra,
+    eliminate_low_count_matches,
+)
+from zodiaq.identification.numbaCompilationFunctions import compile_numba_functions
+from zodiaq.utils import Printer, create_process_pool
+
+_workerState = {}
+
+
+def generate_library_to_query_matches_by_mz_windows_in_parallel(
+    library, precursorIndex, queryContext, matchTolerance, numWorkers
+):
+    """
+    Parallel equivalent of matching the output of
+        generate_pooled_library_and_query_spectra_by_mz_windows window by window, yielding
+        the match dataframe of each m/z window in order as soon as it is available.
+
+    Extended Summary
+    ----------------
+    Each m/z window is dispatched to a pool of worker processes, which pool the library and
+        query peaks of the window, match them and remove low-count matches. The library is
+        handed to each worker once when the worker starts (shared through copy-on-write
+        memory where processes are forked), so tasks only carry the library index range and
+        query scans of a window. Each worker opens the query file once and closes it when
+        the worker exits. Windows without library spectra are skipped with the same warning
+        as the serial workflow. Results are yielded in window order, making the output
+        identical to the serial workflow.
+
+    At most numWorkers windows are submitted to the pool and not yet yielded at any time. A
+        new window is only submitted once the result of the oldest window is taken, so the
+        match dataframes held in memory do not grow with the number of windows, however
+        slowly they are consumed.
+
+    Parameters
+    ----------
+    library : ZodiaqLibrary
+        The library to be matched against the query spectra.
+
+    precursorIndex : PrecursorMzIndex
+        Index of the library precursor m/z values.
+
+    queryContext : QueryLoaderContext
+        The query file to be matched against the library.
+
+    matchTolerance : float
+        The ppm tolerance allowed between library and query spectra peaks m/z values
+            to be considered a match.
+
+    numWorkers : int
+        Number of worker processes.
+
+    Yields
+    ------
+    matchDf : pandas DataFrame
+        The match dataframe of each m/z window with library spectra, in the order the windows
+            appear in the query file. See output of match_library_to_query_pooled_spectra.
+    """
+    printer = Printer()
+    queDict = queryContext.map_query_scan_ids_to_dia_mz_windows()
+    printer(f"Total number of m/z windows: {len(queDict.keys())}")
+    windowTasks = []
+    for mzWindow, scans in queDict.items():
+        start, stop = find_library_index_range_of_mz_window(mzWindow, precursorIndex)
+        if start == stop:
+            continue
+        windowTasks.append((start, stop, scans))
+    compile_numba_functions([matchTolerance])
+    with create_process_pool(
+        numWorkers,
+        initializer=_initialize_matching_worker,
+        initargs=(library, queryContext, matchTolerance),
+    ) as pool:
+        remainingWindowTasks = iter(windowTasks)
+        pendingMatchDfs = deque(
+            pool.submit(_match_library_to_query_spectra_of_window, windowTask)
+            for windowTask in islice(remainingWindowTasks, numWorkers)
+        )
+        numWindowsMatched = 0
+        while pendingMatchDfs:
+            matchDf = pendingMatchDfs.popleft().result()
+            for windowTask in islice(remainingWindowTasks, 1):
+                pendingMatchDfs.append(
+                    pool.submit(_match_library_to_query_spectra_of_window, windowTask)
+                )
+            numWindowsMatched += 1
+            printer(
+                f"Checkpoint: {numWindowsMatched} / {len(windowTasks)} windows with library spectra matched",
+                checkPoint=True,
+            )
+            yield matchDf
+
+
+def _initialize_matching_worker(library, queryContext, matchTolerance):
+    _workerState["library"] = library
+    _workerState["queryContext"] = queryContext
+    reader = queryContext.get_query_file_reader()
+    _workerState["reader"] = reader.__enter__()
+    Finalize(None, reader.__exit__, args=(None, None, None), exitpriority=10)
+    _workerState["matchTolerance"] = matchTolerance
+
+
+def _match_library_to_query_spectra_of_window(windowTask):
+    start, stop, scans = windowTask
+    pooledLibraryPeaks = _workerState["library"].pool_peaks_of_spectra(start, stop)
+    pooledQueryPeaks = _workerState["queryContext"].pool_peaks_of_query_scans(
+        scans, _workerState["reader"]
+    )
+    matchDf = match_library_to_query_pooled_spectra(
+        pooledLibraryPeaks, pooledQueryPeaks, _workerState["matchTolerance"]
+    )
+    return eliminate_low_count_matches(matchDf)
@@ -1,10 +1,14 @@
 import warnings
-from bisect import bisect
 from zodiaq.utils import Printer
+from zodiaq.identification.precursorMzIndex import PrecursorMzIndex
 
 
-def generate_pooled_library_and_query_spectra_by_mz_windows(libDict, queryContext):
+def generate_pooled_library_and_query_spectra_by_mz_windows(
+    library, queryContext, precursorIndex=None
+):
     printer = Printer()
+    if precursorIndex is None:
+        precursorIndex = PrecursorMzIndex(library.precursorMz)
     queDict = queryContext.map_query_scan_ids_to_dia_mz_windows()
     printer(f"Total number of m/z windows: {len(queDict.keys())}")
     numWindowsTraversed = 0
@@ -15,30 +19,27 @@ def generate_pooled_library_and_query_spectra_by_mz_windows(libDict, queryContex
                 f"Checkpoint: {numWindowsTraversed} / {len(queDict.keys())} windows traversed",
                 checkPoint=True,
             )
-            pooledLibraryPeaks = _pool_library_spectra_by_mz_window(mzWindow, libDict)
+            pooledLibraryPeaks = _pool_library_spectra_by_mz_window(
+                mzWindow, library, precursorIndex
+            )
             if len(pooledLibraryPeaks) == 0:
                 continue
             pooledQueryPeaks = queryContext.pool_peaks_of_query_scans(scans, reader)
             yield pooledLibraryPeaks, pooledQueryPeaks
 
 
-def _pool_library_spectra_by_mz_window(mzWindow, libDict):
-    libKeys = _find_keys_of_library_spectra_in_mz_window(mzWindow, libDict.keys())
-    pooledLibPeaks = []
-    for key in libKeys:
-        pooledLibPeaks.extend(libDict[key]["peaks"])
-    return sorted(pooledLibPeaks)
+def _pool_library_spectra_by_mz_window(mzWindow, library, precursorIndex=None):
+    if precursorIndex is None:
+        precursorIndex = PrecursorMzIndex(library.precursorMz)
+    start, stop = find_library_index_range_of_mz_window(mzWindow, precursorIndex)
+    return library.pool_peaks_of_spectra(start, stop)
 
 
-def _find_keys_of_library_spectra_in_mz_window(mzWindow, libDictKeys):
-    sortedLibDictKeys = sorted(libDictKeys)
-    topMz = mzWindow[0] + mzWindow[1] / 2
-    bottomMz = mzWindow[0] - mzWindow[1] / 2
-    topIndex = bisect(sortedLibDictKeys, (topMz, "z"))
-    bottomIndex = bisect(sortedLibDictKeys, (bottomMz, ""))
-    if topIndex == bottomIndex:
+def find_library_index_range_of_mz_window(mzWindow, precursorIndex):
+    start, stop = precursorIndex.find_index_range(mzWindow)
+    if start == stop:
         warnings.warn(
             f"No library spectra found in the {mzWindow} m/z window. Skipping",
             Warning,
         )
-    return sortedLibDictKeys[bottomIndex:topIndex]
+    return start, stop
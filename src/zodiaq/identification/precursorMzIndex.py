@@ -0,0 +1,73 @@
+import numpy as np
+
+
+class PrecursorMzIndex:
+    """
+    Index of library precursor m/z values for finding the library spectra that fall within
+        DIA m/z windows.
+
+    Extended Summary
+    ----------------
+    The index is built once per library. Each m/z window lookup is a binary search of the
+        sorted precursor m/z values, returning the contiguous range of zodiaqKeyIdx values
+        (positions in the library) whose precursors fall inside the window. Windows are
+        independent of one another, so overlapping windows each receive every library
+        spectrum inside their bounds. Lookups are memoized, as the same window is often
+        requested repeatedly (such as for each compensation voltage of a DISPA run).
+
+    Attributes
+    ----------
+    _sortedPrecursorMzs : np.ndarray
+        Sorted float array of library precursor m/z values, held in memory.
+    _windowIndexRanges : dict
+        key: (precursorMz, windowWidth) tuple
+        value: (start, stop) tuple of library positions found in the window.
+    """
+
+    def __init__(self, sortedPrecursorMzs):
+        self._sortedPrecursorMzs = np.ascontiguousarray(
+            sortedPrecursorMzs, dtype=np.float64
+        )
+        if np.any(np.diff(self._sortedPrecursorMzs) < 0):
+            raise ValueError("Library precursor m/z values must be sorted.")
+        self._windowIndexRanges = {}
+
+    def __len__(self):
+        return len(self._sortedPrecursorMzs)
+
+    def find_index_range(self, mzWindow: tuple) -> tuple:
+        """
+        Finds the library spectra with a precursor m/z within an m/z window.
+
+        Parameters
+        ----------
+        mzWindow : tuple
+            (precursorMz, windowWidth) tuple. The window includes precursor m/z values between
+                precursorMz - windowWidth / 2 and precursorMz + windowWidth / 2 (inclusive).
+
+        Returns
+        -------
+        indexRange : tuple
+            (start, stop) tuple, where library positions start to stop (exclusive) fall within the
+                window. start and stop are equal if no library spectra are found.
+        """
+        if mzWindow not in self._windowIndexRanges:
+            starts, stops = self.find_index_ranges([mzWindow])
+            self._windowIndexRanges[mzWindow] = (int(starts[0]), int(stops[0]))
+        return self._windowIndexRanges[mzWindow]
+
+    def find_index_ranges(self, mzWindows: list) -> tuple:
+        """
+        Vectorized version of find_index_range for many m/z windows at once.
+
+        Returns
+        -------
+        indexRanges : tuple
+            (starts, stops) tuple of integer arrays, one value per m/z window.
+        """
+        mzWindows = np.asarray(mzWindows, dtype=np.float64).reshape(-1, 2)
+        bottomMzs = mzWindows[:, 0] - mzWindows[:, 1] / 2
+        topMzs = mzWindows[:, 0] + mzWindows[:, 1] / 2
+        starts = np.searchsorted(self._sortedPrecursorMzs, bottomMzs, side="left")
+        stops = np.searchsorted(self._sortedPrecursorMzs, topMzs, side="right")
+        return starts, np.maximum(starts, stops)
@@ -2,4 +2,5 @@ from .libraryLoaderContext import LibraryLoaderContext
 from .libraryLoaderStrategy import LibraryLoaderStrategy
 from .libraryLoaderStrategyMgf import LibraryLoaderStrategyMgf
 from .libraryLoaderStrategyTable import LibraryLoaderStrategyTable
+from .zodiaqLibrary import ZodiaqLibrary
 from . import mappings
@@ -1,8 +1,19 @@
 import re
 import random
+import numpy as np
 from pyteomics import mass
-from zodiaq.utils import format_protein_string_to_list, format_protein_list_to_string
+from zodiaq.utils import (
+    format_protein_string_to_list,
+    format_protein_list_to_string,
+    create_process_pool,
+)
 from zodiaq.loaders.library.modificationMassDict import modificationMassDict
+from zodiaq.loaders.library.zodiaqLibrary import (
+    ZodiaqLibrary,
+    gather_peaks_of_spectra,
+    fragmentNames,
+)
+from zodiaq.loaders.peakPoolingFunctions import concatenate_peak_arrays
 
 nonCleavageAminoAcids = [
     "A",
@@ -25,9 +36,14 @@ nonCleavageAminoAcids = [
 ]
 cleavageAminoAcids = set(["K", "P", "R"])
 modificationRegexStr = r"([A-Z](?:[\[\(][^\)\]]+[\]\)])?)"
+fragmentElements = ["H", "C", "O", "N", "S"]
+terminalGroupElementCounts = [2, 0, 1, 0, 0]
+bIonElementCounts = [-2, 0, -1, 0, 0]
 
 
-def shuffle_peptide_sequence_with_preserved_cleavage_points(peptide):
+def shuffle_peptide_sequence_with_preserved_cleavage_points(
+    peptide, randomGenerator=random
+):
     peptide = re.sub("^(?:[\[\(][^\)\]]+[\]\)])", "", peptide)
     originalPeptide = re.findall(modificationRegexStr, peptide)
     cleavageAALocations = [
@@ -39,7 +55,7 @@ def shuffle_peptide_sequence_with_preserved_cleavage_points(peptide):
     if len(otherAAs) < 2:
         return peptide
     for i in range(100):
-        shuffledPeptide = shuffle_non_cleavage_amino_acids(otherAAs, i)
+        shuffledPeptide = shuffle_non_cleavage_amino_acids(otherAAs, i, randomGenerator)
         shuffledPeptide = insert_cleavage_amino_acids_into_shuffled_peptide(
             shuffledPeptide, cleavageAALocations, originalPeptide
         )
@@ -53,21 +69,21 @@ def shuffle_peptide_sequence_with_preserved_cleavage_points(peptide):
     return "".join(shuffledPeptide)
 
 
-def shuffle_non_cleavage_amino_acids(otherAAs, i):
+def shuffle_non_cleavage_amino_acids(otherAAs, i, randomGenerator=random):
     shuffledPeptide = otherAAs[:]
-    random.shuffle(shuffledPeptide)
+    randomGenerator.shuffle(shuffledPeptide)
     if i % 10 == 0:
         randomly_swap_single_amino_acid_in_shuffled_peptide_to_increase_variability(
-            shuffledPeptide
+            shuffledPeptide, randomGenerator
         )
     return shuffledPeptide
 
 
 def randomly_swap_single_amino_acid_in_shuffled_peptide_to_increase_variability(
-    shuffledPeptide,
+    shuffledPeptide, randomGenerator=random
 ):
-    randomIdx = random.randint(0, len(shuffledPeptide) - 1)
-    shuffledPeptide[randomIdx] = random.choice(nonCleavageAminoAcids)
+    randomIdx = randomGenerator.randint(0, len(shuffledPeptide) - 1)
+    shuffledPeptide[randomIdx] = randomGenerator.choice(nonCleavageAminoAcids)
     return shuffledPeptide
 
 
@@ -120,78 +136,367 @@ def calculate_molecular_mass_of_sequence(sequence, type, charge):
     return unmodifiedMass + modificationMass
 
 
-def add_decoys_to_zodiaq_library(zodiaqLibraryDict):
-    decoyDict = {}
-    for key, value in zodiaqLibraryDict.items():
-        decoyKey, decoyValue = create_decoy_from_target_in_zodiaq_library(
-            key, value.copy()
+def calculate_ion_mzs(sequence, fragmentTypes):
+    """
+    Calculates the m/z values of multiple fragment ions of a peptide, identical to calling
+        calculate_ion_mz for each fragment.
+
+    Extended Summary
+    ----------------
+    The sequence is parsed once into the elemental composition and modification mass of each
+        residue, and the compositions of all b (prefix) and y (suffix) fragments are found
+        with cumulative sums. The m/z value of each requested fragment is then looked up by
+        position. Masses are summed element by element in the order pyteomics uses for the
+        same fragment, which depends on the first residue of the fragment (see
+        determine_element_order_of_residue), so the output is identical to the pyteomics
+        calculation rather than just close to it. Sequences with residues made of other
+        elements (such as selenocysteine), and fragments other than non-empty, positively
+        charged b and y ions, are calculated with calculate_ion_mz instead.
+
+    Parameters
+    ----------
+    sequence : str
+        Peptide sequence, where modifications follow the residue they modify
+            (e.g. 'ABC(UniMod:4)R').
+
+    fragmentTypes : list
+        List of (type, position, charge) tuples, where type is 'b' or 'y'.
+
+    Returns
+    -------
+    mzs : np.ndarray
+        Float array of the m/z value of each fragment.
+    """
+    if len(fragmentTypes) == 0:
+        return np.empty(0, dtype=np.float64)
+    residues = re.findall(modificationRegexStr, sequence)
+    numResidues = len(residues)
+    types, positions, charges = (np.array(values) for values in zip(*fragmentTypes))
+    positions = positions.astype(np.int64)
+    charges = charges.astype(np.int64)
+    isY = types == "y"
+    lengths = np.where(isY & (positions == 0), numResidues, positions)
+    lengths = np.minimum(lengths, numResidues)
+    if (
+        any(residue[0] not in residueElementCounts for residue in residues)
+        or not np.isin(types, ["b", "y"]).all()
+        or (charges <= 0).any()
+        or (lengths <= 0).any()
+    ):
+        return np.array(
+            [
+                calculate_ion_mz(sequence, *fragmentType)
+                for fragmentType in fragmentTypes
+            ]
         )
-        if decoyKey:
-            decoyDict[decoyKey] = decoyValue
-    outputDict = recalculate_zodiaq_library_key_idx_to_account_for_inserted_decoys(
-        decoyDict | zodiaqLibraryDict
+    elementCounts = np.array(
+        [residueElementCounts[residue[0]] for residue in residues], dtype=np.int64
+    )
+    elementOrders = np.array(
+        [residueElementOrders[residue[0]] for residue in residues], dtype=np.int64
+    )
+    modificationMasses = np.array(
+        [
+            modificationMassDict[residue[1:]] if residue[1:] else 0.0
+            for residue in residues
+        ],
+        dtype=np.float64,
     )
-    return outputDict
+    firstResidues = np.where(isY, numResidues - lengths, 0)
 
+    prefixCounts = np.zeros((numResidues + 1, len(fragmentElements)), dtype=np.int64)
+    np.cumsum(elementCounts, axis=0, out=prefixCounts[1:])
+    fragmentCounts = np.where(
+        isY[:, np.newaxis],
+        prefixCounts[-1] - prefixCounts[firstResidues],
+        prefixCounts[lengths],
+    )
+    fragmentCounts += terminalGroupElementCounts
+    fragmentCounts[~isY] += bIonElementCounts
+    fragmentOrders = elementOrders[firstResidues]
+    elementMasses = np.array(
+        [mass.nist_mass[element][0][0] for element in fragmentElements]
+    )
+    orderedMasses = np.take_along_axis(
+        fragmentCounts * elementMasses, fragmentOrders, axis=1
+    )
+    unmodifiedMasses = np.zeros(len(fragmentTypes), dtype=np.float64)
+    for column in range(len(fragmentElements)):
+        unmodifiedMasses += orderedMasses[:, column]
+    unmodifiedMzs = (unmodifiedMasses + mass.nist_mass["H+"][0][0] * charges) / charges
 
-def create_decoy_from_target_in_zodiaq_library(targetKey, targetValue):
-    targetPeptide = targetKey[1]
-    targetPeaks = targetValue["peaks"]
-    fragmentTypes = targetValue["fragmentTypes"]
-    decoyPeptide = shuffle_peptide_sequence_with_preserved_cleavage_points(
-        targetPeptide
+    prefixModificationMasses = np.zeros(numResidues + 1, dtype=np.float64)
+    np.cumsum(modificationMasses, out=prefixModificationMasses[1:])
+    suffixModificationMasses = calculate_suffix_sums_from_left_to_right(
+        modificationMasses
+    )
+    fragmentModificationMasses = np.where(
+        isY,
+        suffixModificationMasses[firstResidues],
+        prefixModificationMasses[lengths],
     )
-    if decoyPeptide == targetPeptide:
-        return None, None
-    decoyMzs = [
-        calculate_ion_mz(decoyPeptide, *fragmentType) for fragmentType in fragmentTypes
+    return unmodifiedMzs + fragmentModificationMasses
+
+
+def calculate_suffix_sums_from_left_to_right(values):
+    """
+    Returns an array where index i holds sum(values[i:]) added from left to right (as the
+        python sum function does), with 0 at index len(values). When at most two values are
+        non-zero the order of addition cannot change the result, so a cumulative sum from the
+        right is used.
+    """
+    suffixSums = np.zeros(len(values) + 1, dtype=np.float64)
+    if np.count_nonzero(values) <= 2:
+        suffixSums[:-1] = np.cumsum(values[::-1])[::-1]
+        return suffixSums
+    for i in range(len(values)):
+        suffixSums[i] = sum(values[i:].tolist())
+    return suffixSums
+
+
+def determine_element_order_of_residue(aminoAcid):
+    """
+    Returns the order in which pyteomics sums the element masses of a fragment starting with
+        the given residue, as indices of fragmentElements.
+
+    Extended Summary
+    ----------------
+    A pyteomics composition lists elements in the order they are first added: hydrogen from
+        the N-terminal group, then the elements of the residues in order. Every residue
+        contains hydrogen, carbon, oxygen and nitrogen, so the order is set by the first
+        residue, followed by sulfur if it only appears in a later residue.
+    """
+    residueElements = [
+        element for element in mass.std_aa_comp[aminoAcid] if element != "H"
     ]
-    decoyPeaks = [(decoyMzs[i], targetPeaks[i][1], -1) for i in range(len(targetPeaks))]
-    targetProteinString = targetValue["proteinName"]
+    order = ["H"] + residueElements
+    order += [element for element in fragmentElements if element not in order]
+    return [fragmentElements.index(element) for element in order]
+
+
+residueElementCounts = {
+    aminoAcid: [composition.get(element, 0) for element in fragmentElements]
+    for aminoAcid, composition in mass.std_aa_comp.items()
+    if len(aminoAcid) == 1
+    and aminoAcid.isupper()
+    and set(composition).issubset(fragmentElements)
+}
+residueElementOrders = {
+    aminoAcid: determine_element_order_of_residue(aminoAcid)
+    for aminoAcid in residueElementCounts
+}
+
+
+def add_decoys_to_library(library, decoySeed=0, numWorkers=1) -> ZodiaqLibrary:
+    """
+    Adds a decoy for each target spectrum of the library that can be shuffled into a different
+        peptide.
+
+    Extended Summary
+    ----------------
+    Each decoy is generated with its own random number generator, seeded by decoySeed and the
+        key of its target (see create_decoy_random_generator). A decoy therefore only depends
+        on its target, so targets can be split into chunks and processed by a pool of worker
+        processes in any order, giving identical decoys for any number of workers. Each decoy
+        keeps the peak intensities, fragment types and remaining metadata of its target. The
+        decoy and target spectra are then sorted together by key, and the peaks of each decoy are
+        sorted by m/z (see ZodiaqLibrary.from_spectra). A decoy that has the key of a target is
+        discarded in favor of the target.
+
+    Parameters
+    ----------
+    library : ZodiaqLibrary
+        Library of target spectra, including 'fragmentType', 'fragmentNumber' and
+            'fragmentCharge' peak metadata.
+
+    decoySeed : int
+        Seed from which the seed of each decoy is derived.
+
+    numWorkers : int
+        Number of worker processes. Decoys are generated in the main process if 1.
+
+    Returns
+    -------
+    library : ZodiaqLibrary
+        The library with decoys added.
+    """
+    targets = _create_decoy_targets(library)
+    if numWorkers > 1 and len(library) > 1:
+        decoySpectra = generate_decoy_spectra_in_parallel(
+            targets, decoySeed, numWorkers
+        )
+    else:
+        decoySpectra = generate_decoy_spectra_of_targets(targets, decoySeed)
+    targetIdxs = np.array(
+        [targetIdx for targetIdx, _, _ in decoySpectra], dtype=np.int64
+    )
+    decoyPeptides = [decoyPeptide for _, decoyPeptide, _ in decoySpectra]
+    decoyPeakOffsets, targetPeakIdx = gather_peaks_of_spectra(
+        library.peakOffsets, targetIdxs
+    )
+    targetMetadata = library.metadata
+    decoyMetadata = {
+        name: values[targetIdxs]
+        for name, values in targetMetadata.items()
+        if name not in ["precursorMz", "peptide"]
+    }
+    decoyMetadata["identification"] = np.array(
+        [
+            f"{decoyPeptide}_{targets[0][targetIdx]}_DECOY"
+            for targetIdx, decoyPeptide, _ in decoySpectra
+        ],
+        dtype=object,
+    )
+    decoyMetadata["proteinName"] = np.array(
+        [
+            create_decoy_protein_string(proteinName)
+            for proteinName in targetMetadata["proteinName"][targetIdxs]
+        ],
+        dtype=object,
+    )
+    decoyMetadata["isDecoy"] = np.ones(len(targetIdxs), dtype=np.int64)
+    return ZodiaqLibrary.from_spectra(
+        np.concatenate(
+            [targetMetadata["precursorMz"][targetIdxs], targetMetadata["precursorMz"]]
+        ),
+        np.concatenate(
+            [np.array(decoyPeptides, dtype=object), targetMetadata["peptide"]]
+        ),
+        np.concatenate(
+            [decoyPeakOffsets[:-1], decoyPeakOffsets[-1] + library.peakOffsets]
+        ),
+        np.concatenate(
+            [
+                concatenate_peak_arrays([decoyMzs for _, _, decoyMzs in decoySpectra]),
+                library.peakMz,
+            ]
+        ),
+        np.concatenate([library.peakIntensity[targetPeakIdx], library.peakIntensity]),
+        {
+            name: np.concatenate([values, targetMetadata[name]])
+            for name, values in decoyMetadata.items()
+        },
+        {
+            name: np.concatenate([values[targetPeakIdx], values])
+            for name, values in library.peakMetadata.items()
+        },
+    )
+
+
+def _create_decoy_targets(library):
+    return (
+        library.metadata["precursorMz"].tolist(),
+        library.metadata["peptide"].tolist(),
+        np.asarray(library.peakOffsets),
+        *(library.peakMetadata[name] for name in fragmentNames),
+    )
+
+
+def generate_decoy_spectra_of_targets(targets, decoySeed, start=0, stop=None):
+    """
+    Creates the decoy of each target spectrum start to stop that can be shuffled into a
+        different peptide.
+
+    Parameters
+    ----------
+    targets : tuple
+        (precursor m/z list, peptide list, peak offset array, fragment type array, fragment
+            number array, fragment charge array) of the target spectra.
+
+    decoySeed : int
+        Seed from which the seed of each decoy is derived.
+
+    start, stop : int
+        Range of the target spectra to create decoys of. Defaults to all targets.
+
+    Returns
+    -------
+    decoySpectra : list
+        One (target index, decoy peptide, decoy peak m/z array) tuple for each decoy, where
+            the decoy peaks are in the order of the target peaks.
+    """
+    precursorMzs, peptides, peakOffsets, *fragmentArrays = targets
+    if stop is None:
+        stop = len(peptides)
+    decoySpectra = []
+    for targetIdx in range(start, stop):
+        targetPeptide = peptides[targetIdx]
+        decoyPeptide = shuffle_peptide_sequence_with_preserved_cleavage_points(
+            targetPeptide,
+            create_decoy_random_generator(
+                decoySeed, (precursorMzs[targetIdx], targetPeptide)
+            ),
+        )
+        if decoyPeptide == targetPeptide:
+            continue
+        peakStart, peakStop = peakOffsets[targetIdx], peakOffsets[targetIdx + 1]
+        fragmentTypes = list(
+            zip(*(values[peakStart:peakStop].tolist() for values in fragmentArrays))
+        )
+        decoySpectra.append(
+            (targetIdx, decoyPeptide, calculate_ion_mzs(decoyPeptide, fragmentTypes))
+        )
+    return decoySpectra
+
+
+def generate_decoy_spectra_in_parallel(
+    targets, decoySeed, numWorkers, chunksPerWorker=4
+):
+    """
+    Parallel equivalent of generate_decoy_spectra_of_targets. Targets are split into
+        contiguous chunks, and the decoys of each chunk are returned in chunk order.
+    """
+    numTargets = len(targets[1])
+    numChunks = min(numTargets, numWorkers * chunksPerWorker)
+    chunkBounds = np.linspace(0, numTargets, numChunks + 1).astype(int)
+    with create_process_pool(
+        numWorkers,
+        initializer=_initialize_decoy_spectra_worker,
+        initargs=(targets, decoySeed),
+    ) as pool:
+        decoyChunks = pool.map(
+            _generate_decoy_spectra_of_chunk, zip(chunkBounds[:-1], chunkBounds[1:])
+        )
+        return [
+            decoySpectrum for decoyChunk in decoyChunks for decoySpectrum in decoyChunk
+        ]
+
+
+def create_decoy_protein_string(targetProteinString):
     decoyProteins = format_protein_string_to_list(targetProteinString)
     decoyProteins = [f"DECOY_{protein}" for protein in decoyProteins]
-    decoyProteinString = format_protein_list_to_string(decoyProteins)
-    decoyValue = targetValue
-    decoyValue["identification"] = f"{decoyPeptide}_{targetKey[0]}_DECOY"
-    decoyValue["proteinName"] = decoyProteinString
-    decoyValue["peaks"] = decoyPeaks
-    decoyValue["isDecoy"] = 1
-    decoyValue["zodiaqKeyIdx"] = -1
-    return (targetKey[0], decoyPeptide), decoyValue
-
-
-def recalculate_zodiaq_library_key_idx_to_account_for_inserted_decoys(outputDict):
-    sortedKeys = sorted(outputDict)
-    for i in range(len(sortedKeys)):
-        key = sortedKeys[i]
-        value = outputDict[key]
-        value["peaks"] = [(x[0], x[1], i) for x in value["peaks"]]
-        value["zodiaqKeyIdx"] = i
-        outputDict[key] = value
-    return outputDict
-
-
-def determine_if_decoys_should_be_generated(zodiaqLibraryDict):
-    if there_are_any_decoys_in_library(zodiaqLibraryDict):
-        return False
-    if any_library_entries_dont_have_fragment_type_data_requirement_for_decoy_generation(
-        zodiaqLibraryDict
-    ):
-        return False
-    return True
+    return format_protein_list_to_string(decoyProteins)
 
 
-def there_are_any_decoys_in_library(zodiaqLibraryDict):
-    for key, value in zodiaqLibraryDict.items():
-        if value["isDecoy"]:
-            return True
-    return False
+def create_decoy_random_generator(decoySeed, targetKey):
+    """
+    Returns a random number generator seeded by decoySeed and the (precursorMz, peptide) key
+        of a target spectrum, so the decoy of a target is reproducible on its own.
+    """
+    precursorMz, peptide = targetKey
+    return random.Random(f"{decoySeed}_{float(precursorMz)!r}_{peptide}")
 
 
-def any_library_entries_dont_have_fragment_type_data_requirement_for_decoy_generation(
-    zodiaqLibraryDict,
-):
-    for key, value in zodiaqLibraryDict.items():
-        if "fragmentTypes" not in value:
-            return True
-    return False
+_decoyWorkerState = {}
+
+
+def _initialize_decoy_spectra_worker(targets, decoySeed):
+    _decoyWorkerState["targets"] = targets
+    _decoyWorkerState["decoySeed"] = decoySeed
+
+
+def _generate_decoy_spectra_of_chunk(chunkBounds):
+    start, stop = chunkBounds
+    return generate_decoy_spectra_of_targets(
+        _decoyWorkerState["targets"], _decoyWorkerState["decoySeed"], start, stop
+    )
+
+
+def determine_if_decoys_should_be_generated_for_library(library):
+    """
+    Decoys are only generated for a library without decoys, and only if the fragment type of
+        every peak is known.
+    """
+    if np.any(library.metadata["isDecoy"]):
+        return False
+    return all(name in library.peakMetadata for name in fragmentNames)
@@ -0,0 +1,142 @@
+from zodiaq.loaders.library.zodiaqLibrary import ZodiaqLibrary, manifestFileName
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+libraryCacheFormatVersion = 2
+libraryCacheSuffix = ".zodiaqlib-"
+
+
+def calculate_file_content_hash(filePath: os.PathLike, chunkSize=2**20) -> str:
+    fileHash = hashlib.sha256()
+    with open(filePath, "rb") as f:
+        for chunk in iter(lambda: f.read(chunkSize), b""):
+            fileHash.update(chunk)
+    return fileHash.hexdigest()
+
+
+def create_library_cache_key(fileHash: str, loaderParameters: dict) -> str:
+    """
+    Combines the content hash of a library file with the parameters used to load it.
+        Changing either the library file or the loading parameters results in a new key.
+    """
+    cacheKeyContents = json.dumps(
+        {
+            "fileHash": fileHash,
+            "loaderParameters": loaderParameters,
+            "cacheFormatVersion": libraryCacheFormatVersion,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(cacheKeyContents.encode("utf-8")).hexdigest()
+
+
+def get_library_cache_path(
+    libraryFilePath: os.PathLike, cacheKey: str, cacheDirectory=None
+) -> str:
+    """
+    Returns the path of the compiled library directory. The compiled library is placed next
+        to the library file unless a cache directory is provided.
+    """
+    return get_cache_path(libraryFilePath, cacheKey, libraryCacheSuffix, cacheDirectory)
+
+
+def get_cache_path(
+    filePath: os.PathLike, cacheKey: str, cacheSuffix: str, cacheDirectory=None
+) -> str:
+    if cacheDirectory is None:
+        cacheDirectory = os.path.dirname(os.path.abspath(filePath))
+    fileName = os.path.basename(filePath)
+    return os.path.join(cacheDirectory, f"{fileName}{cacheSuffix}{cacheKey[:16]}")
+
+
+def load_zodiaq_library_using_cache(
+    strategy, libraryFilePath: os.PathLike, isTest, cacheDirectory=None, numWorkers=1
+) -> ZodiaqLibrary:
+    """
+    Loads a compiled library from the cache if one exists for the library file and loading
+        parameters. Otherwise, the library is loaded from the library file with the given
+        strategy and the compiled library is written to the cache for subsequent runs.
+
+    Parameters
+    ----------
+    strategy : LibraryLoaderStrategy
+        The concrete library loading strategy used when the library is not cached.
+
+    libraryFilePath : string (os.PathLike format)
+        Path to the library file.
+
+    isTest : bool
+        Passed to the strategy. Part of the cache key, as it disables decoy generation.
+
+    cacheDirectory : string (os.PathLike format)
+        Directory in which compiled libraries are kept. Defaults to the directory of the
+            library file.
+
+    numWorkers : int
+        Passed to the strategy. Not part of the cache key, as it does not change the library.
+
+    Returns
+    -------
+    zodiaqLibrary : ZodiaqLibrary
+    """
+    fileHash = calculate_file_content_hash(libraryFilePath)
+    loaderParameters = strategy.get_loader_parameters(isTest)
+    cacheKey = create_library_cache_key(fileHash, loaderParameters)
+    cachePath = get_library_cache_path(libraryFilePath, cacheKey, cacheDirectory)
+    if os.path.exists(os.path.join(cachePath, manifestFileName)):
+        return ZodiaqLibrary.load(cachePath)
+    library = strategy.load_zodiaq_library_from_file(
+        libraryFilePath, isTest, numWorkers
+    )
+    remove_outdated_caches(
+        libraryFilePath, fileHash, libraryCacheSuffix, cacheDirectory
+    )
+    write_to_cache(
+        library,
+        cachePath,
+        {"fileHash": fileHash, "loaderParameters": loaderParameters},
+    )
+    return library
+
+
+def write_to_cache(compiledData, cachePath, manifestEntries) -> None:
+    """
+    Saves compiled data (such as a ZodiaqLibrary) to a temporary directory that is renamed
+        once complete, so an interrupted run never leaves partial data at the cache path.
+        The temporary directory is removed whether or not saving succeeds. Failing to write
+        the cache to disk (or losing the rename to a concurrent run) is not an error, as the
+        compiled data is already loaded, but any other error is raised.
+    """
+    tempPath = tempfile.mkdtemp(
+        prefix=f"{os.path.basename(cachePath)}.tmp-", dir=os.path.dirname(cachePath)
+    )
+    try:
+        compiledData.save(tempPath, manifestEntries)
+        os.rename(tempPath, cachePath)
+    except OSError:
+        pass
+    finally:
+        shutil.rmtree(tempPath, ignore_errors=True)
+
+
+def remove_outdated_caches(
+    filePath: os.PathLike, fileHash: str, cacheSuffix: str, cacheDirectory=None
+) -> None:
+    """
+    Removes caches of a file that were compiled from previous versions of its contents.
+    """
+    cacheDirectory = os.path.dirname(
+        get_cache_path(filePath, "", cacheSuffix, cacheDirectory)
+    )
+    cachePrefix = f"{os.path.basename(filePath)}{cacheSuffix}"
+    for fileName in os.listdir(cacheDirectory):
+        manifestFile = os.path.join(cacheDirectory, fileName, manifestFileName)
+        if not fileName.startswith(cachePrefix) or not os.path.exists(manifestFile):
+            continue
+        with open(manifestFile) as f:
+            cachedFileHash = json.load(f).get("fileHash")
+        if cachedFileHash != fileHash:
+            shutil.rmtree(os.path.join(cacheDirectory, fileName), ignore_errors=True)
@@ -4,6 +4,9 @@ from zodiaq.loaders.library.libraryLoaderStrategyTable import (
 from zodiaq.loaders.library.libraryLoaderStrategyMgf import (
     LibraryLoaderStrategyMgf as Mgf,
 )
+from zodiaq.loaders.library.libraryCacheFunctions import (
+    load_zodiaq_library_using_cache,
+)
 import os
 
 
@@ -18,10 +21,19 @@ class LibraryLoaderContext:
         strategy class will be used.
     _strategy : LibraryLoaderStrategy
         The concrete library loading strategy class.
+    _isCached : bool
+        If true, the compiled library is written to (and subsequently read from) an on-disk
+        cache keyed by the library file contents and loading parameters.
+    _cacheDirectory : string (os.PathLike format)
+        Directory for the compiled library cache. Defaults to the directory of the library file.
     """
 
-    def __init__(self, libraryFilePath: os.PathLike):
+    def __init__(
+        self, libraryFilePath: os.PathLike, isCached=False, cacheDirectory=None
+    ):
         self._libraryFilePath = libraryFilePath
+        self._isCached = isCached
+        self._cacheDirectory = cacheDirectory
         if libraryFilePath.endswith(".tsv") or libraryFilePath.endswith(".csv"):
             self._strategy = Table()
         elif libraryFilePath.endswith(".mgf"):
@@ -31,8 +43,25 @@ class LibraryLoaderContext:
                 "The .msp library format is not currently supported. If the library file was generated via prosit, please reset the output into a tab-delimited (.tsv) format."
             )
 
-    def load_zodiaq_library_dict(self, isTest=False):
+    def load_zodiaq_library_dict(self, isTest=False, numWorkers=1):
         """See 'load_zodiaq_library_dict_from_file' in 'LibraryLoaderStrategy'"""
         return self._strategy.load_zodiaq_library_dict_from_file(
-            self._libraryFilePath, isTest
+            self._libraryFilePath, isTest, numWorkers
+        )
+
+    def load_zodiaq_library(self, isTest=False, numWorkers=1):
+        """
+        See 'load_zodiaq_library_from_file' in 'LibraryLoaderStrategy' and
+            'load_zodiaq_library_using_cache' in 'libraryCacheFunctions.py'
+        """
+        if self._isCached:
+            return load_zodiaq_library_using_cache(
+                self._strategy,
+                self._libraryFilePath,
+                isTest,
+                self._cacheDirectory,
+                numWorkers,
+            )
+        return self._strategy.load_zodiaq_library_from_file(
+            self._libraryFilePath, isTest, numWorkers
         )
@@ -1,13 +1,18 @@
 from abc import ABC, abstractmethod
 import os
 from zodiaq.loaders.library.decoyGenerationFunctions import (
-    determine_if_decoys_should_be_generated,
-    add_decoys_to_zodiaq_library,
+    determine_if_decoys_should_be_generated_for_library,
+    add_decoys_to_library,
 )
-import random
+from zodiaq.loaders.library.zodiaqLibrary import ZodiaqLibrary
+import numpy as np
 
 
 class LibraryLoaderStrategy(ABC):
+    maxPeakNum = 10
+    decoySeed = 0
+    numWorkers = 1
+
     def __init__(self):
         self.rawUploadedLibraryObject = None
 
@@ -35,9 +40,9 @@ class LibraryLoaderStrategy(ABC):
         pass
 
     @abstractmethod
-    def _format_raw_library_object_into_zodiaq_library_dict(self) -> dict:
+    def _format_raw_library_object_into_zodiaq_library(self) -> ZodiaqLibrary:
         """
-        Creates a standardized dictionary object comprised of library spectra.
+        Creates a columnar library of the library spectra, without decoys.
             Relies on a raw library object created as an attribute 'rawLib__' in the
                 _load_raw_library_object_from_file function.
             This is an abstract method and must be implemented in child classes.
@@ -46,6 +51,27 @@ class LibraryLoaderStrategy(ABC):
         ----------
         None.
 
+        Returns
+        -------
+        zodiaqLibrary : ZodiaqLibrary
+            See ZodiaqLibrary in zodiaqLibrary.py. The metadata includes 'precursorCharge',
+                'identification', 'proteinName' and 'isDecoy' values. When the library file
+                contains fragment data, the peak metadata includes 'fragmentType',
+                'fragmentNumber' and 'fragmentCharge' values, which are needed to generate
+                decoys.
+        """
+        pass
+
+    def _format_raw_library_object_into_zodiaq_library_dict(self) -> dict:
+        """
+        Creates a standardized dictionary object comprised of library spectra.
+            Kept for compatibility, as it is converted from the output of
+                _format_raw_library_object_into_zodiaq_library.
+
+        Parameters
+        ----------
+        None.
+
         Returns
         -------
         zodiaqLibDict : dict
@@ -62,92 +88,111 @@ class LibraryLoaderStrategy(ABC):
                     isDecoy - int, indicating if the spectrum represents a decoy
                         0 - is not a decoy
                         1 - is a decoy
+                    fragmentTypes - list of (type, number, charge) tuples of the fragment of
+                        each peak. Only included if the library file contains fragment data.
         """
-        pass
+        return (
+            self._format_raw_library_object_into_zodiaq_library().to_zodiaq_library_dict()
+        )
 
     def load_zodiaq_library_dict_from_file(
-        self, libraryFilePath: os.PathLike, isTest
+        self, libraryFilePath: os.PathLike, isTest, numWorkers=1
     ) -> dict:
         """
         Outputs a standardized dictionary object from a library file.
             The LibraryLoaderContext class calls this function, which uses
             the concrete-strategy-implemented abstract methods of the appropriate
-            library format.
+            library format. Kept for compatibility, as the library is loaded in
+            columnar format (see load_zodiaq_library_from_file) and then converted.
 
         Parameters
         ----------
         libraryFilePath : string (os.PathLike format)
             Path to the library file.
 
+        numWorkers : int
+            Number of worker processes used to read the library file (where supported) and
+                generate decoys. The library is identical for any number of workers.
+
         Returns
         -------
         zodiaqLibDict : dict
             see _format_raw_library_object_into_zodiaq_library_dict return value.
         """
-        random.seed(0)
-        self._load_raw_library_object_from_file(libraryFilePath)
-        zodiaqLibDict = self._format_raw_library_object_into_zodiaq_library_dict()
-        format_proteins_into_list_format(zodiaqLibDict)
-        if determine_if_decoys_should_be_generated(zodiaqLibDict) and not isTest:
-            zodiaqLibDict = add_decoys_to_zodiaq_library(zodiaqLibDict)
-        return zodiaqLibDict
+        return self._load_zodiaq_library_with_peak_metadata(
+            libraryFilePath, isTest, numWorkers
+        ).to_zodiaq_library_dict()
 
+    def load_zodiaq_library_from_file(
+        self, libraryFilePath: os.PathLike, isTest, numWorkers=1
+    ) -> ZodiaqLibrary:
+        """
+        Outputs a columnar library object from a library file.
 
-def format_proteins_into_list_format(zodiaqLibDict):
-    for key, value in zodiaqLibDict.items():
-        if value["proteinName"] and not value["proteinName"][:1].isdigit():
-            value["proteinName"] = f'1/{value["proteinName"]}'
-
-
-def create_peaks_from_mz_intensity_lists_and_zodiaq_key_id(
-    mz: list, intensities: list, id: int
-) -> list:
-    """
-    Combines matching mz and intensity lists into a list of tuples.
-        Includes a spectrum-identififying index as a third value of each tuple.
-        (peak mz value, peak intensity value, zodiaqLibDict key idx)
-
-    Parameters
-    ----------
-    mz : list
-        List of floats corresponding to peak mz values.
-
-    intensities : list
-        List of floats corresponding to peak intensity values.
+        Parameters
+        ----------
+        libraryFilePath : string (os.PathLike format)
+            Path to the library file.
 
-    id : int
-        A spectrum-identififying index value.
+        numWorkers : int
+            Number of worker processes used to read the library file (where supported) and
+                generate decoys. The library is identical for any number of workers.
 
-    Returns
-    -------
-    peaks : list
-        see _format_raw_library_object_into_zodiaq_library_dict return value for 'peak'.
-    """
-    idList = [id] * len(mz)
-    return list(zip(mz, intensities, idList))
+        Returns
+        -------
+        zodiaqLibrary : ZodiaqLibrary
+            The library represented by the load_zodiaq_library_dict_from_file return value,
+                stored in contiguous arrays. See ZodiaqLibrary in zodiaqLibrary.py.
+        """
+        library = self._load_zodiaq_library_with_peak_metadata(
+            libraryFilePath, isTest, numWorkers
+        )
+        library.peakMetadata = {}
+        return library
+
+    def _load_zodiaq_library_with_peak_metadata(
+        self, libraryFilePath: os.PathLike, isTest, numWorkers
+    ) -> ZodiaqLibrary:
+        self.numWorkers = numWorkers
+        self._load_raw_library_object_from_file(libraryFilePath)
+        library = self._format_raw_library_object_into_zodiaq_library()
+        self.rawUploadedLibraryObject = None
+        library.metadata["proteinName"] = format_protein_names_into_list_format(
+            library.metadata["proteinName"]
+        )
+        if determine_if_decoys_should_be_generated_for_library(library) and not isTest:
+            library = add_decoys_to_library(library, self.decoySeed, self.numWorkers)
+        return library
+
+    def get_loader_parameters(self, isTest) -> dict:
+        """
+        Returns the parameters that determine the contents of the loaded library. A compiled
+            library can only be reused if these parameters are unchanged.
+        """
+        return {
+            "strategy": type(self).__name__,
+            "maxPeakNum": self.maxPeakNum,
+            "decoySeed": self.decoySeed,
+            "isTest": bool(isTest),
+        }
 
 
-def remove_low_intensity_peaks_below_max_peak_num(peaks: list, maxPeakNum: int) -> list:
+def format_protein_names_into_list_format(proteinNames: np.ndarray) -> np.ndarray:
     """
-    Reduces a pre-existing list of peaks to a maximum length,
-        prioritizing peak intensity values.
-
-    Parameters
-    ----------
-    peaks : list
-        see _format_raw_library_object_into_zodiaq_library_dict return value for 'peak'.
-
-    maxPeakNum : int
-        Maximum number of peaks to be returned.
-
-    Returns
-    -------
-    peaks : list
-        see _format_raw_library_object_into_zodiaq_library_dict return value for 'peak',
-        but reduced to a smaller length if the original length was greater than the max length.
+    Returns the protein names of library spectra in the protein group format of
+        format_protein_list_to_string. A name that does not start with a protein count is
+        treated as a group of one protein, and empty names are kept as they are.
     """
-    peaks.sort(key=lambda x: x[1], reverse=True)
-    return peaks[:maxPeakNum]
+    formattedProteinNames = np.empty(len(proteinNames), dtype=object)
+    formattedProteinNames[:] = [
+        (
+            f"1/{proteinName}"
+            if proteinName and not proteinName[:1].isdigit()
+            else proteinName
+        )
+        for proteinName in proteinNames.tolist()
+    ]
+    return formattedProteinNames
 
 
 finalVariableNames = {
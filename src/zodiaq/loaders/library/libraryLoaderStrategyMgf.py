@@ -1,76 +1,236 @@
 from zodiaq.loaders.library.libraryLoaderStrategy import (
     LibraryLoaderStrategy,
-    create_peaks_from_mz_intensity_lists_and_zodiaq_key_id,
-    remove_low_intensity_peaks_below_max_peak_num,
     finalVariableNames,
 )
+from zodiaq.loaders.library.zodiaqLibrary import ZodiaqLibrary
+from zodiaq.utils import create_process_pool
+from operator import itemgetter
+from array import array
+import heapq
 import os
 from pyteomics import mgf
+import numpy as np
 import re
 
+commentCharacters = ("#", ";", "!", "/")
+spectrumMetadataNames = [
+    finalVariableNames["precursorCharge"],
+    finalVariableNames["identification"],
+    finalVariableNames["proteinName"],
+    finalVariableNames["isDecoy"],
+]
+
 
 class LibraryLoaderStrategyMgf(LibraryLoaderStrategy):
     """
     Concrete strategy implementation of the LibraryLoaderStrategy strategy class specific for
         loading mgf library files into a standardized dictionary for use in zoDIAq.
 
+    Extended Summary
+    ----------------
+    The mgf file is read sequentially, one BEGIN IONS/END IONS block at a time, keeping only the
+        maxPeakNum most intense peaks of each spectrum as soon as the block is read. The metadata
+        and peaks of each block are appended to growing arrays, which are used to create the
+        library. Spectrum parameters are interpreted as in pyteomics.mgf (including parameters
+        given in the file header). With more than one worker, the file is split into byte ranges
+        that are read by separate processes, and the spectra of each range are combined in file
+        order.
+
     Attributes
     ----------
-    rawUploadedLibraryObject : pyteomics.mgf.IndexedMGF
-        The original mgf library as loaded using the pyteomics mgf class.
+    rawUploadedLibraryObject : dict
+        The spectra of the mgf library in file order, as returned by read_mgf_library_spectra.
     """
 
     def _load_raw_library_object_from_file(self, libraryFilePath: os.PathLike) -> None:
-        self.rawUploadedLibraryObject = mgf.read(libraryFilePath)
-
-    def _format_raw_library_object_into_zodiaq_library_dict(self) -> dict:
-        maxPeakNum = 10
-        zodiaqLibDict = {}
-        for zodiaqKeyIdx in range(len(self.rawUploadedLibraryObject)):
-            librarySpectrum = self.rawUploadedLibraryObject[zodiaqKeyIdx]
-            zodiaqKey, zodiaqValue = _create_zodiaq_library_entry(
-                librarySpectrum, maxPeakNum, zodiaqKeyIdx
-            )
-            zodiaqLibDict[zodiaqKey] = zodiaqValue
-        zodiaqLibDict = _rewrite_zodiaq_key_idx_to_correspond_to_sorted_zodiaq_key(
-            zodiaqLibDict
+        self.rawUploadedLibraryObject = read_mgf_library_spectra(
+            libraryFilePath, self.maxPeakNum, self.numWorkers
         )
-        return zodiaqLibDict
 
-
-def _rewrite_zodiaq_key_idx_to_correspond_to_sorted_zodiaq_key(zodiaqLibDict):
-    sortedLibKeys = sorted(zodiaqLibDict.keys())
-    for i, key in enumerate(sortedLibKeys):
-        oldPeaks = zodiaqLibDict[key][finalVariableNames["peaks"]]
-        newPeaks = [(peak[0], peak[1], i) for peak in oldPeaks]
-        zodiaqLibDict[key][finalVariableNames["peaks"]] = newPeaks
-    return zodiaqLibDict
+    def _format_raw_library_object_into_zodiaq_library(self) -> ZodiaqLibrary:
+        """abstract class implementation - see 'libraryLoaderStrategy.py' for details"""
+        librarySpectra = self.rawUploadedLibraryObject
+        peakOffsets = np.zeros(len(librarySpectra["peakCounts"]) + 1, dtype=np.int64)
+        np.cumsum(librarySpectra["peakCounts"], out=peakOffsets[1:])
+        return ZodiaqLibrary.from_spectra(
+            librarySpectra["precursorMz"],
+            librarySpectra["peptide"],
+            peakOffsets,
+            librarySpectra["peakMz"],
+            librarySpectra["peakIntensity"],
+            {name: librarySpectra[name] for name in spectrumMetadataNames},
+        )
 
 
-def _create_zodiaq_library_entry(
-    librarySpectrum: dict, maxPeakNum: int, zodiaqKeyIdx: int
+def read_mgf_library_spectra(
+    libraryFilePath: os.PathLike, maxPeakNum: int, numWorkers=1, shardsPerWorker=4
 ) -> dict:
-    (
-        zodiaqKey,
-        precursorCharge,
-        identifier,
-        proteinName,
-        isDecoy,
-    ) = _extract_variables_from_spectrum_metadata(librarySpectrum["params"])
-    peaks = create_peaks_from_mz_intensity_lists_and_zodiaq_key_id(
-        librarySpectrum["m/z array"], librarySpectrum["intensity array"], zodiaqKeyIdx
-    )
-    reducedPeaks = remove_low_intensity_peaks_below_max_peak_num(peaks, maxPeakNum)
-    return zodiaqKey, {
-        finalVariableNames["precursorCharge"]: precursorCharge,
-        finalVariableNames["identification"]: identifier,
-        finalVariableNames["proteinName"]: proteinName,
-        finalVariableNames["peaks"]: sorted(reducedPeaks),
-        finalVariableNames["zodiaqKeyIdx"]: zodiaqKeyIdx,
-        finalVariableNames["isDecoy"]: isDecoy,
+    """
+    Reads the spectra of an mgf library file in a single pass, keeping the most intense peaks
+        of each spectrum.
+
+    Parameters
+    ----------
+    libraryFilePath : string (os.PathLike format)
+        Path to the mgf library file.
+
+    maxPeakNum : int
+        Maximum number of peaks kept for each spectrum.
+
+    numWorkers : int
+        Number of worker processes reading byte ranges of the file. The spectra are identical
+            for any number of workers.
+
+    shardsPerWorker : int
+        Number of byte ranges read by each worker process.
+
+    Returns
+    -------
+    librarySpectra : dict
+        Arrays holding one value per spectrum, in file order:
+            precursorMz - float array of the precursor m/z value (the first PEPMASS value).
+            peptide - object array of the peptide sequence (SEQ).
+            precursorCharge - integer array of the precursor charge.
+            identification - object array of the spectrum title (TITLE).
+            proteinName - object array of the protein (PROTEIN), or '' if not given.
+            isDecoy - integer array, 1 if the title contains 'DECOY' and 0 otherwise.
+            peakCounts - integer array of the number of peaks kept.
+        And arrays holding the kept peaks of all spectra, one spectrum after another:
+            peakMz, peakIntensity - float arrays of the peak m/z and intensity values.
+        Spectrum parameters are parsed as by pyteomics.mgf. The peaks of a spectrum are
+            its maxPeakNum most intense peaks (earlier peaks are kept first among peaks of
+            equal intensity), sorted by m/z and then intensity.
+    """
+    header = _read_mgf_header(libraryFilePath)
+    fileSize = os.path.getsize(libraryFilePath)
+    if numWorkers <= 1:
+        return _read_mgf_spectra(libraryFilePath, header, maxPeakNum, 0, fileSize)
+    shardBounds = np.linspace(0, fileSize, numWorkers * shardsPerWorker + 1).astype(int)
+    with create_process_pool(
+        numWorkers,
+        initializer=_initialize_mgf_worker,
+        initargs=(libraryFilePath, header, maxPeakNum),
+    ) as pool:
+        spectrumShards = list(
+            pool.map(_read_mgf_spectra_of_shard, zip(shardBounds[:-1], shardBounds[1:]))
+        )
+    return {
+        name: np.concatenate([spectrumShard[name] for spectrumShard in spectrumShards])
+        for name in spectrumShards[0]
+    }
+
+
+def _read_mgf_header(libraryFilePath):
+    header = {}
+    with open(libraryFilePath, "rb") as f:
+        for line in f:
+            line = line.decode("utf-8")
+            if line.strip() == "BEGIN IONS":
+                break
+            keyValue = line.split("=")
+            if len(keyValue) == 2:
+                header[keyValue[0].lower()] = keyValue[1].strip()
+    if "charge" in header:
+        header["charge"] = mgf.MGFBase.parse_precursor_charge(header["charge"], True)
+    return header
+
+
+def _read_mgf_spectra(libraryFilePath, header, maxPeakNum, start, stop):
+    """
+    Reads the spectra of an mgf file whose BEGIN IONS line starts within the byte range
+        [start, stop), in the format of read_mgf_library_spectra.
+    """
+    precursorMzs, peptides, precursorCharges = array("d"), [], array("q")
+    identifications, proteinNames, isDecoys = [], [], array("q")
+    peakCounts, peakMzs, peakIntensities = array("q"), array("d"), array("d")
+    with open(libraryFilePath, "rb") as f:
+        position = start
+        if start > 0:
+            f.seek(start - 1)
+            position += len(f.readline()) - 1
+        params, peaks = None, None
+        for line in f:
+            linePosition, position = position, position + len(line)
+            line = line.decode("utf-8").strip()
+            if params is None:
+                if linePosition >= stop:
+                    break
+                if line == "BEGIN IONS":
+                    params, peaks = header.copy(), []
+            elif not line or line[0] in commentCharacters:
+                continue
+            elif line == "END IONS":
+                (
+                    (precursorMz, peptide),
+                    precursorCharge,
+                    identification,
+                    proteinName,
+                    isDecoy,
+                ) = _extract_variables_from_spectrum_metadata(
+                    _finalize_spectrum_params(params)
+                )
+                precursorMzs.append(precursorMz)
+                peptides.append(peptide)
+                precursorCharges.append(precursorCharge)
+                identifications.append(identification)
+                proteinNames.append(proteinName)
+                isDecoys.append(isDecoy)
+                keptPeaks = sorted(heapq.nlargest(maxPeakNum, peaks, key=itemgetter(1)))
+                peakCounts.append(len(keptPeaks))
+                peakMzs.extend(mz for mz, _ in keptPeaks)
+                peakIntensities.extend(intensity for _, intensity in keptPeaks)
+                params, peaks = None, None
+            elif "=" in line:
+                key, value = line.split("=", 1)
+                params[key.lower()] = value.strip()
+            else:
+                values = line.split()
+                peaks.append((float(values[0]), float(values[1])))
+    return {
+        "precursorMz": np.frombuffer(precursorMzs, dtype=np.float64),
+        "peptide": np.array(peptides, dtype=object),
+        finalVariableNames["precursorCharge"]: np.frombuffer(
+            precursorCharges, dtype=np.int64
+        ),
+        finalVariableNames["identification"]: np.array(identifications, dtype=object),
+        finalVariableNames["proteinName"]: np.array(proteinNames, dtype=object),
+        finalVariableNames["isDecoy"]: np.frombuffer(isDecoys, dtype=np.int64),
+        "peakCounts": np.frombuffer(peakCounts, dtype=np.int64),
+        "peakMz": np.frombuffer(peakMzs, dtype=np.float64),
+        "peakIntensity": np.frombuffer(peakIntensities, dtype=np.float64),
     }
 
 
+def _finalize_spectrum_params(params):
+    if "pepmass" in params:
+        params["pepmass"], charge = mgf.MGFBase.parse_pepmass_charge(params["pepmass"])
+        if charge is not None:
+            params["charge"] = charge
+    if isinstance(params.get("charge"), str):
+        params["charge"] = mgf.MGFBase.parse_precursor_charge(params["charge"], True)
+    return params
+
+
+_mgfWorkerState = {}
+
+
+def _initialize_mgf_worker(libraryFilePath, header, maxPeakNum):
+    _mgfWorkerState["libraryFilePath"] = libraryFilePath
+    _mgfWorkerState["header"] = header
+    _mgfWorkerState["maxPeakNum"] = maxPeakNum
+
+
+def _read_mgf_spectra_of_shard(shardBounds):
+    start, stop = shardBounds
+    return _read_mgf_spectra(
+        _mgfWorkerState["libraryFilePath"],
+        _mgfWorkerState["header"],
+        _mgfWorkerState["maxPeakNum"],
+        start,
+        stop,
+    )
+
+
 def _extract_variables_from_spectrum_metadata(metadata):
     zodiaqKey = (metadata["pepmass"][0], metadata["seq"])
     charge = int(re.sub("[+-]", "", str(metadata["charge"][0])))
@@ -1,9 +1,8 @@
 from zodiaq.loaders.library.libraryLoaderStrategy import (
     LibraryLoaderStrategy,
-    create_peaks_from_mz_intensity_lists_and_zodiaq_key_id,
-    remove_low_intensity_peaks_below_max_peak_num,
     finalVariableNames,
 )
+from zodiaq.loaders.library.zodiaqLibrary import ZodiaqLibrary, fragmentNames
 from zodiaq.loaders.library.mappings import (
     newColumns,
     oldColumnsSpectrast,
@@ -11,8 +10,21 @@ from zodiaq.loaders.library.mappings import (
     oldColumnsProsit,
 )
 import pandas as pd
+from pandas.api.types import union_categoricals
+import numpy as np
 import os
 
+categoricalColumns = ["peptideName", "identification", "proteinName", "fragmentType"]
+peakColumns = [
+    "precursorMz",
+    "peptideName",
+    "peakMz",
+    "peakIntensity",
+    "fragmentType",
+    "fragmentNumber",
+    "fragmentCharge",
+]
+
 
 class LibraryLoaderStrategyTable(LibraryLoaderStrategy):
     """
@@ -28,43 +40,83 @@ class LibraryLoaderStrategyTable(LibraryLoaderStrategy):
         The 'old' column name list of any of these three formats is converted into a single standard
         of 'new' column name list to avoid needing to switch back and forth through the code.
 
+    Library files are read in chunks of chunkSize rows, reading only the mapped columns and
+        storing text columns as categoricals (see categoricalColumns). Only the maxPeakNum most
+        intense peaks of each key in a chunk are kept before the next chunk is read, so the rows
+        held in memory are bounded by chunkSize plus the kept peaks, rather than by the size of
+        the file. The kept peaks are then organized into the arrays of the library.
+
     Attributes
     ----------
+    chunkSize : int
+        Number of rows of the library file read at a time.
     rawUploadedLibraryObject : pd.DataFrame
-        The original table as loaded from the .tsv or .csv library file. The relevant columns of this
-        table are renamed ('old' -> 'new') and irrelevant columns are removed during the reformatting.
+        The relevant columns of the .tsv or .csv library file, renamed ('old' -> 'new'), holding
+        only the maxPeakNum most intense peaks of each key. Irrelevant columns are never read.
     oldToNewColumnDict : dict
         A dictionary for mapping old column names to standardized new column names. This dictionary
         will differ between different library types (titled 'spectrast', 'fragpipe' and 'prosit'),
         as the library types have different 'old' column names.
     """
 
+    chunkSize = 1000000
+
     def _load_raw_library_object_from_file(self, libraryFilePath: os.PathLike) -> None:
         if libraryFilePath.endswith(".tsv"):
             separator = "\t"
         else:
             separator = ","
-        self.rawUploadedLibraryObject = pd.read_csv(libraryFilePath, sep=separator)
         self.oldToNewColumnDict = _set_old_to_new_column_dict(libraryFilePath)
         _assert_there_are_no_missing_columns(
-            self.oldToNewColumnDict.keys(), self.rawUploadedLibraryObject.columns
+            self.oldToNewColumnDict.keys(),
+            pd.read_csv(libraryFilePath, sep=separator, nrows=0).columns,
+        )
+        chunks = pd.read_csv(
+            libraryFilePath,
+            sep=separator,
+            usecols=self.oldToNewColumnDict.keys(),
+            dtype={
+                oldColumn: "category"
+                for oldColumn, newColumn in self.oldToNewColumnDict.items()
+                if newColumn in categoricalColumns
+            },
+            chunksize=self.chunkSize,
+        )
+        self.rawUploadedLibraryObject = _concatenate_library_chunks(
+            [
+                _reduce_to_most_intense_peaks_of_each_key(
+                    _reformat_raw_library_object_columns(
+                        chunk, self.oldToNewColumnDict
+                    ),
+                    self.maxPeakNum,
+                )
+                for chunk in chunks
+            ]
         )
 
-    def _format_raw_library_object_into_zodiaq_library_dict(
-        self, maxPeakNum=10
-    ) -> dict:
+    def _format_raw_library_object_into_zodiaq_library(self) -> ZodiaqLibrary:
         """abstract class implementation - see 'libraryLoaderStrategy.py' for details"""
-        reformattedLibDf = _reformat_raw_library_object_columns(
-            self.rawUploadedLibraryObject, self.oldToNewColumnDict
+        organizedDataDict = _organize_data_by_zodiaq_library_dict_keys(
+            self.rawUploadedLibraryObject, self.maxPeakNum
+        )
+        metadata = organizedDataDict["metadata"]
+        return ZodiaqLibrary(
+            organizedDataDict["precursorMz"].astype(np.float64),
+            organizedDataDict["peakOffsets"],
+            organizedDataDict["peakMz"].astype(np.float64),
+            organizedDataDict["peakIntensity"].astype(np.float64),
+            {
+                "precursorMz": organizedDataDict["precursorMz"],
+                "peptide": organizedDataDict["peptide"],
+                finalVariableNames["precursorCharge"]: metadata["precursorCharge"],
+                finalVariableNames["identification"]: metadata["identification"],
+                finalVariableNames["proteinName"]: metadata["proteinName"],
+                finalVariableNames["isDecoy"]: _identify_decoy_protein_names(
+                    metadata["proteinName"]
+                ),
+            },
+            {name: organizedDataDict[name] for name in fragmentNames},
         )
-        organizedDataDict = _organize_data_by_zodiaq_library_dict_keys(reformattedLibDf)
-        zodiaqLibraryDict = {}
-        for zodiaqKeyIdx in range(len(organizedDataDict["zodiaqKeys"])):
-            zodiaqKey, zodiaqValue = _create_zodiaq_library_entry(
-                organizedDataDict, maxPeakNum, zodiaqKeyIdx
-            )
-            zodiaqLibraryDict[zodiaqKey] = zodiaqValue
-        return zodiaqLibraryDict
 
 
 def _assert_there_are_no_missing_columns(
@@ -82,94 +134,172 @@ def _reformat_raw_library_object_columns(
 ) -> pd.DataFrame:
     reformattedDf = df[oldToNewColumnDict.keys()]
     reformattedDf = reformattedDf.rename(columns=oldToNewColumnDict)
-    reformattedDf["zodiaqLibKey"] = list(
-        zip(
-            reformattedDf["precursorMz"].tolist(), reformattedDf["peptideName"].tolist()
-        )
-    )
     return reformattedDf
 
 
-def _organize_data_by_zodiaq_library_dict_keys(df: pd.DataFrame) -> dict:
-    keys = sorted(set(df["zodiaqLibKey"]))
-    mz = df.groupby("zodiaqLibKey")["peakMz"].apply(list).to_dict()
-    intensities = df.groupby("zodiaqLibKey")["peakIntensity"].apply(list).to_dict()
-    fragmentTypes = (
-        df.groupby("zodiaqLibKey")
-        .apply(
-            lambda group: list(
-                zip(
-                    group["fragmentType"],
-                    group["fragmentNumber"],
-                    group["fragmentCharge"],
-                )
-            )
+def _organize_data_by_zodiaq_library_dict_keys(
+    df: pd.DataFrame, maxPeakNum: int
+) -> dict:
+    """
+    Groups the rows of a reformatted library table by their (precursorMz, peptideName) key,
+        keeping the maxPeakNum most intense peaks of each key, using array operations only.
+
+    Extended Summary
+    ----------------
+    The table is sorted once by key and then by decreasing peak intensity (a stable sort, so
+        peaks of equal intensity keep their order in the file). Group boundaries in the sorted
+        table give the rank of each peak within its key, and peaks ranked maxPeakNum or
+        higher are removed. The remaining peaks of each key are then sorted by m/z, intensity
+        and (for fragment types) fragment type, number and charge, matching the sorted
+        tuples of the peak and fragment type lists of the library dictionary.
+
+    Parameters
+    ----------
+    df : pandas DataFrame
+        The library table, with columns renamed by _reformat_raw_library_object_columns.
+
+    maxPeakNum : int
+        Maximum number of peaks kept for each key.
+
+    Returns
+    -------
+    organizedDataDict : dict
+        precursorMz, peptide - arrays of the (precursorMz, peptideName) keys in sorted order.
+        peakOffsets - integer array where the peaks of key i are found between peakOffsets[i]
+            and peakOffsets[i+1] of the peak arrays.
+        peakMz, peakIntensity - peak arrays, sorted by m/z then intensity within each key.
+        fragmentType, fragmentNumber, fragmentCharge - fragment arrays, sorted by m/z,
+            intensity, then fragment type within each key.
+        metadata - dict of arrays holding the value of each remaining column for each key,
+            taken from the first row of the key in the table. Text columns are object arrays.
+    """
+    sortIdx, groupStarts, groupIdxs, peakRanks = _rank_peaks_within_each_key(df)
+    precursorMzs = df["precursorMz"].to_numpy()
+    peakIntensities = df["peakIntensity"].to_numpy()
+    isKept = peakRanks < maxPeakNum
+    keptIdx, keptGroupIdxs, keptRanks = (
+        sortIdx[isKept],
+        groupIdxs[isKept],
+        peakRanks[isKept],
+    )
+    keptMzs = df["peakMz"].to_numpy()[keptIdx]
+    keptIntensities = peakIntensities[keptIdx]
+    peakOrder = np.lexsort((keptRanks, keptIntensities, keptMzs, keptGroupIdxs))
+    fragmentTypeCodes, _ = pd.factorize(np.asarray(df["fragmentType"]), sort=True)
+    fragmentOrder = np.lexsort(
+        (
+            keptRanks,
+            df["fragmentCharge"].to_numpy()[keptIdx],
+            df["fragmentNumber"].to_numpy()[keptIdx],
+            fragmentTypeCodes[keptIdx],
+            keptIntensities,
+            keptMzs,
+            keptGroupIdxs,
         )
-        .to_dict()
     )
-    df.drop_duplicates(subset="zodiaqLibKey", inplace=True)
-    df.set_index("zodiaqLibKey", drop=True, inplace=True)
-    df.drop(
-        [
-            "precursorMz",
-            "peakMz",
-            "peptideName",
-            "peakIntensity",
-            "fragmentType",
-            "fragmentNumber",
-            "fragmentCharge",
-        ],
-        axis=1,
-        inplace=True,
+    fragmentIdx = keptIdx[fragmentOrder]
+    peakOffsets = np.zeros(len(groupStarts) + 1, dtype=np.int64)
+    np.cumsum(
+        np.bincount(keptGroupIdxs, minlength=len(groupStarts)), out=peakOffsets[1:]
     )
-    metadata = df.to_dict(orient="index")
+    firstRowIdx = _find_first_row_of_each_key(sortIdx, groupStarts)
+    metadataColumns = [column for column in df.columns if column not in peakColumns]
     return {
-        "zodiaqKeys": keys,
-        "mz": mz,
-        "intensities": intensities,
-        "fragmentTypes": fragmentTypes,
-        "metadata": metadata,
+        "precursorMz": precursorMzs[firstRowIdx],
+        "peptide": _take_as_array(df["peptideName"], firstRowIdx),
+        "peakOffsets": peakOffsets,
+        "peakMz": keptMzs[peakOrder],
+        "peakIntensity": keptIntensities[peakOrder],
+        "fragmentType": _take_as_array(df["fragmentType"], fragmentIdx),
+        "fragmentNumber": df["fragmentNumber"].to_numpy()[fragmentIdx],
+        "fragmentCharge": df["fragmentCharge"].to_numpy()[fragmentIdx],
+        "metadata": {
+            column: _take_as_array(df[column], firstRowIdx)
+            for column in metadataColumns
+        },
     }
 
 
-def _create_zodiaq_library_entry(
-    organizedDataDict: dict, maxPeakNum: int, zodiaqKeyIdx: int
-) -> dict:
-    zodiaqKey = organizedDataDict["zodiaqKeys"][zodiaqKeyIdx]
-    peaks = create_peaks_from_mz_intensity_lists_and_zodiaq_key_id(
-        organizedDataDict["mz"][zodiaqKey],
-        organizedDataDict["intensities"][zodiaqKey],
-        zodiaqKeyIdx,
-    )
-    fragments = list(
-        zip(
-            organizedDataDict["mz"][zodiaqKey],
-            organizedDataDict["intensities"][zodiaqKey],
-            organizedDataDict["fragmentTypes"][zodiaqKey],
-        )
-    )
-    reducedPeaks = remove_low_intensity_peaks_below_max_peak_num(peaks, maxPeakNum)
-    reducedFragments = remove_low_intensity_peaks_below_max_peak_num(
-        fragments, maxPeakNum
+def _take_as_array(column: pd.Series, idx: np.ndarray) -> np.ndarray:
+    """
+    Returns the values of a column at the given positions. Categorical columns are decoded into
+        arrays of their category values (object arrays for text).
+    """
+    return np.asarray(column.array.take(idx))
+
+
+def _identify_decoy_protein_names(proteinNames: np.ndarray) -> np.ndarray:
+    proteinCodes, uniqueProteinNames = pd.factorize(proteinNames)
+    isDecoyProtein = np.array(
+        [int("decoy" in proteinName.lower()) for proteinName in uniqueProteinNames],
+        dtype=np.int64,
     )
-    isDecoy = int(
-        "decoy" in organizedDataDict["metadata"][zodiaqKey]["proteinName"].lower()
+    return isDecoyProtein[proteinCodes]
+
+
+def _rank_peaks_within_each_key(df: pd.DataFrame) -> tuple:
+    """
+    Sorts the rows of a library table by (precursorMz, peptideName) key and then by decreasing
+        peak intensity, returning the sorting indices, the position of the first row of each
+        key in the sorted table, the key index of each sorted row and the rank of each
+        sorted row within its key.
+    """
+    precursorMzs = df["precursorMz"].to_numpy()
+    peptideCodes, _ = pd.factorize(np.asarray(df["peptideName"]), sort=True)
+    peakIntensities = df["peakIntensity"].to_numpy()
+    sortIdx = np.lexsort((-peakIntensities, peptideCodes, precursorMzs))
+    isGroupStart = np.ones(len(sortIdx), dtype=bool)
+    isGroupStart[1:] = (np.diff(precursorMzs[sortIdx]) != 0) | (
+        np.diff(peptideCodes[sortIdx]) != 0
     )
-    return zodiaqKey, {
-        finalVariableNames["precursorCharge"]: organizedDataDict["metadata"][zodiaqKey][
-            "precursorCharge"
-        ],
-        finalVariableNames["identification"]: organizedDataDict["metadata"][zodiaqKey][
-            "identification"
-        ],
-        finalVariableNames["proteinName"]: organizedDataDict["metadata"][zodiaqKey][
-            "proteinName"
-        ],
-        finalVariableNames["peaks"]: sorted(reducedPeaks),
-        finalVariableNames["zodiaqKeyIdx"]: zodiaqKeyIdx,
-        finalVariableNames["isDecoy"]: isDecoy,
-        finalVariableNames["fragmentTypes"]: [x[-1] for x in sorted(reducedFragments)],
-    }
+    groupStarts = np.flatnonzero(isGroupStart)
+    groupIdxs = np.cumsum(isGroupStart) - 1
+    peakRanks = np.arange(len(sortIdx)) - groupStarts[groupIdxs]
+    return sortIdx, groupStarts, groupIdxs, peakRanks
+
+
+def _find_first_row_of_each_key(sortIdx: np.ndarray, groupStarts: np.ndarray):
+    if len(sortIdx) == 0:
+        return sortIdx
+    return np.minimum.reduceat(sortIdx, groupStarts)
+
+
+def _reduce_to_most_intense_peaks_of_each_key(
+    df: pd.DataFrame, maxPeakNum: int
+) -> pd.DataFrame:
+    """
+    Removes all but the maxPeakNum most intense peaks of each key from a chunk of a library
+        table, keeping the remaining rows in their original order.
+
+    Extended Summary
+    ----------------
+    The maxPeakNum most intense peaks of a key in the full table are always among the
+        maxPeakNum most intense peaks of that key in the chunk they are read from, so reducing
+        each chunk and then the concatenated chunks gives the same peaks as reducing the full
+        table. The metadata columns of every kept row are set to the values of the first row of
+        its key in the chunk, which may itself be removed, so the first row of each key in the
+        concatenated chunks still holds the metadata of the first row of the key in the file.
+    """
+    sortIdx, groupStarts, groupIdxs, peakRanks = _rank_peaks_within_each_key(df)
+    isKept = peakRanks < maxPeakNum
+    firstRowIdx = _find_first_row_of_each_key(sortIdx, groupStarts)[groupIdxs[isKept]]
+    rowOrder = np.argsort(sortIdx[isKept], kind="stable")
+    keptIdx = sortIdx[isKept][rowOrder]
+    reducedDf = df.iloc[keptIdx].reset_index(drop=True)
+    for column in df.columns:
+        if column not in peakColumns:
+            reducedDf[column] = df[column].iloc[firstRowIdx[rowOrder]].array
+    return reducedDf
+
+
+def _concatenate_library_chunks(dfs: list) -> pd.DataFrame:
+    if len(dfs) == 1:
+        return dfs[0]
+    df = pd.concat(dfs, ignore_index=True)
+    for column in dfs[0].columns:
+        if isinstance(dfs[0][column].dtype, pd.CategoricalDtype):
+            df[column] = union_categoricals([chunk[column] for chunk in dfs])
+    return df
 
 
 def _set_old_to_new_column_dict(filePath) -> None:
@@ -0,0 +1,490 @@
+from zodiaq.loaders.peakPoolingFunctions import pool_sorted_peak_runs
+import numpy as np
+import pandas as pd
+import json
+import os
+
+
+class ZodiaqLibrary:
+    """
+    Columnar (struct-of-arrays) representation of a library for use in zoDIAq.
+
+    Extended Summary
+    ----------------
+    The zodiaqLibDict output of the library loading strategies stores every peak as a python
+        tuple, which is costly in memory and must be re-converted at every stage of the
+        identification workflow. This class stores the same library in contiguous numpy arrays.
+        Library spectra are ordered by their zodiaqLibDict key (precursorMz, peptideName), so the
+        position of a spectrum in each array is equal to its zodiaqKeyIdx. The peaks of all spectra
+        are stored in CSR format, where the peaks of spectrum i are found between peakOffsets[i]
+        and peakOffsets[i+1] of the peak arrays. The peaks of each spectrum are sorted by m/z,
+        then intensity, so the peaks of a range of spectra can be pooled with a merge (see
+        pool_sorted_peak_runs).
+
+    Library loading strategies create this object directly (see from_spectra), and the
+        zodiaqLibDict format is only created on request (see to_zodiaq_library_dict).
+
+    Attributes
+    ----------
+    precursorMz : np.ndarray
+        Sorted float array of the precursor m/z value of each library spectrum.
+    peakOffsets : np.ndarray
+        Integer array of length len(precursorMz) + 1 indicating where the peaks of each
+            library spectrum start and end in the peak arrays.
+    peakMz : np.ndarray
+        Float array of the m/z values of all library peaks.
+    peakIntensity : np.ndarray
+        Float array of the intensity values of all library peaks.
+    metadata : dict
+        key: string
+            Name of a metadata value (such as 'peptide', 'proteinName' or 'isDecoy').
+        value: np.ndarray
+            Array containing the metadata value of each library spectrum, indexed by zodiaqKeyIdx.
+    peakMetadata : dict
+        key: string
+            Name of a peak metadata value ('fragmentType', 'fragmentNumber' or 'fragmentCharge').
+        value: np.ndarray
+            Array containing the metadata value of each library peak. Only needed to generate
+                decoys, so it is empty for libraries without fragment data, and it is neither
+                kept for identification nor saved.
+    """
+
+    def __init__(
+        self,
+        precursorMz,
+        peakOffsets,
+        peakMz,
+        peakIntensity,
+        metadata,
+        peakMetadata=None,
+    ):
+        self.precursorMz = precursorMz
+        self.peakOffsets = peakOffsets
+        self.peakMz = peakMz
+        self.peakIntensity = peakIntensity
+        self.metadata = metadata
+        self.peakMetadata = peakMetadata or {}
+
+    @classmethod
+    def from_spectra(
+        cls,
+        precursorMz,
+        peptide,
+        peakOffsets,
+        peakMz,
+        peakIntensity,
+        metadata,
+        peakMetadata=None,
+    ):
+        """
+        Creates a columnar library from library spectra in any order.
+
+        Extended Summary
+        ----------------
+        Spectra are sorted by their (precursorMz, peptide) key. When several spectra share a key,
+            only the last of them is kept, as when the spectra are added to a zodiaqLibDict one
+            after another. The peaks of each spectrum are sorted by m/z, then intensity, along
+            with their peak metadata. Spectra that are already sorted, such as most target
+            spectra, keep their peak order.
+
+        Parameters
+        ----------
+        precursorMz : np.ndarray
+            Array of the precursor m/z value of each spectrum.
+        peptide : np.ndarray
+            Object array of the peptide of each spectrum.
+        peakOffsets : np.ndarray
+            Integer array of length len(precursorMz) + 1 indicating where the peaks of each
+                spectrum start and end in the peak arrays.
+        peakMz, peakIntensity : np.ndarray
+            Float arrays of the m/z and intensity values of the peaks of all spectra.
+        metadata : dict
+            key: string
+                Name of a metadata value (such as 'proteinName' or 'isDecoy').
+            value: np.ndarray
+                Array containing the metadata value of each spectrum.
+        peakMetadata : dict
+            See the ZodiaqLibrary peakMetadata attribute, in the order of the peak arrays.
+
+        Returns
+        -------
+        library : ZodiaqLibrary
+        """
+        precursorMz = np.asarray(precursorMz)
+        peptideCodes, _ = pd.factorize(peptide, sort=True)
+        keyOrder = np.lexsort((np.arange(len(precursorMz)), peptideCodes, precursorMz))
+        isLastOfKey = np.ones(len(keyOrder), dtype=bool)
+        isLastOfKey[:-1] = (np.diff(precursorMz[keyOrder]) != 0) | (
+            np.diff(peptideCodes[keyOrder]) != 0
+        )
+        keyOrder = keyOrder[isLastOfKey]
+        sortedPeakOffsets, peakIdx = gather_peaks_of_spectra(peakOffsets, keyOrder)
+        peakMz = np.asarray(peakMz, dtype=np.float64)[peakIdx]
+        peakIntensity = np.asarray(peakIntensity, dtype=np.float64)[peakIdx]
+        peakOrder = sort_peaks_within_spectra(sortedPeakOffsets, peakMz, peakIntensity)
+        peakIdx = peakIdx[peakOrder]
+        return cls(
+            precursorMz[keyOrder].astype(np.float64),
+            sortedPeakOffsets,
+            peakMz[peakOrder],
+            peakIntensity[peakOrder],
+            {
+                "precursorMz": precursorMz[keyOrder],
+                "peptide": _create_object_array(np.asarray(peptide)[keyOrder]),
+                **{name: values[keyOrder] for name, values in metadata.items()},
+            },
+            {name: values[peakIdx] for name, values in (peakMetadata or {}).items()},
+        )
+
+    @classmethod
+    def from_zodiaq_library_dict(cls, zodiaqLibDict: dict):
+        """
+        Creates a columnar library from a zodiaqLibDict. Kept for compatibility, as library
+            loading strategies create the columnar library directly.
+
+        Parameters
+        ----------
+        zodiaqLibDict : dict
+            see _format_raw_library_object_into_zodiaq_library_dict return value in
+                libraryLoaderStrategy.py.
+
+        Returns
+        -------
+        library : ZodiaqLibrary
+        """
+        sortedKeys = sorted(zodiaqLibDict.keys())
+        peakCounts = np.array(
+            [len(zodiaqLibDict[key]["peaks"]) for key in sortedKeys], dtype=np.int64
+        )
+        peakOffsets = np.zeros(len(sortedKeys) + 1, dtype=np.int64)
+        np.cumsum(peakCounts, out=peakOffsets[1:])
+        peakMz = np.empty(peakOffsets[-1], dtype=np.float64)
+        peakIntensity = np.empty(peakOffsets[-1], dtype=np.float64)
+        for i, key in enumerate(sortedKeys):
+            peaks = zodiaqLibDict[key]["peaks"]
+            peakMz[peakOffsets[i] : peakOffsets[i + 1]] = [peak[0] for peak in peaks]
+            peakIntensity[peakOffsets[i] : peakOffsets[i + 1]] = [
+                peak[1] for peak in peaks
+            ]
+        metadata = {
+            "precursorMz": np.array([key[0] for key in sortedKeys]),
+            "peptide": _create_object_array([key[1] for key in sortedKeys]),
+        }
+        for name in _identify_metadata_names(zodiaqLibDict):
+            values = [zodiaqLibDict[key][name] for key in sortedKeys]
+            if all(isinstance(value, str) for value in values):
+                metadata[name] = _create_object_array(values)
+            else:
+                metadata[name] = np.array(values)
+        peakMetadata = {}
+        if len(sortedKeys) and all(
+            "fragmentTypes" in value for value in zodiaqLibDict.values()
+        ):
+            fragmentTypes = [
+                fragmentType
+                for key in sortedKeys
+                for fragmentType in zodiaqLibDict[key]["fragmentTypes"]
+            ]
+            for name, values in zip(fragmentNames, zip(*fragmentTypes)):
+                peakMetadata[name] = (
+                    _create_object_array(values)
+                    if name == "fragmentType"
+                    else np.array(values)
+                )
+        return cls(
+            np.array([key[0] for key in sortedKeys], dtype=np.float64),
+            peakOffsets,
+            peakMz,
+            peakIntensity,
+            metadata,
+            peakMetadata,
+        )
+
+    def to_zodiaq_library_dict(self) -> dict:
+        """
+        Returns the library in the zodiaqLibDict format (see
+            _format_raw_library_object_into_zodiaq_library_dict in libraryLoaderStrategy.py).
+            Peak metadata, when present, is returned as the 'fragmentTypes' of each spectrum.
+        """
+        peakOffsets = self.peakOffsets.tolist()
+        peaks = list(zip(self.peakMz.tolist(), self.peakIntensity.tolist()))
+        if self.peakMetadata:
+            fragmentTypes = list(
+                zip(*(self.peakMetadata[name].tolist() for name in fragmentNames))
+            )
+        metadata = {
+            name: values.tolist()
+            for name, values in self.metadata.items()
+            if name not in ["precursorMz", "peptide"]
+        }
+        zodiaqLibDict = {}
+        for zodiaqKeyIdx, zodiaqKey in enumerate(self.keys()):
+            start, stop = peakOffsets[zodiaqKeyIdx], peakOffsets[zodiaqKeyIdx + 1]
+            value = {name: values[zodiaqKeyIdx] for name, values in metadata.items()}
+            value["peaks"] = [
+                (mz, intensity, zodiaqKeyIdx) for mz, intensity in peaks[start:stop]
+            ]
+            value["zodiaqKeyIdx"] = zodiaqKeyIdx
+            if self.peakMetadata:
+                value["fragmentTypes"] = fragmentTypes[start:stop]
+            zodiaqLibDict[zodiaqKey] = value
+        return zodiaqLibDict
+
+    @classmethod
+    def load(cls, directory: os.PathLike, isMemoryMapped=True):
+        """
+        Loads a library previously written to a directory with the save function.
+
+        Parameters
+        ----------
+        directory : string (os.PathLike format)
+            Path to the directory the library was saved to.
+
+        isMemoryMapped : bool
+            If true, numeric arrays are memory-mapped from disk rather than read into memory.
+
+        Returns
+        -------
+        library : ZodiaqLibrary
+        """
+        mmapMode = "r" if isMemoryMapped else None
+
+        def load_array(name):
+            return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmapMode)
+
+        with open(os.path.join(directory, manifestFileName)) as f:
+            manifest = json.load(f)
+        metadata = {}
+        for name, isString in manifest["metadata"]:
+            if isString:
+                metadata[name] = _decode_string_array(
+                    load_array(f"metadata_{name}"), manifest["numSpectra"]
+                )
+            else:
+                metadata[name] = load_array(f"metadata_{name}")
+        return cls(
+            load_array("precursorMz"),
+            load_array("peakOffsets"),
+            load_array("peakMz"),
+            load_array("peakIntensity"),
+            metadata,
+        )
+
+    def save(self, directory: os.PathLike, manifestEntries=None) -> None:
+        """
+        Writes the library arrays to a directory as .npy files, which can be memory-mapped
+            when loaded. String metadata is stored as a single utf-8 encoded array per column.
+            Object metadata columns must hold only strings (without null characters), and a
+            TypeError is raised otherwise, as other values would not load back unchanged.
+
+        Parameters
+        ----------
+        directory : string (os.PathLike format)
+            Path to an existing directory the library is saved to.
+
+        manifestEntries : dict
+            Additional values to record in the manifest file of the saved library.
+        """
+
+        def save_array(name, array):
+            np.save(os.path.join(directory, f"{name}.npy"), np.asarray(array))
+
+        save_array("precursorMz", self.precursorMz)
+        save_array("peakOffsets", self.peakOffsets)
+        save_array("peakMz", self.peakMz)
+        save_array("peakIntensity", self.peakIntensity)
+        metadataManifest = []
+        for name, values in self.metadata.items():
+            isString = values.dtype == object
+            if isString:
+                _confirm_metadata_values_are_strings(name, values)
+                save_array(f"metadata_{name}", _encode_string_array(values))
+            else:
+                save_array(f"metadata_{name}", values)
+            metadataManifest.append((name, isString))
+        manifest = {
+            **(manifestEntries or {}),
+            "numSpectra": len(self),
+            "metadata": metadataManifest,
+        }
+        with open(os.path.join(directory, manifestFileName), "w") as f:
+            json.dump(manifest, f)
+
+    def __len__(self):
+        return len(self.precursorMz)
+
+    def keys(self) -> list:
+        """Returns the zodiaqLibDict keys (precursorMz, peptideName) of the library, sorted."""
+        return list(
+            zip(
+                self.metadata["precursorMz"].tolist(), self.metadata["peptide"].tolist()
+            )
+        )
+
+    def peak_tags(self, start=0, stop=None) -> np.ndarray:
+        """Returns the zodiaqKeyIdx of every peak belonging to library spectra start to stop."""
+        if stop is None:
+            stop = len(self)
+        return np.repeat(
+            np.arange(start, stop, dtype=np.int64),
+            np.diff(self.peakOffsets[start : stop + 1]),
+        )
+
+    def peaks_of_spectrum(self, zodiaqKeyIdx: int) -> np.ndarray:
+        """
+        Returns the peaks of a single library spectrum as a 2D array, where each row
+            represents a peak (peak mz value, peak intensity value, zodiaqKeyIdx).
+        """
+        return self.pool_peaks_of_spectra(zodiaqKeyIdx, zodiaqKeyIdx + 1)
+
+    def pool_peaks_of_spectra(self, start: int, stop: int) -> np.ndarray:
+        """
+        Pools the peaks of a contiguous range of library spectra into a single array.
+
+        Parameters
+        ----------
+        start : int
+            zodiaqKeyIdx of the first library spectrum to include.
+        stop : int
+            zodiaqKeyIdx after the last library spectrum to include.
+
+        Returns
+        -------
+        pooledPeaks : np.ndarray
+            2D float array, where each row represents a peak (peak mz value, peak intensity value,
+                zodiaqKeyIdx). Rows are sorted by m/z, then intensity, then zodiaqKeyIdx.
+        """
+        peakStart, peakStop = self.peakOffsets[start], self.peakOffsets[stop]
+        return pool_sorted_peak_runs(
+            self.peakMz[peakStart:peakStop],
+            self.peakIntensity[peakStart:peakStop],
+            self.peak_tags(start, stop),
+            self.peakOffsets[start : stop + 1] - peakStart,
+        )
+
+    def get_spectrum_metadata(self, zodiaqKeyIdx: int) -> dict:
+        """
+        Returns the metadata of a single library spectrum in the format of a zodiaqLibDict value,
+            including 'precursorMz' and 'peptide' entries.
+        """
+        spectrumMetadata = {
+            name: values[zodiaqKeyIdx] for name, values in self.metadata.items()
+        }
+        spectrumMetadata["peaks"] = self.peaks_of_spectrum(zodiaqKeyIdx)
+        return spectrumMetadata
+
+
+manifestFileName = "manifest.json"
+stringSeparator = "\0"
+fragmentNames = ["fragmentType", "fragmentNumber", "fragmentCharge"]
+
+
+def gather_peaks_of_spectra(peakOffsets, spectrumIdxs) -> tuple:
+    """
+    Finds the peaks of a selection of spectra stored in CSR format.
+
+    Parameters
+    ----------
+    peakOffsets : np.ndarray
+        Integer array indicating where the peaks of each spectrum start and end in the peak
+            arrays.
+    spectrumIdxs : np.ndarray
+        Integer array of the selected spectra, in their new order.
+
+    Returns
+    -------
+    selectedPeakOffsets : np.ndarray
+        Integer array of length len(spectrumIdxs) + 1 indicating where the peaks of each
+            selected spectrum start and end in the selected peak arrays.
+    peakIdx : np.ndarray
+        Integer array of the position of each selected peak in the original peak arrays.
+    """
+    peakOffsets = np.asarray(peakOffsets, dtype=np.int64)
+    starts = peakOffsets[spectrumIdxs]
+    counts = peakOffsets[np.asarray(spectrumIdxs) + 1] - starts
+    selectedPeakOffsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=selectedPeakOffsets[1:])
+    peakIdx = np.arange(selectedPeakOffsets[-1], dtype=np.int64) + np.repeat(
+        starts - selectedPeakOffsets[:-1], counts
+    )
+    return selectedPeakOffsets, peakIdx
+
+
+def _confirm_metadata_values_are_strings(name, values):
+    for value in values:
+        if not isinstance(value, str) or stringSeparator in value:
+            raise TypeError(
+                f"The '{name}' library metadata contains the value {value!r}, but only strings without null characters can be saved."
+            )
+
+
+def _encode_string_array(values):
+    return np.frombuffer(stringSeparator.join(values).encode("utf-8"), dtype=np.uint8)
+
+
+def _decode_string_array(encodedValues, numValues):
+    if numValues == 0:
+        return _create_object_array([])
+    values = bytes(encodedValues).decode("utf-8").split(stringSeparator)
+    return _create_object_array(values)
+
+
+def _identify_metadata_names(zodiaqLibDict):
+    excludedNames = set(["peaks", "zodiaqKeyIdx", "fragmentTypes"])
+    metadataNames = []
+    for value in zodiaqLibDict.values():
+        for name in value:
+            if name not in excludedNames and name not in metadataNames:
+                metadataNames.append(name)
+    return metadataNames
+
+
+def _create_object_array(values):
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+def sort_peaks_within_spectra(peakOffsets, peakMz, peakIntensity) -> np.ndarray:
+    """
+    Finds the order that sorts the peaks of each spectrum stored in CSR format by m/z, then
+        intensity, without moving peaks between spectra. Only spectra with unsorted peaks are
+        sorted.
+
+    Parameters
+    ----------
+    peakOffsets : np.ndarray
+        Integer array indicating where the peaks of each spectrum start and end in the peak
+            arrays.
+    peakMz, peakIntensity : np.ndarray
+        Float arrays of the m/z and intensity values of the peaks of all spectra.
+
+    Returns
+    -------
+    peakOrder : np.ndarray
+        Integer array of the position of each sorted peak in the original peak arrays.
+    """
+    peakOrder = np.arange(len(peakMz), dtype=np.int64)
+    spectrumOfPeak = np.repeat(
+        np.arange(len(peakOffsets) - 1, dtype=np.int64), np.diff(peakOffsets)
+    )
+    isPeakBeforeNextPeak = (peakMz[:-1] < peakMz[1:]) | (
+        (peakMz[:-1] == peakMz[1:]) & (peakIntensity[:-1] <= peakIntensity[1:])
+    )
+    isUnsortedPeakPair = ~isPeakBeforeNextPeak & (
+        spectrumOfPeak[:-1] == spectrumOfPeak[1:]
+    )
+    if not np.any(isUnsortedPeakPair):
+        return peakOrder
+    unsortedSpectra = np.unique(spectrumOfPeak[:-1][isUnsortedPeakPair])
+    unsortedPeakIdx = np.flatnonzero(np.isin(spectrumOfPeak, unsortedSpectra))
+    peakOrder[unsortedPeakIdx] = unsortedPeakIdx[
+        np.lexsort(
+            (
+                peakIntensity[unsortedPeakIdx],
+                peakMz[unsortedPeakIdx],
+                spectrumOfPeak[unsortedPeakIdx],
+            )
+        )
+    ]
+    return peakOrder
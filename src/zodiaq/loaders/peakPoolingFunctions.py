@@ -0,0 +1,107 @@
+import numpy as np
+from numba import njit
+
+
+def pool_sorted_peak_runs(peakMz, peakIntensity, peakTags, runOffsets) -> np.ndarray:
+    """
+    Pools runs of peaks (such as the peaks of individual spectra) into a single sorted array.
+
+    Extended Summary
+    ----------------
+    The peaks of a spectrum are almost always already sorted by m/z, so the pooled array can be
+        built with a k-way merge of the runs rather than a full sort. Runs are merged pairwise in
+        a numba-compiled kernel, taking O(n log k) time for n peaks in k runs. If any run is not
+        sorted, the pooled peaks are instead sorted as a whole with np.lexsort. Both approaches
+        produce the same ordering.
+
+    Parameters
+    ----------
+    peakMz : np.ndarray
+        Float array of the m/z values of the peaks of all runs, one run after another.
+    peakIntensity : np.ndarray
+        Float array of the intensity values of the peaks of all runs.
+    peakTags : np.ndarray
+        Array of the tag (zodiaqKeyIdx or scan number) of each peak.
+    runOffsets : np.ndarray
+        Integer array of length k + 1, starting at 0, indicating where each of the k runs starts
+            and ends in the peak arrays.
+
+    Returns
+    -------
+    pooledPeaks : np.ndarray
+        2D float array, where each row represents a peak (peak mz value, peak intensity value,
+            tag). Rows are sorted by m/z, then intensity, then tag.
+    """
+    pooledPeaks = np.empty((len(peakMz), 3), dtype=np.float64)
+    pooledPeaks[:, 0] = peakMz
+    pooledPeaks[:, 1] = peakIntensity
+    pooledPeaks[:, 2] = peakTags
+    runOffsets = np.asarray(runOffsets, dtype=np.int64)
+    if len(pooledPeaks) == 0:
+        return pooledPeaks
+    if not numba_enhanced_check_that_peak_runs_are_sorted(pooledPeaks, runOffsets):
+        sortIdx = np.lexsort((pooledPeaks[:, 2], pooledPeaks[:, 1], pooledPeaks[:, 0]))
+        return pooledPeaks[sortIdx]
+    return numba_enhanced_merge_of_sorted_peak_runs(pooledPeaks, runOffsets)
+
+
+def concatenate_peak_arrays(peakArrays: list) -> np.ndarray:
+    """Concatenates the peak value arrays of several runs, allowing for zero runs."""
+    if len(peakArrays) == 0:
+        return np.empty(0, dtype=np.float64)
+    return np.concatenate(peakArrays)
+
+
+@njit(cache=True)
+def is_peak_less_than_or_equal(peaks, i, otherPeaks, j):
+    for column in range(3):
+        if peaks[i, column] != otherPeaks[j, column]:
+            return peaks[i, column] < otherPeaks[j, column]
+    return True
+
+
+@njit(cache=True)
+def numba_enhanced_check_that_peak_runs_are_sorted(peaks, runOffsets):
+    for run in range(len(runOffsets) - 1):
+        for i in range(runOffsets[run] + 1, runOffsets[run + 1]):
+            if not is_peak_less_than_or_equal(peaks, i - 1, peaks, i):
+                return False
+    return True
+
+
+@njit(cache=True)
+def numba_enhanced_merge_of_sorted_peak_runs(peaks, runOffsets):
+    source = peaks.copy()
+    destination = np.empty_like(peaks)
+    offsets = runOffsets.copy()
+    numRuns = len(offsets) - 1
+    while numRuns > 1:
+        numMergedRuns = (numRuns + 1) // 2
+        mergedOffsets = np.empty(numMergedRuns + 1, dtype=np.int64)
+        mergedOffsets[0] = offsets[0]
+        for mergedRun in range(numMergedRuns):
+            start = offsets[2 * mergedRun]
+            middle = offsets[min(2 * mergedRun + 1, numRuns)]
+            stop = offsets[min(2 * mergedRun + 2, numRuns)]
+            i, j, k = start, middle, start
+            while i < middle and j < stop:
+                if is_peak_less_than_or_equal(source, i, source, j):
+                    destination[k] = source[i]
+                    i += 1
+                else:
+                    destination[k] = source[j]
+                    j += 1
+                k += 1
+            while i < middle:
+                destination[k] = source[i]
+                i += 1
+                k += 1
+            while j < stop:
+                destination[k] = source[j]
+                j += 1
+                k += 1
+            mergedOffsets[mergedRun + 1] = stop
+        source, destination = destination, source
+        offsets = mergedOffsets
+        numRuns = numMergedRuns
+    return source
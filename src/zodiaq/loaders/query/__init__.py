@@ -1,3 +1,4 @@
 from .queryLoaderContext import QueryLoaderContext
 from .queryLoaderStrategy import QueryLoaderStrategy
 from .queryLoaderStrategyMzxml import QueryLoaderStrategyMzxml
+from .queryLoaderStrategyCachedMzxml import QueryLoaderStrategyCachedMzxml
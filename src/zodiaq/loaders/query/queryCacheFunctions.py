@@ -0,0 +1,56 @@
+from zodiaq.loaders.query.queryPeakStore import QueryPeakStore, manifestFileName
+from zodiaq.loaders.library.libraryCacheFunctions import (
+    calculate_file_content_hash,
+    get_cache_path,
+    write_to_cache,
+    remove_outdated_caches,
+)
+import hashlib
+import json
+import os
+
+queryCacheFormatVersion = 1
+queryCacheSuffix = ".zodiaqquery-"
+
+
+def create_query_cache_key(fileHash: str) -> str:
+    cacheKeyContents = json.dumps(
+        {"fileHash": fileHash, "cacheFormatVersion": queryCacheFormatVersion},
+        sort_keys=True,
+    )
+    return hashlib.sha256(cacheKeyContents.encode("utf-8")).hexdigest()
+
+
+def load_query_peak_store_using_cache(
+    queryFilePath: os.PathLike, cacheDirectory=None
+) -> QueryPeakStore:
+    """
+    Loads the peak store of a query file from the cache if one exists for the file contents.
+        Otherwise, the peak store is created from the query file and written to the cache
+        for subsequent runs.
+
+    Parameters
+    ----------
+    queryFilePath : string (os.PathLike format)
+        Path to the mzXML query file.
+
+    cacheDirectory : string (os.PathLike format)
+        Directory in which peak stores are kept. Defaults to the directory of the query file.
+
+    Returns
+    -------
+    peakStore : QueryPeakStore
+    """
+    fileHash = calculate_file_content_hash(queryFilePath)
+    cachePath = get_cache_path(
+        queryFilePath,
+        create_query_cache_key(fileHash),
+        queryCacheSuffix,
+        cacheDirectory,
+    )
+    if os.path.exists(os.path.join(cachePath, manifestFileName)):
+        return QueryPeakStore.load(cachePath)
+    peakStore = QueryPeakStore.from_mzxml(queryFilePath)
+    remove_outdated_caches(queryFilePath, fileHash, queryCacheSuffix, cacheDirectory)
+    write_to_cache(peakStore, cachePath, {"fileHash": fileHash})
+    return peakStore
@@ -1,17 +1,33 @@
 from zodiaq.loaders.query.queryLoaderStrategyMzxml import (
     QueryLoaderStrategyMzxml as Mzxml,
 )
+from zodiaq.loaders.query.queryLoaderStrategyCachedMzxml import (
+    QueryLoaderStrategyCachedMzxml as CachedMzxml,
+)
+import numpy as np
 import os
 
 
 class QueryLoaderContext:
     """
     Class for accessing query loading strategies (as used by the strategy design pattern).
+
+    Attributes
+    ----------
+    filePath : string (os.PathLike format)
+        The path to the query file.
+    _strategy : QueryLoaderStrategy
+        The concrete query loading strategy class. If the query file is cached, the decoded
+            peaks of the file are written to (and subsequently read from) a memory-mapped
+            peak store keyed by the file contents.
     """
 
-    def __init__(self, queryFilePath: os.PathLike):
+    def __init__(self, queryFilePath: os.PathLike, isCached=False, cacheDirectory=None):
         self.filePath = queryFilePath
-        self._strategy = Mzxml(queryFilePath)
+        if isCached:
+            self._strategy = CachedMzxml(queryFilePath, cacheDirectory)
+        else:
+            self._strategy = Mzxml(queryFilePath)
 
     def map_query_scan_ids_to_dia_mz_windows(self) -> dict:
         return self._strategy.map_query_scan_ids_to_dia_mz_windows()
@@ -22,5 +38,5 @@ class QueryLoaderContext:
     def get_query_file_reader(self):
         return self._strategy.get_query_file_reader()
 
-    def pool_peaks_of_query_scans(self, scans: list, reader) -> list:
+    def pool_peaks_of_query_scans(self, scans: list, reader) -> np.ndarray:
         return self._strategy.pool_peaks_of_query_scans(scans, reader)
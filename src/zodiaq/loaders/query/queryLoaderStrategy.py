@@ -1,3 +1,4 @@
+import numpy as np
 from abc import ABC, abstractmethod
 import os
 
@@ -81,10 +82,10 @@ class QueryLoaderStrategy(ABC):
         pass
 
     @abstractmethod
-    def pool_peaks_of_query_scans(self, scans: list, reader) -> list:
+    def pool_peaks_of_query_scans(self, scans: list, reader) -> np.ndarray:
         """
         Given a list of scans, this function gathers their peaks and pools them into
-            a single list.
+            a single array.
 
         Parameters
         ----------
@@ -94,9 +95,9 @@ class QueryLoaderStrategy(ABC):
 
         Returns
         -------
-        pooledPeaks : list
-            List of pooled peaks. See _format_raw_library_object_into_zodiaq_library_dict
-                return value for 'peak' in libraryLoaderStrategy.py.
+        pooledPeaks : np.ndarray
+            2D float array, where each row represents a peak (peak mz value, peak intensity value,
+                scan number). Rows are sorted by m/z, then intensity, then scan number.
         """
         pass
 
@@ -0,0 +1,43 @@
+from zodiaq.loaders.query.queryLoaderStrategy import QueryLoaderStrategy
+from zodiaq.loaders.query.queryScanTable import (
+    map_scan_table_to_dia_mz_windows,
+    extract_metadata_from_scan_table,
+)
+from zodiaq.loaders.query.queryCacheFunctions import (
+    load_query_peak_store_using_cache,
+)
+from contextlib import nullcontext
+import numpy as np
+import os
+
+
+class QueryLoaderStrategyCachedMzxml(QueryLoaderStrategy):
+    """
+    Concrete strategy implementation of the QueryLoaderStrategy strategy class for mzXML query
+        files that are converted into a memory-mapped peak store, cached by file contents.
+        See QueryPeakStore in queryPeakStore.py.
+    """
+
+    def __init__(self, queryFilePath: os.PathLike, cacheDirectory=None):
+        super().__init__(queryFilePath)
+        self._cacheDirectory = cacheDirectory
+        self._peakStore = None
+
+    def load_query_peak_store(self):
+        if self._peakStore is None:
+            self._peakStore = load_query_peak_store_using_cache(
+                self.filePath, self._cacheDirectory
+            )
+        return self._peakStore
+
+    def map_query_scan_ids_to_dia_mz_windows(self) -> dict:
+        return map_scan_table_to_dia_mz_windows(self.load_query_peak_store().scanTable)
+
+    def extract_metadata_from_query_scans(self) -> dict:
+        return extract_metadata_from_scan_table(self.load_query_peak_store().scanTable)
+
+    def get_query_file_reader(self):
+        return nullcontext(self.load_query_peak_store())
+
+    def pool_peaks_of_query_scans(self, scans: list, reader) -> np.ndarray:
+        return self.load_query_peak_store().pool_peaks_of_scans(scans)
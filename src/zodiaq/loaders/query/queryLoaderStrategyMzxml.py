@@ -1,13 +1,16 @@
-from zodiaq.loaders.query.queryLoaderStrategy import (
-    QueryLoaderStrategy,
-    precursor_mz_missing_warning_text,
+from zodiaq.loaders.query.queryLoaderStrategy import QueryLoaderStrategy
+from zodiaq.loaders.peakPoolingFunctions import (
+    pool_sorted_peak_runs,
+    concatenate_peak_arrays,
 )
-from zodiaq.loaders.library.libraryLoaderStrategy import (
-    create_peaks_from_mz_intensity_lists_and_zodiaq_key_id,
+from zodiaq.loaders.query.queryScanTable import (
+    create_query_scan_table_from_mzxml,
+    map_scan_table_to_dia_mz_windows,
+    extract_metadata_from_scan_table,
 )
-from collections import defaultdict
 from pyteomics import mzxml
-import warnings
+import numpy as np
+import os
 
 
 class QueryLoaderStrategyMzxml(QueryLoaderStrategy):
@@ -16,52 +19,38 @@ class QueryLoaderStrategyMzxml(QueryLoaderStrategy):
         loading mzXML query files.
     """
 
+    def __init__(self, queryFilePath: os.PathLike):
+        super().__init__(queryFilePath)
+        self._scanTable = None
+
+    def load_query_scan_table(self) -> np.ndarray:
+        """
+        Returns the scan table of the mzXML file, walking the file to create it on first use.
+            See create_query_scan_table_from_mzxml in queryScanTable.py.
+        """
+        if self._scanTable is None:
+            self._scanTable = create_query_scan_table_from_mzxml(self.filePath)
+        return self._scanTable
+
     def map_query_scan_ids_to_dia_mz_windows(self) -> dict:
-        mzWindowToScanIdDict = defaultdict(list)
-        with mzxml.read(self.filePath) as spectra:
-            for spec in spectra:
-                scan = spec["num"]
-                if "precursorMz" not in spec:
-                    warnings.warn(
-                        precursor_mz_missing_warning_text(scan),
-                        SyntaxWarning,
-                    )
-                    continue
-                precMz = spec["precursorMz"][0]["precursorMz"]
-                windowWidth = spec["precursorMz"][0]["windowWideness"]
-                mzWindowToScanIdDict[precMz, windowWidth].append(scan)
-        return dict(mzWindowToScanIdDict)
+        return map_scan_table_to_dia_mz_windows(self.load_query_scan_table())
 
     def extract_metadata_from_query_scans(self) -> dict:
-        scanMetadataDict = {}
-        with mzxml.read(self.filePath) as spectra:
-            for spec in spectra:
-                if "precursorMz" not in spec:
-                    continue
-                metadataDict = {}
-                metadataDict["precursorMz"] = spec["precursorMz"][0]["precursorMz"]
-                metadataDict["windowWidth"] = spec["precursorMz"][0]["windowWideness"]
-                metadataDict["peaksCount"] = spec["peaksCount"]
-                metadataDict["retentionTime"] = spec["retentionTime"]
-                if "nameValue" in spec:
-                    for key, value in spec["nameValue"].items():
-                        spec[key] = value
-                if "compensationVoltage" in spec:
-                    CV = spec["compensationVoltage"]
-                else:
-                    CV = ""
-                metadataDict["CV"] = CV
-                scanMetadataDict[spec["num"]] = metadataDict
-        return scanMetadataDict
+        return extract_metadata_from_scan_table(self.load_query_scan_table())
 
     def get_query_file_reader(self):
         return mzxml.read(self.filePath, use_index=True)
 
-    def pool_peaks_of_query_scans(self, scans: list, reader) -> list:
-        pooledQueryPeaks = []
-        for scan in scans:
-            spectrum = reader.get_by_id(scan)
-            pooledQueryPeaks += create_peaks_from_mz_intensity_lists_and_zodiaq_key_id(
-                spectrum["m/z array"], spectrum["intensity array"], int(scan)
-            )
-        return sorted(pooledQueryPeaks)
+    def pool_peaks_of_query_scans(self, scans: list, reader) -> np.ndarray:
+        spectra = [reader.get_by_id(scan) for scan in scans]
+        numPeaks = [len(spectrum["m/z array"]) for spectrum in spectra]
+        runOffsets = np.zeros(len(spectra) + 1, dtype=np.int64)
+        np.cumsum(numPeaks, out=runOffsets[1:])
+        return pool_sorted_peak_runs(
+            concatenate_peak_arrays([spectrum["m/z array"] for spectrum in spectra]),
+            concatenate_peak_arrays(
+                [spectrum["intensity array"] for spectrum in spectra]
+            ),
+            np.repeat([int(scan) for scan in scans], numPeaks),
+            runOffsets,
+        )
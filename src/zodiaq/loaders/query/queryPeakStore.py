@@ -0,0 +1,136 @@
+from zodiaq.loaders.query.queryScanTable import create_query_scan_table_from_mzxml
+from zodiaq.loaders.peakPoolingFunctions import (
+    pool_sorted_peak_runs,
+    concatenate_peak_arrays,
+)
+from pyteomics import mzxml
+import numpy as np
+import json
+import os
+
+manifestFileName = "manifest.json"
+
+
+class QueryPeakStore:
+    """
+    Columnar (struct-of-arrays) store of the peaks of a query file, which can be memory-mapped.
+
+    Extended Summary
+    ----------------
+    Decoding the peaks of an mzXML file (XML parsing followed by base64 and zlib decoding)
+        is repeated every time the file is identified. This class stores the decoded peaks of
+        every scan in the scan table of the file in CSR format, where the peaks of the scan in
+        row i of the scan table are found between peakOffsets[i] and peakOffsets[i+1] of the
+        peak arrays. Saved stores are memory-mapped when loaded, so pooling the peaks of a scan
+        reads a slice of the peak arrays rather than decoding the scan.
+
+    Attributes
+    ----------
+    scanTable : np.ndarray
+        See create_query_scan_table_from_mzxml in queryScanTable.py.
+    peakOffsets : np.ndarray
+        Integer array of length len(scanTable) + 1 indicating where the peaks of each scan
+            start and end in the peak arrays.
+    peakMz : np.ndarray
+        Array of the m/z values of all query peaks, in the order they appear in each scan.
+    peakIntensity : np.ndarray
+        Array of the intensity values of all query peaks.
+    _scanRows : dict
+        key: scan number string.
+        value: row of the scan in the scan table.
+    """
+
+    def __init__(self, scanTable, peakOffsets, peakMz, peakIntensity):
+        self.scanTable = scanTable
+        self.peakOffsets = peakOffsets
+        self.peakMz = peakMz
+        self.peakIntensity = peakIntensity
+        self._scanRows = {scan: row for row, scan in enumerate(scanTable["scan"])}
+
+    @classmethod
+    def from_mzxml(cls, queryFilePath: os.PathLike):
+        """
+        Creates a peak store from an mzXML file, decoding the peaks of every scan once.
+        """
+        scanTable = create_query_scan_table_from_mzxml(queryFilePath)
+        scanRows = {scan: row for row, scan in enumerate(scanTable["scan"])}
+        mzArrays = [np.empty(0)] * len(scanTable)
+        intensityArrays = [np.empty(0)] * len(scanTable)
+        with mzxml.read(queryFilePath) as spectra:
+            for spec in spectra:
+                if spec["num"] not in scanRows:
+                    continue
+                mzArrays[scanRows[spec["num"]]] = spec["m/z array"]
+                intensityArrays[scanRows[spec["num"]]] = spec["intensity array"]
+        peakOffsets = np.zeros(len(scanTable) + 1, dtype=np.int64)
+        np.cumsum([len(mzArray) for mzArray in mzArrays], out=peakOffsets[1:])
+        return cls(
+            scanTable,
+            peakOffsets,
+            concatenate_peak_arrays(mzArrays),
+            concatenate_peak_arrays(intensityArrays),
+        )
+
+    @classmethod
+    def load(cls, directory: os.PathLike, isMemoryMapped=True):
+        """
+        Loads a peak store previously written to a directory with the save function.
+        """
+        mmapMode = "r" if isMemoryMapped else None
+
+        def load_array(name):
+            return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmapMode)
+
+        return cls(
+            load_array("scanTable"),
+            load_array("peakOffsets"),
+            load_array("peakMz"),
+            load_array("peakIntensity"),
+        )
+
+    def save(self, directory: os.PathLike, manifestEntries=None) -> None:
+        """
+        Writes the peak store arrays to a directory as .npy files, which can be memory-mapped
+            when loaded.
+        """
+
+        def save_array(name, array):
+            np.save(os.path.join(directory, f"{name}.npy"), np.asarray(array))
+
+        save_array("scanTable", self.scanTable)
+        save_array("peakOffsets", self.peakOffsets)
+        save_array("peakMz", self.peakMz)
+        save_array("peakIntensity", self.peakIntensity)
+        manifest = {**(manifestEntries or {}), "numScans": len(self.scanTable)}
+        with open(os.path.join(directory, manifestFileName), "w") as f:
+            json.dump(manifest, f)
+
+    def pool_peaks_of_scans(self, scans: list) -> np.ndarray:
+        """
+        Pools the peaks of query scans into a single array.
+
+        Parameters
+        ----------
+        scans : list
+            List of scan number strings.
+
+        Returns
+        -------
+        pooledPeaks : np.ndarray
+            2D float array, where each row represents a peak (peak mz value, peak intensity value,
+                scan number). Rows are sorted by m/z, then intensity, then scan number.
+        """
+        rows = np.array([self._scanRows[scan] for scan in scans], dtype=np.int64)
+        starts, stops = self.peakOffsets[rows], self.peakOffsets[rows + 1]
+        runOffsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(stops - starts, out=runOffsets[1:])
+        return pool_sorted_peak_runs(
+            concatenate_peak_arrays(
+                [self.peakMz[start:stop] for start, stop in zip(starts, stops)]
+            ),
+            concatenate_peak_arrays(
+                [self.peakIntensity[start:stop] for start, stop in zip(starts, stops)]
+            ),
+            np.repeat([int(scan) for scan in scans], stops - starts),
+            runOffsets,
+        )
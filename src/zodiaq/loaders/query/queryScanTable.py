@@ -0,0 +1,152 @@
+from zodiaq.loaders.query.queryLoaderStrategy import precursor_mz_missing_warning_text
+from collections import defaultdict
+from pyteomics import mzxml
+import numpy as np
+import warnings
+import os
+
+
+def create_query_scan_table_from_mzxml(queryFilePath: os.PathLike) -> np.ndarray:
+    """
+    Walks an mzXML file once, recording the metadata of every scan with a precursor m/z value.
+
+    Extended Summary
+    ----------------
+    The file is read sequentially without building a scan index, and peak arrays are left
+        encoded, so building the table does not pay for decoding any peaks. Peaks are decoded
+        only when scans are pooled for matching, using the indexed reader of the query loading
+        strategy. Scans without a precursor m/z value (such as ms1 scans) are skipped with a
+        warning.
+
+    Parameters
+    ----------
+    queryFilePath : string (os.PathLike format)
+        Path to the mzXML file.
+
+    Returns
+    -------
+    scanTable : np.ndarray
+        Structured array with one row per scan, in file order. Fields are 'scan' (scan number
+            string), 'precursorMz', 'windowWidth', 'peaksCount', 'retentionTime' and
+            'compensationVoltage' (empty if absent). The retention time and compensation
+            voltage are stored as text, as they are not always parsed as numbers, with the
+            'isRetentionTimeNumeric' and 'isCompensationVoltageNumeric' fields indicating
+            which values are converted back into floats.
+    """
+    columns = defaultdict(list)
+    with mzxml.MzXML(queryFilePath, use_index=False, decode_binary=False) as spectra:
+        for spec in spectra:
+            scan = spec["num"]
+            if "precursorMz" not in spec:
+                warnings.warn(
+                    precursor_mz_missing_warning_text(scan),
+                    SyntaxWarning,
+                )
+                continue
+            columns["scan"].append(scan)
+            columns["precursorMz"].append(spec["precursorMz"][0]["precursorMz"])
+            columns["windowWidth"].append(spec["precursorMz"][0]["windowWideness"])
+            columns["peaksCount"].append(spec["peaksCount"])
+            retentionTime, isRetentionTimeNumeric = _encode_value_as_text(
+                spec["retentionTime"]
+            )
+            columns["retentionTime"].append(retentionTime)
+            columns["isRetentionTimeNumeric"].append(isRetentionTimeNumeric)
+            compensationVoltage, isCompensationVoltageNumeric = _encode_value_as_text(
+                _find_compensation_voltage(spec)
+            )
+            columns["compensationVoltage"].append(compensationVoltage)
+            columns["isCompensationVoltageNumeric"].append(isCompensationVoltageNumeric)
+    scanTable = np.empty(
+        len(columns["scan"]),
+        dtype=[
+            ("scan", np.array(columns["scan"], dtype=str).dtype),
+            ("precursorMz", np.float64),
+            ("windowWidth", np.float64),
+            ("peaksCount", np.int64),
+            ("retentionTime", np.array(columns["retentionTime"], dtype=str).dtype),
+            ("isRetentionTimeNumeric", np.bool_),
+            (
+                "compensationVoltage",
+                np.array(columns["compensationVoltage"], dtype=str).dtype,
+            ),
+            ("isCompensationVoltageNumeric", np.bool_),
+        ],
+    )
+    for name in scanTable.dtype.names:
+        scanTable[name] = columns[name]
+    return scanTable
+
+
+def map_scan_table_to_dia_mz_windows(scanTable: np.ndarray) -> dict:
+    """
+    Groups the scans of a scan table by m/z window. See map_query_scan_ids_to_dia_mz_windows
+        in queryLoaderStrategy.py for the output format.
+    """
+    mzWindowToScanIdDict = defaultdict(list)
+    for scan, precursorMz, windowWidth in zip(
+        scanTable["scan"].tolist(),
+        scanTable["precursorMz"].tolist(),
+        scanTable["windowWidth"].tolist(),
+    ):
+        mzWindowToScanIdDict[precursorMz, windowWidth].append(scan)
+    return dict(mzWindowToScanIdDict)
+
+
+def extract_metadata_from_scan_table(scanTable: np.ndarray) -> dict:
+    """
+    Returns the metadata of each scan of a scan table. See extract_metadata_from_query_scans
+        in queryLoaderStrategy.py for the output format.
+    """
+    scanMetadataDict = {}
+    for (
+        scan,
+        precursorMz,
+        windowWidth,
+        peaksCount,
+        retentionTime,
+        isRetentionTimeNumeric,
+        compensationVoltage,
+        isCompensationVoltageNumeric,
+    ) in zip(
+        scanTable["scan"].tolist(),
+        scanTable["precursorMz"].tolist(),
+        scanTable["windowWidth"].tolist(),
+        scanTable["peaksCount"].tolist(),
+        scanTable["retentionTime"].tolist(),
+        scanTable["isRetentionTimeNumeric"].tolist(),
+        scanTable["compensationVoltage"].tolist(),
+        scanTable["isCompensationVoltageNumeric"].tolist(),
+    ):
+        scanMetadataDict[scan] = {
+            "precursorMz": precursorMz,
+            "windowWidth": windowWidth,
+            "peaksCount": peaksCount,
+            "retentionTime": _decode_value_from_text(
+                retentionTime, isRetentionTimeNumeric
+            ),
+            "CV": _decode_value_from_text(
+                compensationVoltage, isCompensationVoltageNumeric
+            ),
+        }
+    return scanMetadataDict
+
+
+def _find_compensation_voltage(spec):
+    if "nameValue" in spec and "compensationVoltage" in spec["nameValue"]:
+        return spec["nameValue"]["compensationVoltage"]
+    if "compensationVoltage" in spec:
+        return spec["compensationVoltage"]
+    return ""
+
+
+def _encode_value_as_text(value):
+    if isinstance(value, float):
+        return repr(float(value)), True
+    return str(value), False
+
+
+def _decode_value_from_text(text, isNumeric):
+    if isNumeric:
+        return float(text)
+    return text
@@ -1,5 +1,4 @@
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
 
 
 class Spectrum:
@@ -135,6 +134,8 @@ class Spectrum:
             Cosine similarity between this spectrum and the input.
         """
 
+        from sklearn.metrics.pairwise import cosine_similarity
+
         # Get fragment idx
         self_fragment_idx, other_fragment_idx = self.get_matching_mz_indices(
             spectrum_to_match=spectrum_to_compare, match_tolerance_ppm=30
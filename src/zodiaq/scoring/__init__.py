@@ -1,10 +1,11 @@
 from .scoringFunctions import (
-    score_library_to_query_matches,
     determine_index_of_fdr_cutoff,
     calculate_fdr_rates_of_decoy_array,
     calculate_macc_score,
 )
 
+from .proteinGroupVocabulary import ProteinGroupVocabulary
+
 from .idpickerFunctions import identify_high_confidence_proteins
 
 from .fdrCalculationFunctions import (
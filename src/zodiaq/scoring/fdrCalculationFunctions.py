@@ -1,8 +1,9 @@
 from zodiaq.scoring import (
     calculate_fdr_rates_of_decoy_array,
     identify_high_confidence_proteins,
+    ProteinGroupVocabulary,
 )
-from zodiaq.utils import format_protein_list_to_string, format_protein_string_to_list
+from zodiaq.utils import format_protein_list_to_string
 import numpy as np
 import pandas as pd
 
@@ -34,10 +35,12 @@ def create_peptide_fdr_output_from_full_output_sorted_by_desired_score(
         return peptideDf.iloc[:scoreDfCutoffIdx, :]
 
 
-def create_protein_fdr_output_from_peptide_fdr_output(peptideDf):
-    highConfidenceProteins = identify_high_confidence_proteins(peptideDf)
+def create_protein_fdr_output_from_peptide_fdr_output(peptideDf, vocabulary=None):
+    if vocabulary is None:
+        vocabulary = ProteinGroupVocabulary.from_protein_groups(peptideDf["protein"])
+    highConfidenceProteins = identify_high_confidence_proteins(peptideDf, vocabulary)
     proteinDf = organize_peptide_df_by_leading_proteins(
-        peptideDf, highConfidenceProteins
+        peptideDf, highConfidenceProteins, vocabulary
     )
     proteinFdrDict = identify_leading_protein_to_fdr_dictionary_for_leading_proteins_below_fdr_cutoff(
         proteinDf
@@ -46,9 +49,7 @@ def create_protein_fdr_output_from_peptide_fdr_output(peptideDf):
     proteinDf["proteinCosine"] = proteinDf.groupby("leadingProtein")[
         "cosine"
     ].transform("max")
-    proteinDf["leadingProteinFDR"] = proteinDf["leadingProtein"].apply(
-        lambda x: proteinFdrDict[x]
-    )
+    proteinDf["leadingProteinFDR"] = proteinDf["leadingProtein"].map(proteinFdrDict)
     proteinDf["uniquePeptide"] = determine_if_peptides_are_unique_to_leading_protein(
         proteinDf
     )
@@ -59,7 +60,9 @@ def drop_duplicate_values_from_df_in_given_column(df, column):
     return df.drop_duplicates(subset=column, keep="first").reset_index(drop=True)
 
 
-def organize_peptide_df_by_leading_proteins(peptideDf, leadingProteins):
+def organize_peptide_df_by_leading_proteins(
+    peptideDf, leadingProteins, vocabulary=None
+):
     """
     Creates a new "protein" dataframe more reliant on the leading protein column
         than the peptide column.
@@ -82,6 +85,9 @@ def organize_peptide_df_by_leading_proteins(peptideDf, leadingProteins):
     leadingProteins : set
         A set of proteins determined to be present as identified by the idpicker algorithm.
 
+    vocabulary : ProteinGroupVocabulary, optional
+        Vocabulary of the protein column of peptideDf. Created from the column if not given.
+
     Returns
     -------
 
@@ -90,7 +96,7 @@ def organize_peptide_df_by_leading_proteins(peptideDf, leadingProteins):
         leadingProteins
     )
     proteinDf = create_dataframe_where_peptides_match_to_one_or_more_leading_proteins(
-        peptideDf, proteinToProteinGroup
+        peptideDf, proteinToProteinGroup, vocabulary
     )
     return proteinDf
 
@@ -137,23 +143,27 @@ def create_dictionary_that_matches_individual_proteins_to_group_the_protein_belo
 
 
 def create_dataframe_where_peptides_match_to_one_or_more_leading_proteins(
-    peptideDf, proteinToProteinGroup
+    peptideDf, proteinToProteinGroup, vocabulary=None
 ):
-    originalProteinGroups = peptideDf["protein"].apply(format_protein_string_to_list)
-    peptideToLeadingProteinMatchIdx = []
-    leadingProteinColumn = []
-    for i in range(len(originalProteinGroups)):
-        originalProteinGroup = originalProteinGroups[i]
-        for originalProtein in originalProteinGroup:
-            if originalProtein in proteinToProteinGroup.keys():
-                peptideToLeadingProteinMatchIdx.append(i)
-                leadingProteinColumn.append(
-                    format_protein_list_to_string(
-                        proteinToProteinGroup[originalProtein]
-                    )
-                )
-    proteinDf = peptideDf.copy().iloc[peptideToLeadingProteinMatchIdx]
-    proteinDf["leadingProtein"] = leadingProteinColumn
+    if vocabulary is None:
+        vocabulary = ProteinGroupVocabulary.from_protein_groups(peptideDf["protein"])
+    rowIdx, proteinCodes = vocabulary.expand_protein_groups(peptideDf["protein"])
+    leadingProteinOfEachProtein = np.array(
+        [
+            (
+                format_protein_list_to_string(proteinToProteinGroup[protein])
+                if protein in proteinToProteinGroup
+                else None
+            )
+            for protein in vocabulary.proteins
+        ],
+        dtype=object,
+    )
+    isInLeadingProtein = (leadingProteinOfEachProtein != None)[proteinCodes]
+    proteinDf = peptideDf.copy().iloc[rowIdx[isInLeadingProtein]]
+    proteinDf["leadingProtein"] = leadingProteinOfEachProtein[
+        proteinCodes[isInLeadingProtein]
+    ].tolist()
     proteinDf = proteinDf.drop_duplicates(keep="first").reset_index(drop=True)
     return proteinDf
 
@@ -184,9 +194,9 @@ def determine_if_peptides_are_unique_to_leading_protein(proteinDf):
             dataframe provided as input. 0 indicates the peptide is NOT unique, 1 that
             it is unique.
     """
-    uniqueValuesDf = proteinDf.groupby("leadingProtein").filter(
-        lambda group: len(group) == 1
+    isUnique = (
+        proteinDf.groupby("leadingProtein")["leadingProtein"].transform("size") == 1
     )
     uniquePeptides = np.array([0] * len(proteinDf.index))
-    uniquePeptides[uniqueValuesDf.index] = 1
+    uniquePeptides[proteinDf.index[isUnique.to_numpy()]] = 1
     return list(uniquePeptides)
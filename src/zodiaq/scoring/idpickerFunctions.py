@@ -1,9 +1,12 @@
+import heapq
 import numpy as np
 import pandas as pd
-from zodiaq.utils import format_protein_string_to_list
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+from zodiaq.scoring.proteinGroupVocabulary import ProteinGroupVocabulary
 
 
-def identify_high_confidence_proteins(peptideDf):
+def identify_high_confidence_proteins(peptideDf, vocabulary=None):
     """
     This function runs the full ID Picker algorithm on the peptides identified in the
         matching workflow (and the proteins associated with those peptides).
@@ -24,13 +27,18 @@ def identify_high_confidence_proteins(peptideDf):
         The output of the library-query matching workflow, where library peptides were
         identified.
 
+    vocabulary : ProteinGroupVocabulary, optional
+        Vocabulary of the protein column of peptideDf. Created from the column if not given.
+
     Returns
     -------
     leadingProteins : set
         A set of proteins determined with high confidence to be present.
 
     """
-    peptideProteinEdgeDf = initialize__format_peptide_protein_connections(peptideDf)
+    peptideProteinEdgeDf = initialize__format_peptide_protein_connections(
+        peptideDf, vocabulary=vocabulary
+    )
     peptideProteinEdgeDf = collapse__group_identically_connected_peptides_and_proteins(
         peptideProteinEdgeDf
     )
@@ -42,7 +50,9 @@ def identify_high_confidence_proteins(peptideDf):
     )
 
 
-def initialize__format_peptide_protein_connections(peptideDf, proteinColumn="protein"):
+def initialize__format_peptide_protein_connections(
+    peptideDf, proteinColumn="protein", vocabulary=None
+):
     """
     Determines every individual peptide-protein edge connection.
 
@@ -56,19 +66,29 @@ def initialize__format_peptide_protein_connections(peptideDf, proteinColumn="pro
         The output of the library-query matching workflow, where library peptides were
         identified.
 
+    proteinColumn : string
+        The column of peptideDf holding protein group strings.
+
+    vocabulary : ProteinGroupVocabulary, optional
+        Vocabulary of the protein column. Created from the column if not given.
+
     Returns
     -------
     peptideProteinConnectionsDf : pandas DataFrame
         A 2-column dataframe representing single peptide-protein relationships.
 
     """
-    peptideProteinConnections = []
-    for i in range(len(peptideDf)):
-        peptide = peptideDf["peptide"].loc[i]
-        proteinGroup = peptideDf[proteinColumn].loc[i]
-        for protein in format_protein_string_to_list(proteinGroup):
-            peptideProteinConnections.append((peptide, protein))
-    return pd.DataFrame(peptideProteinConnections, columns=["peptide", "protein"])
+    if vocabulary is None:
+        vocabulary = ProteinGroupVocabulary.from_protein_groups(
+            peptideDf[proteinColumn]
+        )
+    rowIdx, proteinCodes = vocabulary.expand_protein_groups(peptideDf[proteinColumn])
+    return pd.DataFrame(
+        {
+            "peptide": peptideDf["peptide"].to_numpy()[rowIdx],
+            "protein": vocabulary.proteins[proteinCodes],
+        }
+    )
 
 
 def collapse__group_identically_connected_peptides_and_proteins(
@@ -79,7 +99,11 @@ def collapse__group_identically_connected_peptides_and_proteins(
 
     Extended Summary
     ----------------
-    The "collapse" step of the ID Picker algorithm.
+    The "collapse" step of the ID Picker algorithm. Peptides (and proteins) are grouped by
+        hashing the integer codes of the nodes they connect to (see
+        group_nodes_by_identical_edges), and the connections between the resulting groups
+        are deduplicated as pairs of integer group codes, in time linear in the number of
+        connections.
 
     Parameters
     ----------
@@ -92,36 +116,95 @@ def collapse__group_identically_connected_peptides_and_proteins(
         A 2-column dataframe representing single peptide-protein relationships, where
             redundant relationships have been collapsed into single groups.
     """
-    peptideProteinConnectionsDf["peptideGroup"] = group_nodes_by_identical_edges(
-        peptideProteinConnectionsDf, isPeptideNodes=True
+    peptideGroupCodes, peptideGroups = _group_nodes_by_identical_edges(
+        peptideProteinConnectionsDf["peptide"].to_numpy(),
+        peptideProteinConnectionsDf["protein"].to_numpy(),
     )
-    peptideProteinConnectionsDf["proteinGroup"] = group_nodes_by_identical_edges(
-        peptideProteinConnectionsDf, isPeptideNodes=False
+    proteinGroupCodes, proteinGroups = _group_nodes_by_identical_edges(
+        peptideProteinConnectionsDf["protein"].to_numpy(),
+        peptideProteinConnectionsDf["peptide"].to_numpy(),
+    )
+    _, firstConnectionIdx = np.unique(
+        peptideGroupCodes * len(proteinGroups) + proteinGroupCodes, return_index=True
+    )
+    firstConnectionIdx.sort()
+    return pd.DataFrame(
+        {
+            "peptide": [
+                peptideGroups[code] for code in peptideGroupCodes[firstConnectionIdx]
+            ],
+            "protein": [
+                proteinGroups[code] for code in proteinGroupCodes[firstConnectionIdx]
+            ],
+        }
     )
-    peptideProteinConnectionsDf = peptideProteinConnectionsDf[
-        ["peptideGroup", "proteinGroup"]
-    ]
-    peptideProteinConnectionsDf = peptideProteinConnectionsDf.drop_duplicates(
-        ["peptideGroup", "proteinGroup"]
-    ).reset_index(drop=True)
-    peptideProteinConnectionsDf.columns = ["peptide", "protein"]
-    return peptideProteinConnectionsDf
 
 
 def group_nodes_by_identical_edges(df, isPeptideNodes):
+    """
+    Labels each peptide-protein connection with the group of its peptide (or protein, if
+        isPeptideNodes is false). See _group_nodes_by_identical_edges.
+    """
     if isPeptideNodes:
         mainNode = "peptide"
         connectedNode = "protein"
     else:
         mainNode = "protein"
         connectedNode = "peptide"
-    tempDf = df.copy()
-    tempDf["allConnections"] = df.groupby(mainNode)[connectedNode].transform(
-        lambda x: [tuple(x.tolist())] * len(x)
+    groupCodes, groups = _group_nodes_by_identical_edges(
+        df[mainNode].to_numpy(), df[connectedNode].to_numpy()
     )
-    return tempDf.groupby("allConnections")[mainNode].transform(
-        lambda x: [tuple(sorted(set(x.tolist())))] * len(x)
+    return pd.Series([groups[code] for code in groupCodes], index=df.index)
+
+
+def _group_nodes_by_identical_edges(mainNodes, connectedNodes):
+    """
+    Groups the main nodes of connections that connect to identical sequences of nodes.
+
+    Extended Summary
+    ----------------
+    Nodes are coded as integers, and the connected node codes of every main node (in the order
+        the connections appear) are gathered with a single stable sort. Each main node is
+        then assigned to a group by hashing the tuple of its connected node codes, so the
+        grouping is linear in the number of connections.
+
+    Parameters
+    ----------
+    mainNodes : np.ndarray
+        The main node (peptide or protein) of each connection.
+
+    connectedNodes : np.ndarray
+        The node each main node connects to in each connection.
+
+    Returns
+    -------
+    groupCodes : np.ndarray
+        The group code of the main node of each connection.
+
+    groups : list
+        The group of each group code, a tuple of the sorted main nodes in the group.
+    """
+    mainCodes, mainUniques = pd.factorize(mainNodes)
+    connectedCodes, _ = pd.factorize(connectedNodes)
+    connectionOrder = np.argsort(mainCodes, kind="stable")
+    connectionOffsets = np.zeros(len(mainUniques) + 1, dtype=np.int64)
+    np.cumsum(
+        np.bincount(mainCodes, minlength=len(mainUniques)), out=connectionOffsets[1:]
     )
+    orderedConnectedCodes = connectedCodes[connectionOrder].tolist()
+    offsets = connectionOffsets.tolist()
+    edgesToGroupCode = {}
+    nodeGroupCodes = np.empty(len(mainUniques), dtype=np.int64)
+    for mainCode in range(len(mainUniques)):
+        edges = tuple(orderedConnectedCodes[offsets[mainCode] : offsets[mainCode + 1]])
+        nodeGroupCodes[mainCode] = edgesToGroupCode.setdefault(
+            edges, len(edgesToGroupCode)
+        )
+    groupMembers = [[] for _ in range(len(edgesToGroupCode))]
+    for node, groupCode in zip(mainUniques.tolist(), nodeGroupCodes.tolist()):
+        groupMembers[groupCode].append(node)
+    groups = [tuple(sorted(members)) for members in groupMembers]
+    return nodeGroupCodes[mainCodes], groups
 
 
 def separate__identify_and_label_independent_clusters(peptideProteinConnectionsDf):
@@ -130,7 +213,10 @@ def separate__identify_and_label_independent_clusters(peptideProteinConnectionsD
 
     Extended Summary
     ----------------
-    The "collapse" step of the ID Picker algorithm.
+    The "separate" step of the ID Picker algorithm. Peptides and proteins are coded as integers
+        and their connections stored as a sparse bipartite adjacency matrix, the connected
+        components of which are the independent clusters. Clusters are numbered in the order
+        they first appear in the dataframe.
 
     Parameters
     ----------
@@ -140,60 +226,31 @@ def separate__identify_and_label_independent_clusters(peptideProteinConnectionsD
 
     Returns
     -------
-    clusterColumn : list
-        A list of cluster IDs. This list can be added as a new column to the input
+    clusterColumn : np.ndarray
+        An array of cluster IDs. This array can be added as a new column to the input
             dataframe, indicating which cluster each peptide-protein relationship
             belongs to.
     """
-    clusterColumn = np.array([-1] * len(peptideProteinConnectionsDf.index))
-    clusters = extract_clusters_from_dataframe(peptideProteinConnectionsDf)
-    for clusterNum in range(len(clusters)):
-        clusterIdx = clusters[clusterNum]
-        clusterColumn[clusterIdx] = clusterNum
-    return clusterColumn
-
-
-def extract_clusters_from_dataframe(df):
-    clusters = []
-    while len(df.index) > 0:
+    peptideCodes, proteinCodes, peptides, proteins = _code_peptide_protein_connections(
+        peptideProteinConnectionsDf
+    )
+    numPeptides, numProteins = len(peptides), len(proteins)
+    numNodes = numPeptides + numProteins
+    adjacencyMatrix = sparse.coo_matrix(
         (
-            initialPeptideSet,
-            initialProteinSet,
-        ) = initialize_peptide_protein_sets_of_next_cluster(df)
-        peptideSet, _ = identify_next_cluster_in_dataframe_recursively(
-            df, initialPeptideSet, initialProteinSet
-        )
-        clusterDf = df[df["peptide"].isin(peptideSet)]
-        clusters.append(clusterDf.index)
-        df = df[~df.index.isin(clusterDf.index)]
-    return clusters
-
-
-def initialize_peptide_protein_sets_of_next_cluster(df):
-    peptideSet = set([df.iloc[0]["peptide"]])
-    proteinSet = set([df.iloc[0]["protein"]])
-    return peptideSet, proteinSet
-
-
-def identify_next_cluster_in_dataframe_recursively(df, oldPeptideSet, oldProteinSet):
-    (
-        newPeptideSet,
-        newProteinSet,
-    ) = identify_all_matching_peptide_proteins_in_cluster_from_old_set(
-        df, oldPeptideSet, oldProteinSet
+            np.ones(len(peptideCodes), dtype=np.int8),
+            (peptideCodes, numPeptides + proteinCodes),
+        ),
+        shape=(numNodes, numNodes),
     )
-    if newPeptideSet == oldPeptideSet and newProteinSet == oldProteinSet:
-        return oldPeptideSet, newPeptideSet
-    return identify_next_cluster_in_dataframe_recursively(
-        df, newPeptideSet, newProteinSet
+    _, nodeComponents = connected_components(adjacencyMatrix, directed=False)
+    connectionComponents = nodeComponents[peptideCodes]
+    components, firstConnectionIdx, clusterIdx = np.unique(
+        connectionComponents, return_index=True, return_inverse=True
     )
-
-
-def identify_all_matching_peptide_proteins_in_cluster_from_old_set(
-    df, peptideSet, proteinSet
-):
-    df = df[df["peptide"].isin(peptideSet) | df["protein"].isin(proteinSet)]
-    return set(df["peptide"]), set(df["protein"])
+    clusterNumbers = np.empty(len(components), dtype=np.int64)
+    clusterNumbers[np.argsort(firstConnectionIdx)] = np.arange(len(components))
+    return clusterNumbers[clusterIdx]
 
 
 def reduce__identify_minimum_number_of_most_connected_proteins(
@@ -204,7 +261,16 @@ def reduce__identify_minimum_number_of_most_connected_proteins(
 
     Extended Summary
     ----------------
-    The "reduce" step of the ID Picker algorithm.
+    The "reduce" step of the ID Picker algorithm, a greedy set cover. The protein connected to
+        the most unclaimed peptides is accepted, claiming its peptides, until every peptide
+        is claimed. Ties are broken by the total number of peptides connected to the
+        protein, then by the protein in ascending order.
+
+    Proteins are kept in a heap keyed by their number of unclaimed peptides. As these numbers
+        only decrease, a protein whose key is out of date when it reaches the top of the heap
+        is pushed back with its current key, and a protein whose key is current is the next
+        protein accepted. Clusters do not share peptides, so accepting proteins across all
+        clusters at once accepts the same proteins as accepting them one cluster at a time.
 
     Parameters
     ----------
@@ -217,56 +283,72 @@ def reduce__identify_minimum_number_of_most_connected_proteins(
     leadingProteins : set
         A set of proteins determined with high confidence to be present.
     """
+    peptideCodes, proteinCodes, peptides, proteins = _code_peptide_protein_connections(
+        peptideProteinConnectionsDf
+    )
+    numPeptides, numProteins = len(peptides), len(proteins)
+    proteinRanks = np.empty(numProteins, dtype=np.int64)
+    proteinRanks[sorted(range(numProteins), key=lambda code: proteins[code])] = (
+        np.arange(numProteins)
+    )
+    connectionMatrix = sparse.csr_matrix(
+        (np.ones(len(peptideCodes), dtype=np.int64), (proteinCodes, peptideCodes)),
+        shape=(numProteins, numPeptides),
+    )
+    peptideToProteinMatrix = connectionMatrix.T.tocsr()
+    originalProteinCounts = np.asarray(connectionMatrix.sum(axis=1)).ravel()
+    unclaimedProteinCounts = originalProteinCounts.copy()
+    isPeptideClaimed = np.zeros(numPeptides, dtype=bool)
+    proteinHeap = [
+        (
+            -unclaimedProteinCounts[code],
+            -originalProteinCounts[code],
+            proteinRanks[code],
+            code,
+        )
+        for code in range(numProteins)
+    ]
+    heapq.heapify(proteinHeap)
     leadingProteins = set()
-    for _, clusterDf in peptideProteinConnectionsDf.groupby("cluster"):
-        clusterDf["originalProteinCount"] = (
-            label_proteins_by_original_protein_count_for_breaking_ties(clusterDf)
+    while proteinHeap:
+        negativeUnclaimedCount, negativeOriginalCount, rank, code = heapq.heappop(
+            proteinHeap
         )
-        (
-            sortedClusterDf,
-            initialAcceptedProteins,
-        ) = initialize_protein_identification_recursion_parameters(clusterDf)
-        leadingProteins.update(
-            identify_acceptable_proteins_recursively(
-                sortedClusterDf, initialAcceptedProteins
+        if unclaimedProteinCounts[code] == 0:
+            continue
+        if -negativeUnclaimedCount != unclaimedProteinCounts[code]:
+            heapq.heappush(
+                proteinHeap,
+                (-unclaimedProteinCounts[code], negativeOriginalCount, rank, code),
+            )
+            continue
+        leadingProteins.add(proteins[code])
+        proteinPeptideCodes = connectionMatrix.indices[
+            connectionMatrix.indptr[code] : connectionMatrix.indptr[code + 1]
+        ]
+        for peptide in proteinPeptideCodes[~isPeptideClaimed[proteinPeptideCodes]]:
+            isPeptideClaimed[peptide] = True
+            start, stop = (
+                peptideToProteinMatrix.indptr[peptide],
+                peptideToProteinMatrix.indptr[peptide + 1],
+            )
+            np.subtract.at(
+                unclaimedProteinCounts,
+                peptideToProteinMatrix.indices[start:stop],
+                peptideToProteinMatrix.data[start:stop],
             )
-        )
     return leadingProteins
 
 
-def initialize_protein_identification_recursion_parameters(clusterDf):
-    sortedClusterDf = sort_dataframe_by_descending_protein_count(clusterDf)
-    initialAcceptedProteins = set([sortedClusterDf.iloc[0]["protein"]])
-    return sortedClusterDf, initialAcceptedProteins
-
-
-def sort_dataframe_by_descending_protein_count(df):
-    return (
-        df.assign(
-            currentProteinCount=df.groupby("protein")["protein"].transform("count")
-        )
-        .sort_values(
-            by=["currentProteinCount", "originalProteinCount", "protein"],
-            ascending=[False, False, True],
-        )
-        .drop(["currentProteinCount"], axis=1)
+def _code_peptide_protein_connections(peptideProteinConnectionsDf):
+    """
+    Codes the peptides and proteins of peptide-protein connections as integers, returning the
+        codes of each connection and the peptide and protein of each code.
+    """
+    peptideCodes, peptides = pd.factorize(
+        peptideProteinConnectionsDf["peptide"].to_numpy()
     )
-
-
-def label_proteins_by_original_protein_count_for_breaking_ties(df):
-    return df.groupby("protein")["protein"].transform("count")
-
-
-def identify_acceptable_proteins_recursively(sortedClusterDf, acceptedProteinSet):
-    acceptedProteinDf = sortedClusterDf[
-        sortedClusterDf["protein"].isin(acceptedProteinSet)
-    ]
-    unclaimedPeptideDf = sortedClusterDf[
-        ~sortedClusterDf["peptide"].isin(acceptedProteinDf["peptide"])
-    ]
-    if len(unclaimedPeptideDf.index) == 0:
-        return set(acceptedProteinDf["protein"])
-    unclaimedPeptideDf = sort_dataframe_by_descending_protein_count(unclaimedPeptideDf)
-    nextProtein = unclaimedPeptideDf.iloc[0]["protein"]
-    acceptedProteinSet.add(nextProtein)
-    return identify_acceptable_proteins_recursively(sortedClusterDf, acceptedProteinSet)
+    proteinCodes, proteins = pd.factorize(
+        peptideProteinConnectionsDf["protein"].to_numpy()
+    )
+    return peptideCodes, proteinCodes, peptides, proteins
@@ -0,0 +1,132 @@
+from zodiaq.utils import format_protein_string_to_list
+import numpy as np
+import pandas as pd
+
+
+class ProteinGroupVocabulary:
+    """
+    Integer-coded vocabulary of protein group strings (such as '3/protein1/protein2/protein3')
+        and the proteins they contain, shared by the FDR, ID Picker and quantification steps.
+
+    Extended Summary
+    ----------------
+    Protein group columns repeat the same few protein groups across many peptides. This class
+        parses every distinct protein group once, storing the proteins of each group in CSR
+        format, where the proteins of the group with code i are the protein codes between
+        groupOffsets[i] and groupOffsets[i+1] of groupProteinCodes. A protein group column
+        (such as the protein column of a peptide dataframe, in which each row is a peptide)
+        is then expanded into its peptide-protein connections with array operations.
+        Protein names are only decoded from their codes when a dataframe is created.
+
+    Attributes
+    ----------
+    proteinGroups : np.ndarray
+        Array of the distinct protein group strings, indexed by group code.
+    groupOffsets : np.ndarray
+        Integer array of length len(proteinGroups) + 1 indicating where the proteins of each
+            group start and end in groupProteinCodes.
+    groupProteinCodes : np.ndarray
+        Integer array of the protein codes of every group, in the order they appear in the
+            protein group string.
+    proteins : np.ndarray
+        Array of the distinct protein names, indexed by protein code.
+    """
+
+    def __init__(self, proteinGroups, groupOffsets, groupProteinCodes, proteins):
+        self.proteinGroups = proteinGroups
+        self.groupOffsets = groupOffsets
+        self.groupProteinCodes = groupProteinCodes
+        self.proteins = proteins
+        self._proteinGroupIndex = pd.Index(proteinGroups)
+
+    @classmethod
+    def from_protein_groups(cls, proteinGroupColumn):
+        """
+        Creates a vocabulary of the distinct protein groups of a protein group column.
+        """
+        proteinGroups = pd.unique(np.asarray(proteinGroupColumn, dtype=object))
+        proteinLists = [
+            format_protein_string_to_list(proteinGroup)
+            for proteinGroup in proteinGroups
+        ]
+        groupOffsets = np.zeros(len(proteinGroups) + 1, dtype=np.int64)
+        np.cumsum([len(proteins) for proteins in proteinLists], out=groupOffsets[1:])
+        groupProteinCodes, proteins = pd.factorize(
+            np.array(
+                [protein for proteins in proteinLists for protein in proteins],
+                dtype=object,
+            )
+        )
+        return cls(proteinGroups, groupOffsets, groupProteinCodes, proteins)
+
+    def add_protein_groups(self, proteinGroupColumn):
+        """
+        Returns a vocabulary that also contains the protein groups of a column that are
+            missing from this vocabulary (such as leading protein groups formed from its
+            proteins). Only the missing protein groups are parsed, and proteins already in
+            the vocabulary keep their protein codes.
+        """
+        proteinGroups = pd.unique(np.asarray(proteinGroupColumn, dtype=object))
+        newGroups = proteinGroups[
+            self._proteinGroupIndex.get_indexer(proteinGroups) < 0
+        ]
+        proteinLists = [
+            format_protein_string_to_list(proteinGroup) for proteinGroup in newGroups
+        ]
+        newGroupSizes = [len(proteins) for proteins in proteinLists]
+        newGroupProteins = np.array(
+            [protein for proteins in proteinLists for protein in proteins],
+            dtype=object,
+        )
+        newGroupProteinCodes = pd.Index(self.proteins).get_indexer(newGroupProteins)
+        isNewProtein = newGroupProteinCodes < 0
+        newProteinCodes, newProteins = pd.factorize(newGroupProteins[isNewProtein])
+        newGroupProteinCodes[isNewProtein] = len(self.proteins) + newProteinCodes
+        return ProteinGroupVocabulary(
+            np.concatenate([self.proteinGroups, newGroups]),
+            np.concatenate(
+                [self.groupOffsets, self.groupOffsets[-1] + np.cumsum(newGroupSizes)]
+            ).astype(np.int64),
+            np.concatenate([self.groupProteinCodes, newGroupProteinCodes]),
+            np.concatenate([self.proteins, newProteins]),
+        )
+
+    def encode_protein_groups(self, proteinGroupColumn) -> np.ndarray:
+        """
+        Returns the group code of each protein group in a column. Every protein group must be
+            in the vocabulary.
+        """
+        groupCodes = self._proteinGroupIndex.get_indexer(
+            np.asarray(proteinGroupColumn, dtype=object)
+        )
+        if len(groupCodes) and groupCodes.min() < 0:
+            raise ValueError(
+                "The protein group column contains protein groups missing from the vocabulary."
+            )
+        return groupCodes
+
+    def expand_protein_groups(self, proteinGroupColumn):
+        """
+        Expands a protein group column into its row-protein connections.
+
+        Parameters
+        ----------
+        proteinGroupColumn : pandas Series
+            Column of protein group strings.
+
+        Returns
+        -------
+        rowIdx : np.ndarray
+            The position in the column of each connection, in increasing order.
+
+        proteinCodes : np.ndarray
+            The protein code of each connection. The proteins of each row are in the order
+                they appear in its protein group string.
+        """
+        groupCodes = self.encode_protein_groups(proteinGroupColumn)
+        starts = self.groupOffsets[groupCodes]
+        lengths = self.groupOffsets[groupCodes + 1] - starts
+        rowIdx = np.repeat(np.arange(len(groupCodes)), lengths)
+        connectionOffsets = np.cumsum(lengths) - lengths
+        positions = np.arange(len(rowIdx)) - connectionOffsets[rowIdx] + starts[rowIdx]
+        return rowIdx, self.groupProteinCodes[positions]
@@ -1,7 +1,6 @@
 import pandas as pd
 import numpy as np
-from zodiaq.utils import format_protein_string_to_list
-from .idpickerFunctions import initialize__format_peptide_protein_connections
+from .proteinGroupVocabulary import ProteinGroupVocabulary
 from collections import defaultdict
 from itertools import chain
 import scipy.linalg as linalg
@@ -11,14 +10,24 @@ def calculate_ion_count_from_peptides_of_protein(ionCountList):
     return np.mean(ionCountList)
 
 
-def calculate_ion_count_for_each_protein_in_protein_fdr_df(proteinDf):
-    separateProteinData = []
-    for _, row in proteinDf.iterrows():
-        proteins = format_protein_string_to_list(row["leadingProtein"])
-        for protein in proteins:
-            separateProteinData.append([protein, row["ionCount"]])
+def calculate_ion_count_for_each_protein_in_protein_fdr_df(proteinDf, vocabulary=None):
+    """
+    Returns the mean ion count of the peptides of each protein in the leading protein groups
+        of a protein dataframe. If the ProteinGroupVocabulary of the peptide protein column
+        is given, leading protein groups are parsed only if they are not already in it.
+    """
+    if vocabulary is None:
+        vocabulary = ProteinGroupVocabulary.from_protein_groups(
+            proteinDf["leadingProtein"]
+        )
+    else:
+        vocabulary = vocabulary.add_protein_groups(proteinDf["leadingProtein"])
+    rowIdx, proteinCodes = vocabulary.expand_protein_groups(proteinDf["leadingProtein"])
     separateProteinDf = pd.DataFrame(
-        separateProteinData, columns=["protein", "ionCount"]
+        {
+            "protein": vocabulary.proteins[proteinCodes],
+            "ionCount": proteinDf["ionCount"].to_numpy()[rowIdx],
+        }
     )
     proteinIonCountDf = (
         separateProteinDf.groupby("protein")
@@ -1,22 +1,9 @@
 import numpy as np
-from scipy.spatial.distance import cosine
-import matplotlib.pyplot as pyplot
-
-
-def score_library_to_query_matches(matches):
-    scoreDf = (
-        matches.groupby(["libraryIdx", "queryIdx"])
-        .apply(
-            lambda x: calculate_cosine_similarity_score(
-                np.sqrt(x["libraryIntensity"]), np.sqrt(x["queryIntensity"])
-            )
-        )
-        .reset_index(name="cosineScore")
-    )
-    return scoreDf.sort_values("cosineScore", ascending=False).reset_index(drop=True)
 
 
 def calculate_cosine_similarity_score(vectorA, vectorB):
+    from scipy.spatial.distance import cosine
+
     return 1 - cosine(vectorA, vectorB)
 
 
@@ -3,6 +3,15 @@ from .utils import (
     format_protein_string_to_list,
     format_protein_list_to_string,
     confirm_proteins_in_list_are_in_appropriate_format,
+    create_process_pool,
 )
 
 from .Printer import Printer
+
+from .tableFileFunctions import (
+    tableFileFormats,
+    is_parquet_supported,
+    write_table_file,
+    write_table_file_in_chunks,
+    read_table_file,
+)
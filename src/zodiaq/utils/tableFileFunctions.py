@@ -0,0 +1,190 @@
+import importlib.util
+import pandas as pd
+import numpy as np
+
+tableFileFormats = ["csv", "parquet"]
+dictionaryEncodedColumns = ["peptide", "protein", "leadingProtein", "name"]
+
+
+def is_parquet_supported():
+    """Returns true if the optional pyarrow dependency for parquet files is installed."""
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def write_table_file(df, fileHeader, fileFormat="csv", index=False):
+    """
+    Writes a zoDIAq output table in the given file format, returning the path of the file.
+
+    Extended Summary
+    ----------------
+    Parquet files store peptide and protein columns with dictionary encoding and numeric
+        columns with their numeric types, and require the optional pyarrow dependency. See
+        prepare_dataframe_for_parquet for how columns of mixed types are stored.
+
+    Parameters
+    ----------
+    df : pandas DataFrame
+        The table to write.
+
+    fileHeader : string
+        Path of the file without its file type extension.
+
+    fileFormat : string
+        One of tableFileFormats.
+
+    index : bool
+        If true, the index of df is written as well.
+
+    Returns
+    -------
+    filePath : string
+    """
+    filePath = f"{fileHeader}.{fileFormat}"
+    if fileFormat == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(
+            prepare_dataframe_for_parquet(df), preserve_index=index
+        )
+        pq.write_table(
+            table, filePath, use_dictionary=_find_dictionary_encoded_columns(df)
+        )
+    else:
+        df.to_csv(filePath, index=index)
+    return filePath
+
+
+def write_table_file_in_chunks(dfs, fileHeader, fileFormat="csv", schemaDf=None):
+    """
+    Writes a zoDIAq output table given as consecutive chunks of rows, so the full table is
+        never held in memory. The result is identical to writing the concatenated chunks
+        with write_table_file. Returns the path of the file.
+
+    Extended Summary
+    ----------------
+    The type of a parquet column must be known before the first chunk is written, but the
+        type prepare_dataframe_for_parquet chooses for an object column depends on every
+        value in it. The parquet schema is therefore declared up front from schemaDf, and
+        each chunk is converted to that schema rather than to the types of its own values.
+
+    Parameters
+    ----------
+    dfs : iterable of pandas DataFrame
+        The chunks of the table, in order.
+
+    fileHeader : string
+        Path of the file without its file type extension.
+
+    fileFormat : string
+        One of tableFileFormats.
+
+    schemaDf : pandas DataFrame
+        A table with the columns of the output whose object columns hold every kind of value
+            found in those columns of the chunks. Required for parquet files. See
+            create_parquet_schema.
+
+    Returns
+    -------
+    filePath : string
+    """
+    filePath = f"{fileHeader}.{fileFormat}"
+    if fileFormat == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if schemaDf is None:
+            raise ValueError(
+                "Writing a parquet table in chunks requires a schemaDf to declare the column types."
+            )
+        schema = create_parquet_schema(schemaDf)
+        with pq.ParquetWriter(
+            filePath,
+            schema,
+            use_dictionary=_find_dictionary_encoded_columns(schemaDf),
+        ) as writer:
+            for df in dfs:
+                writer.write_table(
+                    pa.Table.from_pandas(
+                        prepare_dataframe_for_parquet(df, schema),
+                        schema=schema,
+                        preserve_index=False,
+                    )
+                )
+    else:
+        for chunkIdx, df in enumerate(dfs):
+            df.to_csv(
+                filePath,
+                index=False,
+                header=chunkIdx == 0,
+                mode="w" if chunkIdx == 0 else "a",
+            )
+    return filePath
+
+
+def read_table_file(filePath, **kwargs):
+    """Reads a zoDIAq output table, choosing the file format by the file type extension."""
+    if filePath.endswith(".parquet"):
+        return pd.read_parquet(filePath, **kwargs)
+    return pd.read_csv(filePath, **kwargs)
+
+
+def create_parquet_schema(df):
+    """
+    Returns the pyarrow schema of a table written to a parquet file, with the column types
+        prepare_dataframe_for_parquet gives it.
+    """
+    import pyarrow as pa
+
+    return pa.Schema.from_pandas(
+        prepare_dataframe_for_parquet(df), preserve_index=False
+    )
+
+
+def prepare_dataframe_for_parquet(df, schema=None):
+    """
+    Gives every column of a table a single type for writing to a parquet file.
+
+    Extended Summary
+    ----------------
+    Object columns can mix numbers with text (such as retention times that were not parsed
+        as numbers), which parquet cannot store. Columns are converted to the types reading
+        the table back from a csv file would give them: object columns whose values are all
+        numbers or empty strings become float columns (empty strings become NaN), and other
+        object columns become text columns.
+
+    If a schema is given (see create_parquet_schema), object columns are instead converted
+        to the type the schema declares for them, so that a chunk of a table gets the types
+        of the full table. A ValueError is raised if a column declared as numeric holds text.
+    """
+    df = df.copy()
+    for column in df.columns:
+        if df[column].dtype != object:
+            continue
+        values = df[column].where(df[column] != "", np.nan)
+        numericValues = pd.to_numeric(values, errors="coerce")
+        isNumeric = numericValues.isna().equals(values.isna())
+        if schema is not None:
+            isTextInSchema = _is_text_field(schema.field(column))
+            if not isNumeric and not isTextInSchema:
+                raise ValueError(
+                    f"Column '{column}' holds text values, but the parquet schema declares it as {schema.field(column).type}."
+                )
+            isNumeric = not isTextInSchema
+        if isNumeric:
+            df[column] = numericValues.astype(np.float64)
+        else:
+            df[column] = values.map(
+                lambda value: value if pd.isna(value) else str(value)
+            )
+    return df
+
+
+def _is_text_field(field):
+    import pyarrow as pa
+
+    return pa.types.is_string(field.type) or pa.types.is_large_string(field.type)
+
+
+def _find_dictionary_encoded_columns(df):
+    return [column for column in dictionaryEncodedColumns if column in df.columns]
@@ -2,6 +2,9 @@ import os.path
 import pandas as pd
 import numpy as np
 import re
+import sys
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 
 
 def create_outfile_header(outputDir, queryFile, correction):
@@ -65,9 +68,26 @@ def format_protein_list_to_string(proteinList):
     return f"{len(proteinList)}/{'/'.join(sorted(proteinList))}"
 
 
-def confirm_proteins_in_list_are_in_appropriate_format(proteinList):
+def confirm_proteins_in_list_are_in_appropriate_format(proteinList, vocabulary=None):
+    """
+    Returns true if every protein group string in a list has the format of
+        format_protein_list_to_string.
+
+    If the ProteinGroupVocabulary of the list is given, its distinct protein groups are
+        checked against the number of proteins already parsed from them, instead of
+        finding and splitting the distinct strings of the list again.
+    """
     proteinPattern = re.compile(r"^\d+(?:\/.*[^\/])+$")
-    for protein in proteinList:
+    if vocabulary is not None:
+        groupSizes = np.diff(vocabulary.groupOffsets)
+        for proteinGroup, groupSize in zip(vocabulary.proteinGroups, groupSizes):
+            if (
+                not proteinPattern.search(proteinGroup)
+                or int(proteinGroup.split("/", 1)[0]) != groupSize
+            ):
+                return False
+        return True
+    for protein in pd.unique(np.asarray(proteinList, dtype=object)):
         if not proteinPattern.search(protein) or not confirm_protein_count_is_accurate(
             protein
         ):
@@ -80,3 +100,41 @@ def confirm_protein_count_is_accurate(proteinStr):
     count = listFormat[0]
     proteins = listFormat[1:]
     return len(proteins) == int(count)
+
+
+def create_process_pool(numWorkers, initializer=None, initargs=()):
+    """
+    Creates a process pool for parallelizing zoDIAq workflows.
+
+    Extended Summary
+    ----------------
+    Where supported, worker processes are forked from the main process. Large read-only
+        objects passed through initargs (such as the library) are then shared with the
+        workers through copy-on-write memory instead of being pickled. Other platforms
+        pickle initargs once per worker, never once per task.
+
+    Parameters
+    ----------
+    numWorkers : int
+        The maximum number of worker processes.
+
+    initializer : function
+        Function run once by each worker process when it starts.
+
+    initargs : tuple
+        Arguments passed to the initializer function.
+
+    Returns
+    -------
+    pool : concurrent.futures.ProcessPoolExecutor
+    """
+    if sys.platform.startswith("linux"):
+        context = multiprocessing.get_context("fork")
+    else:
+        context = multiprocessing.get_context()
+    return ProcessPoolExecutor(
+        max_workers=numWorkers,
+        mp_context=context,
+        initializer=initializer,
+        initargs=initargs,
+    )
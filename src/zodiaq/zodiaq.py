@@ -1,32 +1,26 @@
 import os
 import warnings
-import pandas as pd
+from timeit import default_timer as timer
 from zodiaq import set_args_from_command_line_input, check_for_conflicting_args
-from zodiaq.identification import Identifier
 from zodiaq.utils import (
     create_outfile_header,
     confirm_proteins_in_list_are_in_appropriate_format,
     Printer,
+    create_process_pool,
+    write_table_file,
+    read_table_file,
 )
-from zodiaq.scoring import (
-    create_spectral_fdr_output_from_full_output_sorted_by_desired_score,
-    create_peptide_fdr_output_from_full_output_sorted_by_desired_score,
-    create_protein_fdr_output_from_peptide_fdr_output,
-    compile_ion_count_comparison_across_runs_df,
-    compile_common_protein_quantification_file,
-    calculate_macc_score,
-)
-from zodiaq.targetedReanalysis import (
-    create_mass_spec_input_dataframes_for_targeted_reanalysis_of_identified_peptides,
-)
-from zodiaq.gui import run_gui
 
 
+# Each subcommand imports the workflow modules it uses when it runs, so a subcommand does not
+#   pay for importing the GUI (PyQt5) or the identification stack (numba, pyteomics) it never uses.
 def main():
     parser = set_args_from_command_line_input()
     args = vars(parser.parse_args())
     check_for_conflicting_args(args)
     if args["command"] == "gui" or args["command"] is None:
+        from zodiaq.gui import run_gui
+
         run_gui()
     elif args["command"] == "id":
         run_identification(args)
@@ -34,36 +28,126 @@ def main():
         run_scoring(args)
     elif args["command"] == "targetedReanalysis":
         run_targeted_reanalysis(args)
+    elif args["command"] == "warmup":
+        run_warmup(args)
 
 
 def run_identification(args):
+    from zodiaq.identification import Identifier
+    from zodiaq.identification.numbaCompilationFunctions import (
+        compile_numba_functions,
+    )
+
     if args["cancelWarnings"]:
         warnings.filterwarnings("ignore")
     printer = Printer()
     printer(f"Begin Peptide Identification Process - output in '{args['output']}'")
     os.mkdir(args["output"])
-    identifier = Identifier(args)
-    for queryFile in args["input"]:
-        printer(f"Beginning Identification for '{queryFile}' input file")
-        identificationFullOutputDf = identifier.identify_library_spectra_in_query_file(
-            queryFile
-        )
-        if isinstance(identificationFullOutputDf, str):
-            warnings.warn(
-                f"{identificationFullOutputDf} Skipping {queryFile} file.", UserWarning
-            )
-            continue
-
-        outFileHeader = create_outfile_header(
-            args["output"], queryFile, args["correctionDegree"]
+    compilationTime = compile_numba_functions([args["matchTolerance"]])
+    printer(
+        f"Numba functions compiled or loaded from cache in {compilationTime:.2f} seconds"
+    )
+    executionStartTime = timer()
+    numFileWorkers = min(args.get("fileWorkers", 1), len(args["input"]))
+    if numFileWorkers > 1:
+        identifier = Identifier({**args, "workers": 1})
+        identify_query_files_in_parallel(identifier, args, numFileWorkers)
+    else:
+        identifier = Identifier(args)
+        for queryFile in args["input"]:
+            identify_query_file(identifier, queryFile, args)
+    printer(
+        f"End Peptide Identification Process ({timer() - executionStartTime:.2f} seconds excluding numba compilation)"
+    )
+
+
+def run_warmup(args):
+    from zodiaq.identification.numbaCompilationFunctions import (
+        compile_numba_functions,
+    )
+
+    printer = Printer()
+    printer("Begin Compiling Numba Functions")
+    compilationTime = compile_numba_functions()
+    printer(f"End Compiling Numba Functions ({compilationTime:.2f} seconds)")
+
+
+def identify_query_file(identifier, queryFile, args):
+    printer = Printer()
+    printer(f"Beginning Identification for '{queryFile}' input file")
+    outFileHeader = create_outfile_header(
+        args["output"], queryFile, args["correctionDegree"]
+    )
+    outputFormat = args.get("outputFormat", "csv")
+    if args.get("maxMemory"):
+        noMatchesMessage = identifier.write_identifications_of_query_file(
+            queryFile, f"{outFileHeader}_fullOutput", outputFormat
         )
-        identificationFullOutputDf.to_csv(
-            f"{outFileHeader}_fullOutput.csv", index=False
+        if noMatchesMessage:
+            warnings.warn(f"{noMatchesMessage} Skipping {queryFile} file.", UserWarning)
+        return
+    identificationFullOutputDf = identifier.identify_library_spectra_in_query_file(
+        queryFile
+    )
+    if isinstance(identificationFullOutputDf, str):
+        warnings.warn(
+            f"{identificationFullOutputDf} Skipping {queryFile} file.", UserWarning
         )
-    printer("End Peptide Identification Process")
+        return
+    write_table_file(
+        identificationFullOutputDf, f"{outFileHeader}_fullOutput", outputFormat
+    )
+
+
+def identify_query_files_in_parallel(identifier, args, numFileWorkers):
+    """
+    Identifies the input files in a pool of worker processes, at most numFileWorkers at a time.
+        The identifier (and the library it holds) is shared with the workers rather than
+        loaded once per file. Each worker writes the output of its file, and a file that
+        fails identification is reported and skipped without affecting the other files.
+        Numba functions compiled by run_identification are inherited by forked workers.
+    """
+    with create_process_pool(
+        numFileWorkers,
+        initializer=_initialize_identification_worker,
+        initargs=(identifier, args),
+    ) as pool:
+        futures = [
+            pool.submit(_identify_query_file_in_worker, queryFile)
+            for queryFile in args["input"]
+        ]
+        for queryFile, future in zip(args["input"], futures):
+            try:
+                future.result()
+            except Exception as error:
+                warnings.warn(
+                    f"Identification failed ({type(error).__name__}: {error}). Skipping {queryFile} file.",
+                    UserWarning,
+                )
+
+
+_identificationWorkerState = {}
+
+
+def _initialize_identification_worker(identifier, args):
+    _identificationWorkerState["identifier"] = identifier
+    _identificationWorkerState["args"] = args
+
+
+def _identify_query_file_in_worker(queryFile):
+    identify_query_file(
+        _identificationWorkerState["identifier"],
+        queryFile,
+        _identificationWorkerState["args"],
+    )
 
 
 def run_scoring(args):
+    from zodiaq.scoring import (
+        compile_ion_count_comparison_across_runs_df,
+        compile_common_protein_quantification_file,
+    )
+
     printer = Printer()
     printer("Begin Scoring")
     outputDir = os.path.join(
@@ -72,42 +156,31 @@ def run_scoring(args):
     )
     if not os.path.exists(outputDir):
         os.mkdir(outputDir)
+    outputFormat = args.get("outputFormat", "csv")
+    numFileWorkers = min(args.get("fileWorkers", 1), len(args["input"]["idFiles"]))
+    if numFileWorkers > 1:
+        scoredFiles = score_identification_files_in_parallel(
+            args, outputDir, numFileWorkers
+        )
+    else:
+        scoredFiles = [
+            score_identification_file(idDfFile, outputDir, args)
+            for idDfFile in args["input"]["idFiles"]
+        ]
     peptideDfs = {}
     proteinDfs = {}
-    for idDfFile in args["input"]["idFiles"]:
-        printer(f"Beginning Scoring for '{idDfFile}' input file")
-        idDf = pd.read_csv(os.path.join(args["input"]["zodiaqDirectory"], idDfFile))
-        idDf["MaCC_Score"] = idDf.apply(
-            lambda x: calculate_macc_score(x["shared"], x["cosine"]), axis=1
-        )
-        idDf.sort_values(
-            ["MaCC_Score", "peptide"], ascending=[False, True], inplace=True
-        )
-        spectralDf = (
-            create_spectral_fdr_output_from_full_output_sorted_by_desired_score(idDf)
-        )
-        fileHeader = extract_file_name_without_file_type(idDfFile)
-        spectralDf.to_csv(
-            os.path.join(outputDir, f"{fileHeader}_spectralFDR.csv"), index=False
-        )
-        peptideDf = create_peptide_fdr_output_from_full_output_sorted_by_desired_score(
-            idDf
-        )
-        peptideDf.to_csv(
-            os.path.join(outputDir, f"{fileHeader}_peptideFDR.csv"), index=False
-        )
-        peptideDfs[fileHeader] = peptideDf[["peptide", "ionCount"]]
-        if confirm_proteins_in_list_are_in_appropriate_format(peptideDf["protein"]):
-            proteinDf = create_protein_fdr_output_from_peptide_fdr_output(peptideDf)
-            proteinDf.to_csv(
-                os.path.join(outputDir, f"{fileHeader}_proteinFDR.csv"), index=False
-            )
-            proteinDfs[fileHeader] = proteinDf[
-                ["peptide", "leadingProtein", "ionCount", "isDecoy"]
-            ][proteinDf["isDecoy"] == 0].reset_index(drop=True)
+    for fileHeader, peptideDf, proteinDf in scoredFiles:
+        peptideDfs[fileHeader] = peptideDf
+        if proteinDf is not None:
+            proteinDfs[fileHeader] = proteinDf
     printer("Begin Quantifying Common Peptides")
     commonPeptideDf = compile_ion_count_comparison_across_runs_df(peptideDfs, "peptide")
-    commonPeptideDf.to_csv(os.path.join(outputDir, "commonPeptides.csv"))
+    write_table_file(
+        commonPeptideDf,
+        os.path.join(outputDir, "commonPeptides"),
+        outputFormat,
+        index=True,
+    )
     if len(proteinDfs) > 0:
         printer("Begin Quantifying Common Proteins")
         commonProteinDf = compile_common_protein_quantification_file(
@@ -116,11 +189,106 @@ def run_scoring(args):
             args["proteinQuantMethod"],
             args["minNumDifferences"],
         )
-        commonProteinDf.to_csv(os.path.join(outputDir, "commonProteins.csv"))
+        write_table_file(
+            commonProteinDf,
+            os.path.join(outputDir, "commonProteins"),
+            outputFormat,
+            index=True,
+        )
     printer("Finish Scoring")
 
 
+def score_identification_file(idDfFile, outputDir, args):
+    """
+    Scores the identifications of one input file, writing its spectral, peptide and (where
+        possible) protein FDR tables. Returns the file header with the peptide and protein
+        columns needed to quantify peptides and proteins across input files (the protein
+        dataframe is None when proteins cannot be scored).
+    """
+    from zodiaq.scoring import (
+        create_spectral_fdr_output_from_full_output_sorted_by_desired_score,
+        create_peptide_fdr_output_from_full_output_sorted_by_desired_score,
+        create_protein_fdr_output_from_peptide_fdr_output,
+        calculate_macc_score,
+        ProteinGroupVocabulary,
+    )
+
+    printer = Printer()
+    printer(f"Beginning Scoring for '{idDfFile}' input file")
+    outputFormat = args.get("outputFormat", "csv")
+    idDf = read_table_file(os.path.join(args["input"]["zodiaqDirectory"], idDfFile))
+    idDf["MaCC_Score"] = calculate_macc_score(idDf["shared"], idDf["cosine"])
+    idDf.sort_values(["MaCC_Score", "peptide"], ascending=[False, True], inplace=True)
+    spectralDf = create_spectral_fdr_output_from_full_output_sorted_by_desired_score(
+        idDf
+    )
+    fileHeader = extract_file_name_without_file_type(idDfFile)
+    write_table_file(
+        spectralDf,
+        os.path.join(outputDir, f"{fileHeader}_spectralFDR"),
+        outputFormat,
+    )
+    peptideDf = create_peptide_fdr_output_from_full_output_sorted_by_desired_score(idDf)
+    write_table_file(
+        peptideDf,
+        os.path.join(outputDir, f"{fileHeader}_peptideFDR"),
+        outputFormat,
+    )
+    vocabulary = ProteinGroupVocabulary.from_protein_groups(peptideDf["protein"])
+    if not confirm_proteins_in_list_are_in_appropriate_format(
+        peptideDf["protein"], vocabulary
+    ):
+        return fileHeader, peptideDf[["peptide", "ionCount"]], None
+    proteinDf = create_protein_fdr_output_from_peptide_fdr_output(peptideDf, vocabulary)
+    write_table_file(
+        proteinDf,
+        os.path.join(outputDir, f"{fileHeader}_proteinFDR"),
+        outputFormat,
+    )
+    return (
+        fileHeader,
+        peptideDf[["peptide", "ionCount"]],
+        proteinDf[["peptide", "leadingProtein", "ionCount", "isDecoy"]][
+            proteinDf["isDecoy"] == 0
+        ].reset_index(drop=True),
+    )
+
+
+def score_identification_files_in_parallel(args, outputDir, numFileWorkers):
+    """
+    Scores the input files in a pool of worker processes, at most numFileWorkers at a time,
+        returning the score_identification_file output of each file in input order. Only
+        quantification across input files waits for every file to be scored.
+    """
+    with create_process_pool(
+        numFileWorkers,
+        initializer=_initialize_scoring_worker,
+        initargs=(outputDir, args),
+    ) as pool:
+        return list(
+            pool.map(_score_identification_file_in_worker, args["input"]["idFiles"])
+        )
+
+
+_scoringWorkerState = {}
+
+
+def _initialize_scoring_worker(outputDir, args):
+    _scoringWorkerState["outputDir"] = outputDir
+    _scoringWorkerState["args"] = args
+
+
+def _score_identification_file_in_worker(idDfFile):
+    return score_identification_file(
+        idDfFile, _scoringWorkerState["outputDir"], _scoringWorkerState["args"]
+    )
+
+
 def run_targeted_reanalysis(args):
+    from zodiaq.targetedReanalysis import (
+        create_mass_spec_input_dataframes_for_targeted_reanalysis_of_identified_peptides,
+    )
+
     printer = Printer()
     printer("Begin Targeted Reanalysis File Generation")
     outputDir = make_targeted_reanalysis_output_directory_name(args)
@@ -132,7 +300,7 @@ def run_targeted_reanalysis(args):
         scoreType = "peptide"
     for scoreFdrFile in args["input"][scoreType]:
         fileHeader = extract_file_name_without_file_type(scoreFdrFile)
-        scoreDf = pd.read_csv(
+        scoreDf = read_table_file(
             os.path.join(args["input"]["zodiaqDirectory"], scoreFdrFile)
         )
         targetedOutputDict = create_mass_spec_input_dataframes_for_targeted_reanalysis_of_identified_peptides(
@@ -143,8 +311,10 @@ def run_targeted_reanalysis(args):
         )
         for name, df in targetedOutputDict.items():
             if name == "fullDf":
-                df.to_csv(
-                    os.path.join(outputDir, f"{name}_{fileHeader}.csv"), index=False
+                write_table_file(
+                    df,
+                    os.path.join(outputDir, f"{name}_{fileHeader}"),
+                    args.get("outputFormat", "csv"),
                 )
             else:
                 df.to_csv(
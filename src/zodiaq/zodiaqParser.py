@@ -5,6 +5,7 @@ import numpy as np
 from abc import ABC, abstractmethod
 import re
 import warnings
+from zodiaq.utils.tableFileFunctions import tableFileFormats, is_parquet_supported
 
 
 def set_args_from_command_line_input():
@@ -16,6 +17,10 @@ def set_args_from_command_line_input():
     add_id_parser(commandParser)
     add_score_parser(commandParser)
     add_reanalysis_parser(commandParser)
+    warmupParser = commandParser.add_parser(
+        "warmup",
+        help="Compiles the numba functions used in identification and stores them in the numba cache, so later runs (and their worker processes) skip compilation. Run once after installing or upgrading zoDIAq.",
+    )
     return parser
 
 
@@ -74,6 +79,20 @@ def add_id_parser(commandParser):
         action="store_true",
         help="This flag indicates a histogram of the uncorrected PPM values (with lines for the chosen offset/tolerance) should be generated.\nOptional.",
     )
+    idParser.add_argument(
+        "-sc",
+        "--streamCorrection",
+        default=False,
+        action="store_true",
+        help="This flag indicates that uncorrected peak matches should be written to a temporary directory as they are found, so the correction step does not hold the uncorrected matches of the whole query file in memory.\nOptional.",
+    )
+    idParser.add_argument(
+        "-mm",
+        "--maxMemory",
+        type=_RestrictedFloat("maxMemory", minValue=0.1),
+        default=0,
+        help="Memory budget (in gigabytes) for the peak and spectrum matches of a query file. Matches beyond the budget are written to a temporary directory, and the output is written in chunks. With more than one worker, the matches of up to workers + 1 m/z windows are also held while they are added to the budget.\nOptional. Implies the streamCorrection flag.\nValue must be greater than or equal to 0.1.",
+    )
     idParser.add_argument(
         "-w",
         "--cancelWarnings",
@@ -81,6 +100,42 @@ def add_id_parser(commandParser):
         action="store_true",
         help="This flag indicates that warning errors should be oppressed.\nOptional.",
     )
+    idParser.add_argument(
+        "-lc",
+        "--libraryCache",
+        default=False,
+        action="store_true",
+        help="This flag indicates that the loaded library (including generated decoys) should be compiled into a binary cache, which is reused by subsequent runs with the same library file.\nOptional. The cache is stored next to the library file unless a cache directory is given.",
+    )
+    idParser.add_argument(
+        "-qc",
+        "--queryCache",
+        default=False,
+        action="store_true",
+        help="This flag indicates that the decoded peaks of each input file should be stored in a binary cache, which is reused by subsequent runs with the same input file.\nOptional. The cache is stored next to the input file unless a cache directory is given.",
+    )
+    idParser.add_argument(
+        "-cd",
+        "--cacheDirectory",
+        type=_CacheDirectory(),
+        default=None,
+        help="Existing directory in which compiled caches are stored.\nOptional. Only used in combination with a caching flag.",
+    )
+    idParser.add_argument(
+        "-wk",
+        "--workers",
+        type=_RestrictedInt("workers", minValue=1),
+        default=1,
+        help="Number of worker processes used to generate library decoys and to match library spectra to query spectra across m/z windows.\nOptional. Default is 1 (no parallel processing). Results are identical regardless of the number of workers.",
+    )
+    idParser.add_argument(
+        "-fw",
+        "--fileWorkers",
+        type=_RestrictedInt("fileWorkers", minValue=1),
+        default=1,
+        help="Maximum number of input files identified at the same time, each in its own worker process sharing the loaded library.\nOptional. Default is 1 (input files are identified one at a time). A file that fails identification is skipped without stopping the remaining files.",
+    )
+    add_output_format_argument(idParser)
 
 
 def add_score_parser(commandParser):
@@ -116,6 +171,14 @@ def add_score_parser(commandParser):
         default=2,
         help="Specific to the maxLFQ protein quantification method. Requires at minimum the given number of matches before a sample to sample ratio or difference is accepted.\nOptional, default is 2. Only 1 or 2 is accepted. \nThis flag will throw a warning error when paired with a protein quantification method other than 'maxlfq'.",
     )
+    scoringParser.add_argument(
+        "-fw",
+        "--fileWorkers",
+        type=_RestrictedInt("fileWorkers", minValue=1),
+        default=1,
+        help="Maximum number of identification outputs scored at the same time, each in its own worker process.\nOptional. Default is 1 (outputs are scored one at a time). Results are identical regardless of the number of workers.",
+    )
+    add_output_format_argument(scoringParser)
 
 
 def add_reanalysis_parser(commandParser):
@@ -151,9 +214,24 @@ def add_reanalysis_parser(commandParser):
         default=0.75,
         help="When setting bin values, this option indicates how close an m/z value must be to the bin value. Default is 0.75.\nOptional.\nNOTE: Multiple targeted m/z values may fall within a range that a mass spectrometer can identify in one scan. Thus, m/z values are binned to prevent redundant reanalysis.\nExample: let's say we have the m/z values of 199.5 and 200.5, a binValueProximity value of 0.75, and a bin value of 200.0.\nBoth of these m/z values would be in the same bin, as they are both with 0.75 of 200.0.",
     )
+    add_output_format_argument(reanalysisParser)
+
+
+def add_output_format_argument(subcommandParser):
+    subcommandParser.add_argument(
+        "-of",
+        "--outputFormat",
+        choices=tableFileFormats,
+        default="csv",
+        help="File format of the output tables.\nOptional, default is 'csv'. Choices are 'csv' or 'parquet'. The parquet format requires the optional pyarrow package.",
+    )
 
 
 def check_for_conflicting_args(args):
+    if args.get("outputFormat") == "parquet" and not is_parquet_supported():
+        raise argparse.ArgumentTypeError(
+            "The parquet output format requires the pyarrow package. Please install it (pip install pyarrow) or use the csv output format."
+        )
     if args["command"] == "id" and args["histogram"] and args["noCorrection"]:
         raise argparse.ArgumentTypeError(
             "The histogram flag is invalidated by the noCorrection flag. Please inspect your input and remove one of the tags."
@@ -162,6 +240,24 @@ def check_for_conflicting_args(args):
         raise argparse.ArgumentTypeError(
             "The correctionDegree parameter is invalidated by the noCorrection flag. Please inspect your input and remove one of them."
         )
+    if args["command"] == "id" and args["streamCorrection"] and args["noCorrection"]:
+        raise argparse.ArgumentTypeError(
+            "The streamCorrection flag is invalidated by the noCorrection flag. Please inspect your input and remove one of the tags."
+        )
+    if (
+        args["command"] == "id"
+        and args["cacheDirectory"]
+        and not (args["libraryCache"] or args["queryCache"])
+    ):
+        warnings.warn(
+            "The cacheDirectory argument will only have an effect when paired with a caching flag (such as libraryCache), so it will be ignored.",
+            UserWarning,
+        )
+    if args["command"] == "id" and args["fileWorkers"] > 1 and args["workers"] > 1:
+        warnings.warn(
+            "The workers argument will only have an effect when input files are identified one at a time (fileWorkers of 1), so it will be ignored.",
+            UserWarning,
+        )
     if (
         args["command"] == "score"
         and args["proteinQuantMethod"] != "maxlfq"
@@ -249,6 +345,15 @@ class _LibraryFile:
         return libraryFile
 
 
+class _CacheDirectory:
+    def __call__(self, cacheDirectory):
+        if not os.path.isdir(cacheDirectory):
+            raise argparse.ArgumentTypeError(
+                "The -cd or --cacheDirectory argument must be an existing directory."
+            )
+        return cacheDirectory
+
+
 class _RestrictedNumber(ABC):
     def __init__(self, type, minValue=-np.inf, maxValue=np.inf):
         self.type = type
@@ -330,11 +435,11 @@ class _ZodiaqOutputDirectory(ABC):
 class _IdentificationOutputDirectory(_ZodiaqOutputDirectory):
     def add_necessary_directory_contents(self, idDir):
         idFiles = self.find_files_with_necessary_format(
-            idDir, r"^zoDIAq-file.*fullOutput\.csv"
+            idDir, r"^zoDIAq-file.*fullOutput\.(csv|parquet)"
         )
         if len(idFiles) == 0:
             raise argparse.ArgumentTypeError(
-                "The -i or --input argument directory must contain .csv files that are outputs from the identification workflow in zoDIAq."
+                "The -i or --input argument directory must contain .csv or .parquet files that are outputs from the identification workflow in zoDIAq."
             )
         return {"idFiles": idFiles}
 
@@ -342,14 +447,14 @@ class _IdentificationOutputDirectory(_ZodiaqOutputDirectory):
 class _ScoringOutputDirectory(_ZodiaqOutputDirectory):
     def add_necessary_directory_contents(self, scoreDir):
         peptideFdrFiles = self.find_files_with_necessary_format(
-            scoreDir, r"peptideFDR\.csv$"
+            scoreDir, r"peptideFDR\.(csv|parquet)$"
         )
         proteinFdrFiles = self.find_files_with_necessary_format(
-            scoreDir, r"proteinFDR\.csv$"
+            scoreDir, r"proteinFDR\.(csv|parquet)$"
         )
         if len(peptideFdrFiles) == 0 and len(proteinFdrFiles) == 0:
             raise argparse.ArgumentTypeError(
-                "The -i or --input argument directory must contain .csv files that are outputs from the scoring workflow in zoDIAq (peptide or protein score outputs required)."
+                "The -i or --input argument directory must contain .csv or .parquet files that are outputs from the scoring workflow in zoDIAq (peptide or protein score outputs required)."
             )
 
         return {
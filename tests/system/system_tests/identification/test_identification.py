@@ -243,6 +243,109 @@ def test__identification__baseline__two_inputs_creates_two_outputs_independent_o
     assert outputDf1.equals(outputDf2)
 
 
+def test__identification__baseline__file_workers_create_outputs_and_skip_failed_files(
+    libraryTemplateDataFrame, libraryFileDirectory, inputFileDirectory
+):
+    baselineSpectraBreakdown = BaselineSpectraBreakdown(libraryTemplateDataFrame)
+    inputFileHeader1 = "baseline_parallel_output_1"
+    baselineSpectraBreakdown.write_query_scan_data_input_files(
+        inputFileDirectory, inputFileHeader1
+    )
+    inputFileHeader2 = "baseline_parallel_output_2"
+    baselineSpectraBreakdown.write_query_scan_data_input_files(
+        inputFileDirectory, inputFileHeader2
+    )
+    libraryFile = os.path.join(libraryFileDirectory, "spectrast_test_library.csv")
+    inputQueryFile1 = os.path.join(inputFileDirectory, f"{inputFileHeader1}.mzXML")
+    inputQueryFile2 = os.path.join(inputFileDirectory, f"{inputFileHeader2}.mzXML")
+    corruptQueryFile = os.path.join(inputFileDirectory, "corrupt_parallel.mzXML")
+    with open(corruptQueryFile, "w") as f:
+        f.write("this is not an mzXML file")
+    outputDir = TemporaryDirectory(prefix="zodiaq_system_test")
+    args = [
+        "zodiaq",
+        "id",
+        "-i",
+        inputQueryFile1,
+        "-i",
+        corruptQueryFile,
+        "-i",
+        inputQueryFile2,
+        "-l",
+        libraryFile,
+        "-o",
+        outputDir.name,
+        "-nc",
+        "-fw",
+        "2",
+    ]
+
+    process = subprocess.run(args, capture_output=True)
+    assert process.returncode == 0
+    assert "Skipping" in process.stderr.decode()
+    outputDirContents = os.listdir(outputDir.name)
+    assert len(outputDirContents) == 1
+    zodiaqDir = os.path.join(outputDir.name, outputDirContents[0])
+    zodiaqDirContents = sorted(os.listdir(zodiaqDir))
+    assert zodiaqDirContents == [
+        f"zoDIAq-file_{inputFileHeader1}_corrected_fullOutput.csv",
+        f"zoDIAq-file_{inputFileHeader2}_corrected_fullOutput.csv",
+    ]
+    for zodiaqFile in zodiaqDirContents:
+        outputDf = (
+            pd.read_csv(os.path.join(zodiaqDir, zodiaqFile))
+            .drop(["fileName"], axis=1)
+            .sort_values(["cosine", "MzLIB"], ascending=[False, True])
+            .reset_index(drop=True)
+        )
+        assert_pandas_dataframes_are_equal(
+            baselineSpectraBreakdown.expectedOutputDf, outputDf
+        )
+
+
+def test__identification__baseline__max_memory_output_matches_expected(
+    libraryTemplateDataFrame, libraryFileDirectory, inputFileDirectory
+):
+    baselineSpectraBreakdown = BaselineSpectraBreakdown(libraryTemplateDataFrame)
+    inputFileHeader = "baseline_max_memory_output"
+    baselineSpectraBreakdown.write_query_scan_data_input_files(
+        inputFileDirectory, inputFileHeader
+    )
+    libraryFile = os.path.join(libraryFileDirectory, "spectrast_test_library.csv")
+    inputQueryFile = os.path.join(inputFileDirectory, f"{inputFileHeader}.mzXML")
+    outputDir = TemporaryDirectory(prefix="zodiaq_system_test")
+    args = [
+        "zodiaq",
+        "id",
+        "-i",
+        inputQueryFile,
+        "-l",
+        libraryFile,
+        "-o",
+        outputDir.name,
+        "-nc",
+        "-mm",
+        "0.1",
+    ]
+
+    process = subprocess.run(args, capture_output=True)
+    assert process.returncode == 0
+    outputDirContents = os.listdir(outputDir.name)
+    assert len(outputDirContents) == 1
+    zodiaqDir = os.path.join(outputDir.name, outputDirContents[0])
+    zodiaqDirContents = os.listdir(zodiaqDir)
+    assert len(zodiaqDirContents) == 1
+    outputDf = (
+        pd.read_csv(os.path.join(zodiaqDir, zodiaqDirContents[0]))
+        .drop(["fileName"], axis=1)
+        .sort_values(["cosine", "MzLIB"], ascending=[False, True])
+        .reset_index(drop=True)
+    )
+    assert_pandas_dataframes_are_equal(
+        baselineSpectraBreakdown.expectedOutputDf, outputDf
+    )
+
+
 def test__identification__baseline_no_matches_raises_error(
     libraryTemplateDataFrame,
     libraryFileDirectory,
@@ -589,6 +692,95 @@ def test__identification__correction_with_second_standard_deviation_creates_expe
     assert matchedPeakMean > 9.34 and matchedPeakMean < 9.74
 
 
+def run_identification_and_read_output(inputQueryFile, libraryFile, extraArgs):
+    outputDir = TemporaryDirectory(prefix="zodiaq_system_test")
+    args = [
+        "zodiaq",
+        "id",
+        "-i",
+        inputQueryFile,
+        "-l",
+        libraryFile,
+        "-o",
+        outputDir.name,
+    ] + extraArgs
+    process = subprocess.run(args, capture_output=True)
+    assert process.returncode == 0
+    zodiaqDir = os.path.join(outputDir.name, os.listdir(outputDir.name)[0])
+    zodiaqDirContents = os.listdir(zodiaqDir)
+    assert len(zodiaqDirContents) == 1
+    return pd.read_csv(os.path.join(zodiaqDir, zodiaqDirContents[0]))
+
+
+@pytest.mark.parametrize(
+    "correctionArgs, streamingArgs",
+    [
+        ([], ["-sc"]),
+        (["-c", "1"], ["-sc"]),
+    ],
+)
+def test__identification__streaming_correction_output_matches_default_output(
+    libraryTemplateDataFrame,
+    libraryFileDirectory,
+    inputFileDirectory,
+    correctionArgs,
+    streamingArgs,
+):
+    stDevSpectraBreakdown = StDevCorrectionSpectraBreakdown(libraryTemplateDataFrame)
+    inputFileHeader = "streaming_" + "_".join(
+        arg.strip("-") for arg in correctionArgs + streamingArgs
+    )
+    stDevSpectraBreakdown.write_query_scan_data_input_files(
+        inputFileDirectory, inputFileHeader
+    )
+    inputQueryFile = os.path.join(inputFileDirectory, f"{inputFileHeader}.mzXML")
+    libraryFile = os.path.join(libraryFileDirectory, "spectrast_test_library.csv")
+    expectedOutputDf = run_identification_and_read_output(
+        inputQueryFile, libraryFile, correctionArgs
+    )
+    outputDf = run_identification_and_read_output(
+        inputQueryFile, libraryFile, correctionArgs + streamingArgs
+    )
+    assert len(expectedOutputDf.index) > 0
+    pd.testing.assert_frame_equal(expectedOutputDf, outputDf)
+
+
+@pytest.mark.parametrize(
+    "correctionArgs, memoryArgs",
+    [
+        (["-nc"], ["-mm", "0.1"]),
+        ([], ["-mm", "0.1"]),
+        ([], ["-sc", "-mm", "0.1"]),
+        (["-c", "1"], ["-mm", "0.1"]),
+        (["-c", "1"], ["-mm", "0.1", "-wk", "2"]),
+    ],
+)
+def test__identification__max_memory_output_matches_default_output(
+    libraryTemplateDataFrame,
+    libraryFileDirectory,
+    inputFileDirectory,
+    correctionArgs,
+    memoryArgs,
+):
+    stDevSpectraBreakdown = StDevCorrectionSpectraBreakdown(libraryTemplateDataFrame)
+    inputFileHeader = "max_memory_" + "_".join(
+        arg.strip("-") for arg in correctionArgs + memoryArgs
+    )
+    stDevSpectraBreakdown.write_query_scan_data_input_files(
+        inputFileDirectory, inputFileHeader
+    )
+    inputQueryFile = os.path.join(inputFileDirectory, f"{inputFileHeader}.mzXML")
+    libraryFile = os.path.join(libraryFileDirectory, "spectrast_test_library.csv")
+    expectedOutputDf = run_identification_and_read_output(
+        inputQueryFile, libraryFile, correctionArgs
+    )
+    outputDf = run_identification_and_read_output(
+        inputQueryFile, libraryFile, correctionArgs + memoryArgs
+    )
+    assert len(expectedOutputDf.index) > 0
+    pd.testing.assert_frame_equal(expectedOutputDf, outputDf)
+
+
 @pytest.mark.skip(
     "future development may include improving the memory efficiency of the program. This function serves as a baseline for such tests."
 )
@@ -0,0 +1,44 @@
+from zodiaq.identification.precursorMzIndex import PrecursorMzIndex
+import numpy as np
+import pytest
+import re
+
+
+@pytest.fixture
+def precursorIndex():
+    return PrecursorMzIndex(np.array([18.9, 19.0, 20.0, 20.0, 21.0, 21.1, 25.0]))
+
+
+def test__precursor_mz_index__find_index_range_includes_window_bounds(
+    precursorIndex,
+):
+    assert precursorIndex.find_index_range((20.0, 2.0)) == (1, 5)
+
+
+def test__precursor_mz_index__find_index_range_of_empty_window(precursorIndex):
+    start, stop = precursorIndex.find_index_range((30.0, 2.0))
+    assert start == stop
+    start, stop = precursorIndex.find_index_range((23.0, 1.0))
+    assert start == stop
+
+
+def test__precursor_mz_index__overlapping_windows_share_library_spectra(
+    precursorIndex,
+):
+    assert precursorIndex.find_index_range((19.5, 1.0)) == (1, 4)
+    assert precursorIndex.find_index_range((20.5, 1.0)) == (2, 5)
+
+
+def test__precursor_mz_index__find_index_ranges_matches_individual_lookups(
+    precursorIndex,
+):
+    mzWindows = [(20.0, 2.0), (30.0, 2.0), (19.5, 1.0), (25.0, 0.0)]
+    starts, stops = precursorIndex.find_index_ranges(mzWindows)
+    expectedRanges = [precursorIndex.find_index_range(w) for w in mzWindows]
+    assert list(zip(starts, stops)) == expectedRanges
+
+
+def test__precursor_mz_index__unsorted_precursor_mz_values_raise_error():
+    errorOutput = "Library precursor m/z values must be sorted."
+    with pytest.raises(ValueError, match=re.escape(errorOutput)):
+        PrecursorMzIndex(np.array([20.0, 19.0]))
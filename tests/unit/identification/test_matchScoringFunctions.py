@@ -0,0 +1,144 @@
+import pandas as pd
+import numpy as np
+import pytest
+
+from zodiaq.identification.matchScoringFunctions import (
+    score_library_to_query_matches,
+    summarize_library_to_query_matches,
+    score_summarized_library_to_query_matches,
+)
+from zodiaq.scoring.scoringFunctions import calculate_cosine_similarity_score
+
+
+@pytest.fixture
+def vectorA():
+    return pd.Series([1, 5, 10])
+
+
+@pytest.fixture
+def vectorB(vectorA):
+    return vectorA + 1
+
+
+def test__match_scoring_functions__score_library_to_query_matches(vectorA, vectorB):
+    libraryIdx, queryIdx, ppmDiff = 1, 0, 0
+    matchesDf = pd.DataFrame(
+        index=vectorA.index,
+        columns=[
+            "libraryIdx",
+            "libraryIntensity",
+            "queryIdx",
+            "queryIntensity",
+        ],
+    )
+    matchesDf["libraryIdx"] = [libraryIdx for i in vectorA.index]
+    matchesDf["libraryIntensity"] = vectorA
+    matchesDf["queryIdx"] = [queryIdx for i in vectorA.index]
+    matchesDf["queryIntensity"] = vectorB
+    cosineScore = calculate_cosine_similarity_score(np.sqrt(vectorA), np.sqrt(vectorB))
+    expectedOutputDf = pd.DataFrame(
+        data=[[libraryIdx, queryIdx, cosineScore]],
+        columns=["libraryIdx", "queryIdx", "cosineScore"],
+    )
+    outputDf = score_library_to_query_matches(matchesDf)
+    assert expectedOutputDf.equals(outputDf)
+
+    lowScoreMatchesDf = matchesDf.copy()
+    lowScoreMatchesDf["libraryIdx"] = [libraryIdx - 1 for i in vectorA.index]
+    reverseVectorA = pd.Series(list(vectorA)[::-1])
+    lowScoreMatchesDf["libraryIntensity"] = reverseVectorA
+    lowCosineScore = calculate_cosine_similarity_score(
+        np.sqrt(reverseVectorA), np.sqrt(vectorB)
+    )
+    unsortedMatchesDf = pd.concat([lowScoreMatchesDf, matchesDf])
+    expectedOutputDf = pd.DataFrame(
+        data=[
+            [libraryIdx, queryIdx, cosineScore],
+            [libraryIdx - 1, queryIdx, lowCosineScore],
+        ],
+        columns=["libraryIdx", "queryIdx", "cosineScore"],
+    )
+    sortedOutputDf = score_library_to_query_matches(unsortedMatchesDf)
+    assert expectedOutputDf.equals(sortedOutputDf)
+
+
+def test__match_scoring_functions__summarize_library_to_query_matches():
+    lib1Idx = 0
+    lib2Idx = 1
+    queryIdx = 0
+    precursorMz = 100.0
+    abovePrecursorMz = precursorMz + 10
+    belowPrecursorMz = precursorMz - 10
+    lib1Intensities = [1.0, 4.0, 9.0, 16.0]
+    lib2Intensities = [25.0, 36.0, 49.0]
+    queryIntensities = [2.0, 3.0, 5.0, 7.0]
+    lib1QueryMzs = [
+        belowPrecursorMz,
+        abovePrecursorMz,
+        precursorMz,
+        abovePrecursorMz,
+    ]
+    lib1Matches = [
+        [lib1Idx, lib1Intensities[i], queryIdx, queryIntensities[i], lib1QueryMzs[i]]
+        for i in range(len(lib1Intensities))
+    ]
+    lib2Matches = [
+        [lib2Idx, lib2Intensities[i], queryIdx, queryIntensities[i], abovePrecursorMz]
+        for i in range(len(lib2Intensities))
+    ]
+    matchesDf = pd.DataFrame(
+        lib2Matches[:1] + lib1Matches + lib2Matches[1:],
+        columns=[
+            "libraryIdx",
+            "libraryIntensity",
+            "queryIdx",
+            "queryIntensity",
+            "queryMz",
+        ],
+    )
+    expectedOutputDf = pd.DataFrame(
+        {
+            "libraryIdx": [lib1Idx, lib2Idx],
+            "queryIdx": [queryIdx, queryIdx],
+            "cosineScore": [
+                calculate_cosine_similarity_score(
+                    np.sqrt(lib1Intensities), np.sqrt(queryIntensities)
+                ),
+                calculate_cosine_similarity_score(
+                    np.sqrt(lib2Intensities), np.sqrt(queryIntensities[:3])
+                ),
+            ],
+            "shared": [4, 3],
+            "ionCount": [3.0 + 7.0, 2.0 + 3.0 + 5.0],
+            "exclude_num": [2, 0],
+        }
+    )
+    outputDf = summarize_library_to_query_matches(matchesDf, {queryIdx: precursorMz})
+    assert expectedOutputDf.equals(outputDf)
+
+    outputDf = summarize_library_to_query_matches(matchesDf)
+    assert expectedOutputDf[["libraryIdx", "queryIdx", "cosineScore"]].equals(outputDf)
+
+
+def test__match_scoring_functions__score_summarized_library_to_query_matches():
+    rng = np.random.default_rng(0)
+    numMatches = 300
+    matchesDf = pd.DataFrame(
+        {
+            "libraryIdx": rng.integers(0, 20, numMatches).astype(np.int32),
+            "libraryIntensity": rng.integers(1, 4, numMatches).astype(np.float64),
+            "queryIdx": rng.integers(0, 6, numMatches).astype(np.int32),
+            "queryIntensity": rng.integers(1, 4, numMatches).astype(np.float64),
+            "queryMz": rng.uniform(90, 110, numMatches),
+        }
+    )
+    queryPrecursorMzs = {queryIdx: 100.0 for queryIdx in range(6)}
+    expectedOutputDf = score_library_to_query_matches(matchesDf, queryPrecursorMzs)
+    windowScoreDfs = [
+        summarize_library_to_query_matches(
+            matchesDf[matchesDf["queryIdx"].isin(queryIdxs)], queryPrecursorMzs
+        )
+        for queryIdxs in [[4, 1], [0], [5, 2, 3]]
+    ]
+    outputDf = score_summarized_library_to_query_matches(windowScoreDfs)
+    assert expectedOutputDf.equals(outputDf)
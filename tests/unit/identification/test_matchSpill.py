@@ -0,0 +1,79 @@
+from zodiaq.identification.matchSpill import MatchSpill
+from zodiaq.identification.matchingFunctions import create_standardized_histogram
+import pandas as pd
+import numpy as np
+import pytest
+import os
+
+
+def create_match_dataframe(numMatches, seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "libraryIdx": rng.integers(0, 10, numMatches).astype(np.int32),
+            "queryIdx": rng.integers(0, 10, numMatches).astype(np.int32),
+            "ppmDifference": rng.normal(5, 3, numMatches),
+        }
+    )
+
+
+@pytest.fixture
+def matchDfs():
+    return [
+        create_match_dataframe(numMatches, i)
+        for i, numMatches in enumerate([50, 0, 200, 7])
+    ]
+
+
+def test__match_spill__partitions_are_read_back_in_order(matchDfs):
+    with MatchSpill() as matchSpill:
+        for matchDf in matchDfs:
+            matchSpill.append(matchDf)
+        assert matchSpill.numPartitions == len(matchDfs)
+        assert matchSpill.numMatches == sum(len(matchDf.index) for matchDf in matchDfs)
+        for matchDf, spilledMatchDf in zip(matchDfs, matchSpill.read_partitions()):
+            assert matchDf.equals(spilledMatchDf)
+        directory = matchSpill.directory
+    assert not os.path.exists(directory)
+
+
+def test__match_spill__ppm_statistics_match_statistics_of_all_matches(matchDfs):
+    ppms = pd.concat(matchDfs)["ppmDifference"]
+    with MatchSpill() as matchSpill:
+        for matchDf in matchDfs:
+            matchSpill.append(matchDf)
+        binHeights, bins = matchSpill.calculate_ppm_histogram()
+        expectedBinHeights, expectedBins = create_standardized_histogram(ppms)
+        np.testing.assert_array_equal(binHeights, expectedBinHeights)
+        np.testing.assert_array_equal(bins, expectedBins)
+        assert matchSpill.ppmMean == pytest.approx(np.mean(ppms))
+        assert matchSpill.calculate_ppm_standard_deviation() == pytest.approx(
+            np.std(ppms)
+        )
+
+
+def test__match_spill__append_fails_when_columns_differ(matchDfs):
+    with MatchSpill() as matchSpill:
+        matchSpill.append(matchDfs[0])
+        with pytest.raises(ValueError):
+            matchSpill.append(matchDfs[0][["libraryIdx", "queryIdx"]])
+
+
+def test__match_spill__partitions_within_memory_budget_are_not_written_to_disk(
+    matchDfs,
+):
+    maxResidentBytes = sum(
+        int(matchDf.memory_usage(index=True).sum()) for matchDf in matchDfs[:2]
+    )
+    with MatchSpill(maxResidentBytes=maxResidentBytes) as matchSpill:
+        for matchDf in matchDfs[:2]:
+            matchSpill.append(matchDf)
+        assert os.listdir(matchSpill.directory) == []
+        assert matchSpill.residentBytes == maxResidentBytes
+        for matchDf in matchDfs[2:]:
+            matchSpill.append(matchDf)
+        assert len(os.listdir(matchSpill.directory)) == 3
+        for matchDf, spilledMatchDf in zip(matchDfs, matchSpill.read_partitions()):
+            assert matchDf.reset_index(drop=True).equals(
+                spilledMatchDf.reset_index(drop=True)
+            )
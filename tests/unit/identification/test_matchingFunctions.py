@@ -86,11 +86,37 @@ def test__matchingFunctions__match_library_to_query_pooled_spectra():
         ],
     )
     expectedMatches.insert(loc=4, column="queryMz", value=matchingMz)
+    expectedMatches[["libraryIdx", "queryIdx"]] = expectedMatches[
+        ["libraryIdx", "queryIdx"]
+    ].astype(np.int32)
     matches = match_library_to_query_pooled_spectra(libPeaks, mzPeaks, ppmTolerance)
     matches["ppmDifference"] = [float(int(x)) for x in matches["ppmDifference"]]
     assert expectedMatches.equals(matches)
 
 
+def test__matchingFunctions__match_library_to_query_pooled_spectra__duplicate_peaks_do_not_create_duplicate_matches():
+    ppmTolerance = 10.0
+    libPeaks = [(100.0, 1.0, 0), (100.0, 1.0, 0), (100.0, 2.0, 0), (200.0, 1.0, 1)]
+    queryPeaks = [(100.0, 5.0, 0), (100.0, 5.0, 0), (200.0, 5.0, 0)]
+    matches = match_library_to_query_pooled_spectra(libPeaks, queryPeaks, ppmTolerance)
+    assert len(matches.index) == 3
+    assert not matches.duplicated().any()
+    assert list(matches["libraryIntensity"]) == [1.0, 2.0, 1.0]
+
+
+def test__matchingFunctions__match_library_to_query_pooled_spectra__no_peaks_returns_empty_dataframe():
+    matches = match_library_to_query_pooled_spectra([], [(100.0, 5.0, 0)], 10.0)
+    assert len(matches.index) == 0
+    assert list(matches.columns) == [
+        "libraryIdx",
+        "libraryIntensity",
+        "queryIdx",
+        "queryIntensity",
+        "queryMz",
+        "ppmDifference",
+    ]
+
+
 def test__matchingFunctions__eliminate_low_count_matches():
     highCountLibIdx = 0
     lowCountLibIdx = 1
@@ -0,0 +1,36 @@
+from zodiaq.identification.numbaCompilationFunctions import compile_numba_functions
+from zodiaq.identification.matchingFunctions import (
+    numba_enhanced_matching_of_library_to_query_pooled_spectra,
+)
+from zodiaq.identification.matchScoringFunctions import (
+    numba_enhanced_aggregation_of_sorted_matches,
+)
+from zodiaq.loaders.peakPoolingFunctions import (
+    numba_enhanced_check_that_peak_runs_are_sorted,
+    numba_enhanced_merge_of_sorted_peak_runs,
+)
+from numba import types
+from numba.core.caching import NullCache
+
+
+def test__numba_compilation_functions__compile_numba_functions__compiles_every_kernel():
+    compilationTime = compile_numba_functions()
+    assert compilationTime >= 0
+    for kernel in [
+        numba_enhanced_matching_of_library_to_query_pooled_spectra,
+        numba_enhanced_aggregation_of_sorted_matches,
+        numba_enhanced_check_that_peak_runs_are_sorted,
+        numba_enhanced_merge_of_sorted_peak_runs,
+    ]:
+        assert len(kernel.signatures) > 0
+        assert not isinstance(kernel._cache, NullCache)
+
+
+def test__numba_compilation_functions__compile_numba_functions__compiles_int_and_float_match_tolerances():
+    compile_numba_functions()
+    toleranceTypes = set(
+        signature[2]
+        for signature in numba_enhanced_matching_of_library_to_query_pooled_spectra.signatures
+    )
+    assert types.int64 in toleranceTypes
+    assert types.float64 in toleranceTypes
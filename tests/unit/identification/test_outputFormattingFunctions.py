@@ -1,187 +1,155 @@
 from zodiaq.identification.outputFormattingFunctions import (
-    format_output_line,
-    extract_metadata_from_match_and_score_dataframes,
     format_output_as_pandas_dataframe,
+    create_query_metadata_dataframe,
+    select_rows_covering_output_values,
     identify_all_decoys,
 )
+from zodiaq.loaders.library.zodiaqLibrary import ZodiaqLibrary
 import pandas as pd
 import pytest
 import numpy as np
 
 
 @pytest.fixture
-def identifierOutputData():
-    return [
-        "3",
-        4,
-        "testPeptide",
-        "testProtein",
-        0,
-        0,
-        1,
-        8,
-        "testIdentifiers",
-        5,
-        2,
-        9,
-        10,
-        6,
-        7,
-        11,
-        12,
-    ]
-
-
-def test__output_formatting_functions__format_output_line(identifierOutputData):
-    libDict = {
-        "peptide": "testPeptide",
-        "proteinName": "testProtein",
-        "isDecoy": 0,
-        "precursorMz": 0,
-        "precursorCharge": 1,
-        "identification": "testIdentifiers",
-        "peaks": list(range(2)),
-    }
-    queryDict = {
-        "scan": "3",
-        "precursorMz": 4,
-        "peaksCount": 5,
-        "CV": 6,
-        "windowWidth": 7,
-        "retentionTime": 12,
-    }
-    matchDict = {
-        "cosineSimilarityScore": 8,
-        "shared": 9,
-        "ionCount": 10,
-        "exclude_num": 11,
+def library():
+    zodiaqLibDict = {
+        (0.0, "testPeptide"): {
+            "proteinName": "testProtein",
+            "isDecoy": 0,
+            "precursorCharge": 1,
+            "identification": "testIdentifiers",
+            "zodiaqKeyIdx": 0,
+            "peaks": [(100.0, 1.0, 0), (200.0, 1.0, 0)],
+        },
+        (1.0, "decoyPeptide"): {
+            "proteinName": "DECOY_testProtein",
+            "isDecoy": 1,
+            "precursorCharge": 2,
+            "identification": "decoyIdentifiers",
+            "zodiaqKeyIdx": 1,
+            "peaks": [(100.0, 1.0, 1)],
+        },
     }
-    output = format_output_line(libDict, queryDict, matchDict)
-    assert output == identifierOutputData
+    return ZodiaqLibrary.from_zodiaq_library_dict(zodiaqLibDict)
 
 
-def test__output_formatting_functions__extract_metadata_from_match_and_score_dataframes():
-    lib1Idx = 0
-    lib2Idx = 1
-    queryIdx = 0
-    genericIntensity = 100.0
-    genericPpmDifference = 10.0
-    lib1PeakCount = 10
-    lib1PeakCountAbovePrecursorMz = 3
-    lib2PeakCount = 4
-    precursorMz = 100.0
-    abovePrecursorMz = precursorMz + 10
-    belowPrecursorMz = precursorMz - 10
-    lib1CosineScore = 1.0
-    lib2CosineScore = 0.9
-    lib1Score = 0.8
-    lib2Score = 0.7
-    lib1MatchAbovePrecursorMz = [
-        [
-            lib1Idx,
-            genericIntensity,
-            queryIdx,
-            genericIntensity,
-            abovePrecursorMz,
-            genericPpmDifference,
-        ]
-    ] * lib1PeakCountAbovePrecursorMz
-    lib1MatchBelowPrecursorMz = [
-        [
-            lib1Idx,
-            genericIntensity,
-            queryIdx,
-            genericIntensity,
-            belowPrecursorMz,
-            genericPpmDifference,
-        ]
-    ] * (lib1PeakCount - lib1PeakCountAbovePrecursorMz)
-    lib2Match = [
-        [
-            lib2Idx,
-            genericIntensity,
-            queryIdx,
-            genericIntensity,
-            abovePrecursorMz,
-            genericPpmDifference,
-        ]
-    ] * lib2PeakCount
-    columns = [
-        "libraryIdx",
-        "libraryIntensity",
-        "queryIdx",
-        "queryIntensity",
-        "queryMz",
-        "ppmDifference",
-    ]
-    matchDf = pd.DataFrame(
-        lib1MatchAbovePrecursorMz + lib1MatchBelowPrecursorMz + lib2Match,
-        columns=columns,
-    )
-
-    scoreData = [
-        [lib1Idx, queryIdx, lib1CosineScore],
-        [lib2Idx, queryIdx, lib2CosineScore],
-    ]
-    scoreDf = pd.DataFrame(scoreData, columns=["libraryIdx", "queryIdx", "cosineScore"])
-    expectedOutput = {
-        (lib1Idx, queryIdx): {
-            "cosineSimilarityScore": lib1CosineScore,
-            "shared": lib1PeakCount,
-            "ionCount": genericIntensity * lib1PeakCountAbovePrecursorMz,
-            "exclude_num": lib1PeakCount - lib1PeakCountAbovePrecursorMz,
-        },
-        (lib2Idx, queryIdx): {
-            "cosineSimilarityScore": lib2CosineScore,
-            "shared": lib2PeakCount,
-            "ionCount": lib2PeakCount * genericIntensity,
-            "exclude_num": 0,
+@pytest.fixture
+def queryDict():
+    return {
+        "3": {
+            "precursorMz": 4.0,
+            "windowWidth": 7.0,
+            "peaksCount": 5,
+            "retentionTime": 12.0,
+            "CV": 6.0,
         },
-    }
-    queryDict = {
-        str(queryIdx): {
-            "precursorMz": precursorMz,
+        "13": {
+            "precursorMz": 14.0,
+            "windowWidth": 17.0,
+            "peaksCount": 15,
+            "retentionTime": "PT1S",
+            "CV": "",
         },
     }
-    output = extract_metadata_from_match_and_score_dataframes(
-        matchDf, scoreDf, queryDict
-    )
-    for idKey, metadataDict in expectedOutput.items():
-        assert idKey in output
-        for metadataType, metadataValue in metadataDict.items():
-            assert metadataType in output[idKey]
-            assert output[idKey][metadataType] == metadataValue
 
 
 def test__output_formatting_functions__format_output_as_pandas_dataframe(
-    identifierOutputData,
+    library, queryDict
 ):
-    expectedColumns = [
-        "fileName",
-        "scan",
-        "MzEXP",
-        "peptide",
-        "protein",
-        "isDecoy",
-        "MzLIB",
-        "zLIB",
-        "cosine",
-        "name",
-        "Peak(Query)",
-        "Peaks(Library)",
-        "shared",
-        "ionCount",
-        "CompensationVoltage",
-        "totalWindowWidth",
-        "exclude_num",
-        "retentionTime",
-    ]
     inputFileName = "dummyFile"
+    scoreDf = pd.DataFrame(
+        {
+            "libraryIdx": np.array([1, 0, 0], dtype=np.int32),
+            "queryIdx": np.array([3, 13, 3], dtype=np.int32),
+            "cosineScore": [0.9, 0.8, 0.7],
+            "shared": [9, 19, 29],
+            "ionCount": [10.0, 20.0, 30.0],
+            "exclude_num": [11, 21, 31],
+        }
+    )
     expectedOutputDf = pd.DataFrame(
-        [[inputFileName] + identifierOutputData], columns=expectedColumns
+        [
+            [3, 4.0, "decoyPeptide", "DECOY_testProtein", 1, 1.0, 2, 0.9]
+            + ["decoyIdentifiers", 5, 1, 9, 10.0, 6.0, 7.0, 11, 12.0],
+            [13, 14.0, "testPeptide", "testProtein", 0, 0.0, 1, 0.8]
+            + ["testIdentifiers", 15, 2, 19, 20.0, "", 17.0, 21, "PT1S"],
+            [3, 4.0, "testPeptide", "testProtein", 0, 0.0, 1, 0.7]
+            + ["testIdentifiers", 5, 2, 29, 30.0, 6.0, 7.0, 31, 12.0],
+        ],
+        columns=[
+            "scan",
+            "MzEXP",
+            "peptide",
+            "protein",
+            "isDecoy",
+            "MzLIB",
+            "zLIB",
+            "cosine",
+            "name",
+            "Peak(Query)",
+            "Peaks(Library)",
+            "shared",
+            "ionCount",
+            "CompensationVoltage",
+            "totalWindowWidth",
+            "exclude_num",
+            "retentionTime",
+        ],
+    )
+    expectedOutputDf.insert(0, "fileName", [inputFileName] * 3)
+    outputDf = format_output_as_pandas_dataframe(
+        inputFileName, scoreDf, library, queryDict
+    )
+    pd.testing.assert_frame_equal(outputDf, expectedOutputDf, check_dtype=False)
+    assert "scan" not in queryDict["3"]
+
+
+def test__output_formatting_functions__format_output_as_pandas_dataframe__chunks_share_query_metadata(
+    library, queryDict
+):
+    scoreDf = pd.DataFrame(
+        {
+            "libraryIdx": np.array([1, 0, 0, 1], dtype=np.int32),
+            "queryIdx": np.array([3, 3, 13, 13], dtype=np.int32),
+            "cosineScore": [0.9, 0.8, 0.7, 0.6],
+            "shared": [9, 19, 29, 39],
+            "ionCount": [10.0, 20.0, 30.0, 40.0],
+            "exclude_num": [11, 21, 31, 41],
+        }
     )
-    outputDf = format_output_as_pandas_dataframe(inputFileName, [identifierOutputData])
-    assert expectedOutputDf.equals(outputDf)
+    queryDf = create_query_metadata_dataframe(queryDict, scoreDf["queryIdx"])
+    assert list(queryDf.index) == [3, 13]
+    wholeDf = format_output_as_pandas_dataframe(
+        "dummyFile", scoreDf, library, queryDict
+    )
+    chunkDfs = [
+        format_output_as_pandas_dataframe(
+            "dummyFile", scoreDf.iloc[i : i + 2], library, queryDict, queryDf
+        )
+        for i in range(0, len(scoreDf), 2)
+    ]
+    pd.testing.assert_frame_equal(
+        pd.concat(chunkDfs, ignore_index=True), wholeDf, check_dtype=True
+    )
+    assert chunkDfs[0]["retentionTime"].dtype == object
+
+
+def test__output_formatting_functions__select_rows_covering_output_values():
+    scoreDf = pd.DataFrame(
+        {
+            "libraryIdx": [0, 0, 1, 1, 0],
+            "queryIdx": [3, 3, 3, 13, 13],
+        }
+    )
+    coveringDf = select_rows_covering_output_values(scoreDf)
+    assert list(coveringDf.index) == [0, 2, 3]
+
+
+def test__output_formatting_functions__create_query_metadata_dataframe__missing_scan_raises_error(
+    queryDict,
+):
+    with pytest.raises(KeyError, match="have no metadata"):
+        create_query_metadata_dataframe(queryDict, np.array([3, 99]))
 
 
 def test__score_functions__identify_all_decoys():
@@ -0,0 +1,193 @@
+from zodiaq.identification import parallelMatchingFunctions
+from zodiaq.identification.parallelMatchingFunctions import (
+    generate_library_to_query_matches_by_mz_windows_in_parallel,
+)
+from zodiaq.identification.poolingFunctions import (
+    generate_pooled_library_and_query_spectra_by_mz_windows,
+)
+from zodiaq.identification.matchingFunctions import (
+    match_library_to_query_pooled_spectra,
+    eliminate_low_count_matches,
+)
+from zodiaq.identification.precursorMzIndex import PrecursorMzIndex
+from zodiaq.loaders import LibraryLoaderContext, QueryLoaderContext
+from zodiaq.utils import create_process_pool
+from tempfile import TemporaryDirectory
+import pandas as pd
+import pytest
+import os
+
+
+def get_parent_dir():
+    return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def library():
+    libraryFile = os.path.join(
+        get_parent_dir(), "test_files", "sample_lib_table_spectrast.tsv"
+    )
+    return LibraryLoaderContext(libraryFile).load_zodiaq_library(isTest=True)
+
+
+@pytest.fixture
+def queryContext():
+    queryFile = os.path.join(get_parent_dir(), "test_files", "sample_query_mzxml.mzXML")
+    return QueryLoaderContext(queryFile)
+
+
+def test__parallel_matching_functions__generate_library_to_query_matches_by_mz_windows_in_parallel__matches_serial_workflow(
+    library, queryContext
+):
+    matchTolerance = 30
+    precursorIndex = PrecursorMzIndex(library.precursorMz)
+    expectedMatchDfs = []
+    for (
+        pooledLibPeaks,
+        pooledQueryPeaks,
+    ) in generate_pooled_library_and_query_spectra_by_mz_windows(
+        library, queryContext, precursorIndex
+    ):
+        matchDf = match_library_to_query_pooled_spectra(
+            pooledLibPeaks, pooledQueryPeaks, matchTolerance
+        )
+        expectedMatchDfs.append(eliminate_low_count_matches(matchDf))
+    matchDfs = list(
+        generate_library_to_query_matches_by_mz_windows_in_parallel(
+            library, precursorIndex, queryContext, matchTolerance, numWorkers=2
+        )
+    )
+    assert len(matchDfs) == len(expectedMatchDfs)
+    pd.testing.assert_frame_equal(pd.concat(expectedMatchDfs), pd.concat(matchDfs))
+
+
+def test__parallel_matching_functions__generate_library_to_query_matches_by_mz_windows_in_parallel__warns_of_windows_without_library_spectra(
+    library, queryContext
+):
+    precursorIndex = PrecursorMzIndex(library.precursorMz)
+    with pytest.warns(Warning) as serialWarnings:
+        list(
+            generate_pooled_library_and_query_spectra_by_mz_windows(
+                library, queryContext, precursorIndex
+            )
+        )
+    with pytest.warns(Warning) as parallelWarnings:
+        list(
+            generate_library_to_query_matches_by_mz_windows_in_parallel(
+                library, precursorIndex, queryContext, 30, numWorkers=2
+            )
+        )
+    serialMessages = [str(warning.message) for warning in serialWarnings]
+    assert (
+        "No library spectra found in the (781.400024414063, 2.0) m/z window. Skipping"
+        in serialMessages
+    )
+    assert [str(warning.message) for warning in parallelWarnings] == serialMessages
+
+
+class ClosingReader:
+    def __init__(self, closedFileDirectory):
+        self.closedFileDirectory = closedFileDirectory
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        open(os.path.join(self.closedFileDirectory, str(os.getpid())), "w").close()
+
+
+class QueryContextWithClosingReader:
+    def __init__(self, queryContext, closedFileDirectory):
+        self.queryContext = queryContext
+        self.closedFileDirectory = closedFileDirectory
+
+    def map_query_scan_ids_to_dia_mz_windows(self):
+        return self.queryContext.map_query_scan_ids_to_dia_mz_windows()
+
+    def get_query_file_reader(self):
+        return ClosingReader(self.closedFileDirectory)
+
+    def pool_peaks_of_query_scans(self, scans, reader):
+        with self.queryContext.get_query_file_reader() as queryReader:
+            return self.queryContext.pool_peaks_of_query_scans(scans, queryReader)
+
+
+def test__parallel_matching_functions__generate_library_to_query_matches_by_mz_windows_in_parallel__closes_reader_of_each_worker(
+    library, queryContext
+):
+    closedFileDirectory = TemporaryDirectory(prefix="zodiaq_reader_test_directory_")
+    numWorkers = 2
+    list(
+        generate_library_to_query_matches_by_mz_windows_in_parallel(
+            library,
+            PrecursorMzIndex(library.precursorMz),
+            QueryContextWithClosingReader(queryContext, closedFileDirectory.name),
+            30,
+            numWorkers,
+        )
+    )
+    assert 1 <= len(os.listdir(closedFileDirectory.name)) <= numWorkers
+
+
+class QueryContextWithRepeatedWindows:
+    def __init__(self, queryContext, numWindows):
+        self.queryContext = queryContext
+        self.numWindows = numWindows
+
+    def map_query_scan_ids_to_dia_mz_windows(self):
+        return {
+            (517.27001953125 + i * 1e-9, 2.0): ["456"] for i in range(self.numWindows)
+        }
+
+    def get_query_file_reader(self):
+        return self.queryContext.get_query_file_reader()
+
+    def pool_peaks_of_query_scans(self, scans, reader):
+        return self.queryContext.pool_peaks_of_query_scans(scans, reader)
+
+
+class SubmissionCountingPool:
+    def __init__(self, pool):
+        self.pool = pool
+        self.numSubmittedTasks = 0
+
+    def __enter__(self):
+        self.pool.__enter__()
+        return self
+
+    def __exit__(self, *args):
+        return self.pool.__exit__(*args)
+
+    def submit(self, *args):
+        self.numSubmittedTasks += 1
+        return self.pool.submit(*args)
+
+
+def test__parallel_matching_functions__generate_library_to_query_matches_by_mz_windows_in_parallel__bounds_outstanding_windows(
+    library, queryContext, monkeypatch
+):
+    numWorkers, numWindows = 2, 7
+    pools = []
+
+    def create_submission_counting_pool(*args, **kwargs):
+        pools.append(SubmissionCountingPool(create_process_pool(*args, **kwargs)))
+        return pools[-1]
+
+    monkeypatch.setattr(
+        parallelMatchingFunctions,
+        "create_process_pool",
+        create_submission_counting_pool,
+    )
+    matchDfs = generate_library_to_query_matches_by_mz_windows_in_parallel(
+        library,
+        PrecursorMzIndex(library.precursorMz),
+        QueryContextWithRepeatedWindows(queryContext, numWindows),
+        30,
+        numWorkers,
+    )
+    numWindowsYielded = 0
+    for matchDf in matchDfs:
+        numWindowsYielded += 1
+        assert pools[0].numSubmittedTasks - numWindowsYielded <= numWorkers
+    assert numWindowsYielded == numWindows
+    assert pools[0].numSubmittedTasks == numWindows
@@ -3,9 +3,11 @@ from zodiaq.identification.poolingFunctions import (
     generate_pooled_library_and_query_spectra_by_mz_windows,
 )
 from zodiaq.loaders.library.libraryLoaderContext import LibraryLoaderContext
+from zodiaq.loaders.library.zodiaqLibrary import ZodiaqLibrary
 from zodiaq.loaders.query.queryLoaderContext import QueryLoaderContext
 from expectedPooledPeaks import expectedLibraryPeaks, expectedQueryPeaks
 import os
+import numpy as np
 import pytest
 from unittest.mock import Mock
 import re
@@ -29,8 +31,8 @@ def queryFile():
 
 
 @pytest.fixture
-def libraryDict(libraryFile):
-    return LibraryLoaderContext(libraryFile).load_zodiaq_library_dict(isTest=True)
+def library(libraryFile):
+    return LibraryLoaderContext(libraryFile).load_zodiaq_library(isTest=True)
 
 
 @pytest.fixture
@@ -64,8 +66,9 @@ def test__pooler__pool_library_spectra_by_mz_window():
     }
     mzWindow = (20.0, 2.0)
     expectedOutput = bPeaks + cPeaks + dPeaks
-    output = _pool_library_spectra_by_mz_window(mzWindow, testLibDict)
-    assert output == expectedOutput
+    testLibrary = ZodiaqLibrary.from_zodiaq_library_dict(testLibDict)
+    output = _pool_library_spectra_by_mz_window(mzWindow, testLibrary)
+    np.testing.assert_array_equal(output, np.array(expectedOutput))
 
 
 def test__pooler__pool_library_spectra_by_mz_window__throws_warning_when_no_lib_peptides_found_in_window():
@@ -74,15 +77,15 @@ def test__pooler__pool_library_spectra_by_mz_window__throws_warning_when_no_lib_
         (18.9, "A"): {"peaks": aPeaks},
     }
     mzWindow = (30.0, 2.0)
-    expectedOutput = []
+    testLibrary = ZodiaqLibrary.from_zodiaq_library_dict(testLibDict)
     errorOutput = f"No library spectra found in the {mzWindow} m/z window. Skipping"
     with pytest.warns(Warning, match=re.escape(errorOutput)):
-        output = _pool_library_spectra_by_mz_window(mzWindow, testLibDict)
-        assert output == expectedOutput
+        output = _pool_library_spectra_by_mz_window(mzWindow, testLibrary)
+        assert len(output) == 0
 
 
 def test__pooler__generate_pooled_library_and_query_spectra_by_mz_windows(
-    libraryDict, queryContext
+    library, queryContext
 ):
     errorOutput = f"No library spectra found in the {(781.400024414063, 2.0)} m/z window. Skipping"
     with pytest.warns(Warning, match=re.escape(errorOutput)):
@@ -90,7 +93,7 @@ def test__pooler__generate_pooled_library_and_query_spectra_by_mz_windows(
             libPeaks,
             queryPeaks,
         ) in generate_pooled_library_and_query_spectra_by_mz_windows(
-            libraryDict, queryContext
+            library, queryContext
         ):
-            assert libPeaks == expectedLibraryPeaks
-            assert queryPeaks == expectedQueryPeaks
+            np.testing.assert_array_equal(libPeaks, np.array(expectedLibraryPeaks))
+            np.testing.assert_array_equal(queryPeaks, np.array(expectedQueryPeaks))
@@ -1,8 +1,11 @@
 import pytest
 import os
-from pyteomics import mgf
+from tempfile import TemporaryDirectory
 
-from zodiaq.loaders.library.libraryLoaderStrategyMgf import LibraryLoaderStrategyMgf
+from zodiaq.loaders.library.libraryLoaderStrategyMgf import (
+    LibraryLoaderStrategyMgf,
+    read_mgf_library_spectra,
+)
 
 
 @pytest.fixture
@@ -28,7 +31,8 @@ def test__library_loader_strategy_mgf__load_raw_library_object_from_file(
 ):
     loader._load_raw_library_object_from_file(libFilePath)
     assert hasattr(loader, "rawUploadedLibraryObject")
-    assert isinstance(loader.rawUploadedLibraryObject, mgf.IndexedMGF)
+    assert isinstance(loader.rawUploadedLibraryObject, dict)
+    assert len(loader.rawUploadedLibraryObject["precursorMz"]) == 1
 
 
 def test__library_loader_strategy_mgf__format_raw_library_object_into_zodiaq_library_dict(
@@ -119,3 +123,38 @@ def test__library_loader_strategy_mgf__format_raw_library_object_into_zodiaq_lib
         },
     }
     assert_final_dict_output_matches_expected(outputDict, expectedOutputDict)
+
+
+def test__library_loader_strategy_mgf__read_mgf_library_spectra__applies_header_and_keeps_earliest_of_tied_peaks():
+    with TemporaryDirectory(prefix="zodiaq_mgf_library_test_") as tempDir:
+        libraryFilePath = os.path.join(tempDir, "library.mgf")
+        with open(libraryFilePath, "w") as f:
+            f.write(
+                "CHARGE=3+\n\n"
+                "BEGIN IONS\nTITLE=first\nPEPMASS=500.5 1000.0\nSEQ=PEPTIDE\n"
+                "# comment\n300.0 5.0\n200.0 10.0\n100.0 5.0\n400.0 1.0\nEND IONS\n\n"
+                "BEGIN IONS\nTITLE=second\nPEPMASS=600.5 1000.0 2+\nSEQ=PEPTIDE\n"
+                "100.0 1.0\nEND IONS\n"
+            )
+        librarySpectra = read_mgf_library_spectra(libraryFilePath, maxPeakNum=2)
+    assert list(librarySpectra["identification"]) == ["first", "second"]
+    assert list(librarySpectra["precursorMz"]) == [500.5, 600.5]
+    assert list(librarySpectra["precursorCharge"]) == [3, 2]
+    assert list(librarySpectra["peakCounts"]) == [2, 1]
+    assert list(librarySpectra["peakMz"]) == [200.0, 300.0, 100.0]
+    assert list(librarySpectra["peakIntensity"]) == [10.0, 5.0, 1.0]
+
+
+def test__library_loader_strategy_mgf__format_raw_library_object_into_zodiaq_library_dict__identical_for_any_number_of_workers():
+    libFilePath = os.path.join(
+        get_parent_dir(), "test_files", "sample_lib_mgf_multiple.mgf"
+    )
+    zodiaqLibDicts = []
+    for numWorkers in [1, 2]:
+        loader = LibraryLoaderStrategyMgf()
+        loader.numWorkers = numWorkers
+        loader._load_raw_library_object_from_file(libFilePath)
+        zodiaqLibDicts.append(
+            loader._format_raw_library_object_into_zodiaq_library_dict()
+        )
+    assert zodiaqLibDicts[0] == zodiaqLibDicts[1]
@@ -1,6 +1,7 @@
 import pytest
 import os
 import pandas as pd
+import numpy as np
 import re
 from tempfile import TemporaryDirectory, NamedTemporaryFile
 from zodiaq.loaders.library.libraryLoaderStrategyTable import (
@@ -9,6 +10,7 @@ from zodiaq.loaders.library.libraryLoaderStrategyTable import (
     _organize_data_by_zodiaq_library_dict_keys,
     _determine_library_source_from_file,
 )
+from zodiaq.loaders.library.mappings import newColumns, oldColumnsSpectrast
 
 
 @pytest.fixture
@@ -37,6 +39,61 @@ def test__library_loader_strategy_table__load_raw_library_object_from_file__spec
     loader._load_raw_library_object_from_file(libFilePath)
     assert hasattr(loader, "rawUploadedLibraryObject")
     assert isinstance(loader.rawUploadedLibraryObject, pd.DataFrame)
+    assert list(loader.rawUploadedLibraryObject.columns) == newColumns
+    assert len(loader.rawUploadedLibraryObject.index) == loader.maxPeakNum
+
+
+def test__library_loader_strategy_table__load_raw_library_object_from_file__reads_compact_column_types(
+    loader, libFilePath
+):
+    loader._load_raw_library_object_from_file(libFilePath)
+    dtypes = loader.rawUploadedLibraryObject.dtypes
+    assert isinstance(dtypes["peptideName"], pd.CategoricalDtype)
+    assert isinstance(dtypes["proteinName"], pd.CategoricalDtype)
+    assert dtypes["peakIntensity"] == np.float64
+    assert dtypes["precursorCharge"] == np.int64
+
+
+def test__library_loader_strategy_table__load_raw_library_object_from_file__library_is_independent_of_chunk_size(
+    libFilePath,
+):
+    multiPeptideLibFilePath = os.path.join(
+        get_parent_dir(), "test_files", "sample_lib_table_prosit_multiple.csv"
+    )
+    for filePath in [libFilePath, multiPeptideLibFilePath]:
+        zodiaqLibraryDicts = []
+        for chunkSize in [1, 4, 1000000]:
+            loader = LibraryLoaderStrategyTable()
+            loader.chunkSize = chunkSize
+            loader.maxPeakNum = 3
+            loader._load_raw_library_object_from_file(filePath)
+            zodiaqLibraryDicts.append(
+                loader._format_raw_library_object_into_zodiaq_library_dict()
+            )
+        assert zodiaqLibraryDicts[0] == zodiaqLibraryDicts[1] == zodiaqLibraryDicts[2]
+
+
+def test__library_loader_strategy_table__format_raw_library_object_into_zodiaq_library__keys_sorted_across_chunks():
+    rows = [
+        [500.0, peptide, 100.0 + i, 10.0 - i, 2, f"id{peptide}", "1/protein", "y", i, 1]
+        for i, peptide in enumerate(["C", "C", "B", "B", "A", "A"])
+    ]
+    with TemporaryDirectory(prefix="zodiaq_table_chunk_test_") as tempDir:
+        libFilePath = os.path.join(tempDir, "library.tsv")
+        pd.DataFrame(rows, columns=oldColumnsSpectrast).to_csv(
+            libFilePath, sep="\t", index=False
+        )
+        loader = LibraryLoaderStrategyTable()
+        loader.chunkSize = 2
+        loader._load_raw_library_object_from_file(libFilePath)
+        library = loader._format_raw_library_object_into_zodiaq_library()
+    assert library.keys() == [(500.0, "A"), (500.0, "B"), (500.0, "C")]
+    np.testing.assert_array_equal(
+        library.metadata["identification"], ["idA", "idB", "idC"]
+    )
+    np.testing.assert_array_equal(
+        library.peakMz, [104.0, 105.0, 102.0, 103.0, 100.0, 101.0]
+    )
 
 
 def check_value_error_thrown_when_missing_columns(loader, dfPath, missingColumnValues):
@@ -236,7 +293,7 @@ def test__library_loader_strategy_table__reformat_raw_library_object_columns():
     oldToNewColumnDict = dict(zip(oldMappedColumns, newMappedColumns))
     superfluousColumns = ["random", "superfluous", "columns"]
     oldColumns = oldMappedColumns + superfluousColumns
-    newColumns = newMappedColumns + ["zodiaqLibKey"]
+    newColumns = newMappedColumns
     data = [[0 for i in range(len(oldColumns))]]
     df = pd.DataFrame(data, columns=oldColumns)
     newDf = _reformat_raw_library_object_columns(df, oldToNewColumnDict)
@@ -247,71 +304,69 @@ def test__library_loader_strategy_table__organize_data_by_zodiaq_library_dict_ke
     loader, libFilePath
 ):
     loader._load_raw_library_object_from_file(libFilePath)
-    reformattedDf = _reformat_raw_library_object_columns(
-        loader.rawUploadedLibraryObject, loader.oldToNewColumnDict
-    )
-    df = reformattedDf[["peakMz", "peakIntensity", "fragmentType", "fragmentNumber"]]
+    reformattedDf = loader.rawUploadedLibraryObject
     expectedKeys = [(516.801083027, "YRPGTVALR")]
-
-    expectedTupleToListMzDict = {
-        (516.801083027, "YRPGTVALR"): [
-            713.4304499719999,
-            745.399149844,
-            858.483213826,
-            674.362036054,
-            616.3776861179999,
-            435.269418758,
-            559.3562223920001,
-            458.308543918,
-            575.293622136,
-            429.745245163,
-        ]
+    expectedPeakMzs = [713.4304499719999, 745.399149844, 858.483213826]
+    expectedPeakIntensities = [1795.5, 324.1, 271.9]
+    expectedFragmentTypes = [("y", 7, 1), ("b", 7, 1), ("b", 8, 1)]
+    expectedMetadata = {
+        "precursorCharge": [2],
+        "identification": ["51327_YRPGTVALR_2"],
+        "proteinName": [
+            "5/sp|Q71DI3|H32_HUMAN/sp|Q6NXT2|H3C_HUMAN/sp|Q16695|H31T_HUMAN/sp|P84243|H33_HUMAN/sp|P68431|H31_HUMAN"
+        ],
     }
 
-    expectedTupleToListIntensityDict = {
-        (516.801083027, "YRPGTVALR"): [
-            1795.5,
-            324.1,
-            271.9,
-            143.6,
-            124.8,
-            84.0,
-            67.3,
-            61.0,
-            57.3,
-            39.7,
-        ]
-    }
-
-    expectedTupleToDictMetadataDict = {
-        (516.801083027, "YRPGTVALR"): {
-            "precursorCharge": 2,
-            "identification": "51327_YRPGTVALR_2",
-            "proteinName": "5/sp|Q71DI3|H32_HUMAN/sp|Q6NXT2|H3C_HUMAN/sp|Q16695|H31T_HUMAN/sp|P84243|H33_HUMAN/sp|P68431|H31_HUMAN",
+    dataDict = _organize_data_by_zodiaq_library_dict_keys(reformattedDf, maxPeakNum=3)
+    assert list(zip(dataDict["precursorMz"], dataDict["peptide"])) == expectedKeys
+    assert list(dataDict["peakOffsets"]) == [0, 3]
+    assert list(dataDict["peakMz"]) == expectedPeakMzs
+    assert list(dataDict["peakIntensity"]) == expectedPeakIntensities
+    assert (
+        list(
+            zip(
+                dataDict["fragmentType"],
+                dataDict["fragmentNumber"],
+                dataDict["fragmentCharge"],
+            )
+        )
+        == expectedFragmentTypes
+    )
+    assert {
+        column: list(values) for column, values in dataDict["metadata"].items()
+    } == expectedMetadata
+
+
+def test__library_loader_strategy_table__organize_data_by_zodiaq_library_dict_keys__sorts_keys_and_peaks_and_breaks_intensity_ties_by_row_order():
+    df = pd.DataFrame(
+        {
+            "precursorMz": [500.0, 400.0, 500.0, 400.0, 500.0, 500.0],
+            "peptideName": ["B", "A", "A", "A", "B", "B"],
+            "precursorCharge": [2, 3, 2, 3, 2, 2],
+            "identification": ["B_first", "A", "A", "A", "B_second", "B_third"],
+            "proteinName": ["protB", "protA", "DECOY_protA", "protA", "x", "y"],
+            "peakMz": [300.0, 200.0, 100.0, 250.0, 150.0, 350.0],
+            "peakIntensity": [10.0, 5.0, 1.0, 7.0, 20.0, 10.0],
+            "fragmentType": ["y", "b", "y", "y", "b", "b"],
+            "fragmentNumber": [1, 2, 3, 4, 5, 6],
+            "fragmentCharge": [1, 1, 1, 1, 1, 1],
         }
-    }
-
-    expectedTupleToFragmentTypeDf = {
-        (516.801083027, "YRPGTVALR"): [
-            ("y", 7, 1),
-            ("b", 7, 1),
-            ("b", 8, 1),
-            ("b", 6, 1),
-            ("y", 6, 1),
-            ("y", 8, 2),
-            ("y", 5, 1),
-            ("y", 4, 1),
-            ("b", 5, 1),
-            ("b", 8, 2),
-        ]
-    }
-
-    dataDict = _organize_data_by_zodiaq_library_dict_keys(reformattedDf)
-    assert dataDict["zodiaqKeys"] == expectedKeys
-    assert dataDict["mz"] == expectedTupleToListMzDict
-    assert dataDict["intensities"] == expectedTupleToListIntensityDict
-    assert dataDict["metadata"] == expectedTupleToDictMetadataDict
-    assert dataDict["fragmentTypes"] == expectedTupleToFragmentTypeDf
+    )
+    dataDict = _organize_data_by_zodiaq_library_dict_keys(df, maxPeakNum=2)
+    assert list(zip(dataDict["precursorMz"], dataDict["peptide"])) == [
+        (400.0, "A"),
+        (500.0, "A"),
+        (500.0, "B"),
+    ]
+    assert list(dataDict["peakOffsets"]) == [0, 2, 3, 5]
+    assert list(dataDict["peakMz"]) == [200.0, 250.0, 100.0, 150.0, 300.0]
+    assert list(dataDict["peakIntensity"]) == [5.0, 7.0, 1.0, 20.0, 10.0]
+    assert list(dataDict["metadata"]["identification"]) == ["A", "A", "B_first"]
+    assert list(dataDict["metadata"]["proteinName"]) == [
+        "protA",
+        "DECOY_protA",
+        "protB",
+    ]
 
 
 @pytest.fixture
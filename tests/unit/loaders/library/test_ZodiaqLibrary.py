@@ -0,0 +1,140 @@
+from zodiaq.loaders.library.zodiaqLibrary import ZodiaqLibrary
+from zodiaq.loaders.library.libraryLoaderContext import LibraryLoaderContext
+
+from tempfile import TemporaryDirectory
+import numpy as np
+import pytest
+import os
+
+
+def get_parent_dir():
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def zodiaqLibDict():
+    return {
+        (200.0, "PEPTIDEB"): {
+            "precursorCharge": 2,
+            "identification": "idB",
+            "proteinName": "1/proteinB",
+            "peaks": [(100.0, 5.0, 1), (300.0, 1.0, 1)],
+            "zodiaqKeyIdx": 1,
+            "isDecoy": 1,
+        },
+        (100.0, "PEPTIDEA"): {
+            "precursorCharge": 1,
+            "identification": "idA",
+            "proteinName": "1/proteinA",
+            "peaks": [(100.0, 2.0, 0), (150.0, 3.0, 0), (400.0, 4.0, 0)],
+            "zodiaqKeyIdx": 0,
+            "isDecoy": 0,
+        },
+    }
+
+
+@pytest.fixture
+def library(zodiaqLibDict):
+    return ZodiaqLibrary.from_zodiaq_library_dict(zodiaqLibDict)
+
+
+def test__zodiaq_library__from_zodiaq_library_dict(library):
+    assert len(library) == 2
+    np.testing.assert_array_equal(library.precursorMz, [100.0, 200.0])
+    np.testing.assert_array_equal(library.peakOffsets, [0, 3, 5])
+    np.testing.assert_array_equal(library.peakMz, [100.0, 150.0, 400.0, 100.0, 300.0])
+    np.testing.assert_array_equal(library.peakIntensity, [2.0, 3.0, 4.0, 5.0, 1.0])
+    np.testing.assert_array_equal(library.metadata["peptide"], ["PEPTIDEA", "PEPTIDEB"])
+    np.testing.assert_array_equal(library.metadata["isDecoy"], [0, 1])
+    assert library.keys() == [(100.0, "PEPTIDEA"), (200.0, "PEPTIDEB")]
+
+
+def test__zodiaq_library__peak_tags(library):
+    np.testing.assert_array_equal(library.peak_tags(), [0, 0, 0, 1, 1])
+    np.testing.assert_array_equal(library.peak_tags(1, 2), [1, 1])
+
+
+def test__zodiaq_library__pool_peaks_of_spectra_matches_sorted_tuples(
+    library, zodiaqLibDict
+):
+    expectedPeaks = sorted(
+        zodiaqLibDict[(100.0, "PEPTIDEA")]["peaks"]
+        + zodiaqLibDict[(200.0, "PEPTIDEB")]["peaks"]
+    )
+    np.testing.assert_array_equal(
+        library.pool_peaks_of_spectra(0, 2), np.array(expectedPeaks)
+    )
+    assert len(library.pool_peaks_of_spectra(1, 1)) == 0
+
+
+def test__zodiaq_library__get_spectrum_metadata(library):
+    metadata = library.get_spectrum_metadata(1)
+    assert metadata["precursorMz"] == 200.0
+    assert metadata["peptide"] == "PEPTIDEB"
+    assert metadata["precursorCharge"] == 2
+    assert metadata["identification"] == "idB"
+    assert metadata["proteinName"] == "1/proteinB"
+    assert metadata["isDecoy"] == 1
+    np.testing.assert_array_equal(metadata["peaks"], [[100.0, 5.0, 1], [300.0, 1.0, 1]])
+
+
+def test__zodiaq_library__loaded_from_context_matches_library_dict():
+    tableLibPath = os.path.join(
+        get_parent_dir(), "test_files", "sample_lib_table_spectrast_multiple.tsv"
+    )
+    context = LibraryLoaderContext(tableLibPath)
+    zodiaqLibDict = context.load_zodiaq_library_dict(isTest=True)
+    library = context.load_zodiaq_library(isTest=True)
+    assert library.keys() == sorted(zodiaqLibDict.keys())
+    for key, value in zodiaqLibDict.items():
+        np.testing.assert_array_equal(
+            library.peaks_of_spectrum(value["zodiaqKeyIdx"]), np.array(value["peaks"])
+        )
+
+
+def test__zodiaq_library__from_spectra__sorts_spectra_and_keeps_last_of_duplicate_keys():
+    library = ZodiaqLibrary.from_spectra(
+        np.array([200.0, 100.0, 200.0]),
+        np.array(["PEPTIDEB", "PEPTIDEA", "PEPTIDEB"], dtype=object),
+        np.array([0, 1, 3, 4]),
+        np.array([100.0, 150.0, 400.0, 300.0]),
+        np.array([1.0, 3.0, 4.0, 2.0]),
+        {"identification": np.array(["first", "idA", "last"], dtype=object)},
+        {"fragmentNumber": np.array([1, 2, 3, 4])},
+    )
+    assert library.keys() == [(100.0, "PEPTIDEA"), (200.0, "PEPTIDEB")]
+    np.testing.assert_array_equal(library.peakOffsets, [0, 2, 3])
+    np.testing.assert_array_equal(library.peakMz, [150.0, 400.0, 300.0])
+    np.testing.assert_array_equal(library.peakIntensity, [3.0, 4.0, 2.0])
+    np.testing.assert_array_equal(library.metadata["identification"], ["idA", "last"])
+    np.testing.assert_array_equal(library.peakMetadata["fragmentNumber"], [2, 3, 4])
+
+
+def test__zodiaq_library__from_spectra__sorts_peaks_within_each_spectrum():
+    library = ZodiaqLibrary.from_spectra(
+        np.array([200.0, 100.0]),
+        np.array(["PEPTIDEB", "PEPTIDEA"], dtype=object),
+        np.array([0, 3, 5]),
+        np.array([300.0, 100.0, 300.0, 150.0, 250.0]),
+        np.array([2.0, 5.0, 1.0, 3.0, 4.0]),
+        {"identification": np.array(["idB", "idA"], dtype=object)},
+        {"fragmentNumber": np.array([1, 2, 3, 4, 5])},
+    )
+    np.testing.assert_array_equal(library.peakOffsets, [0, 2, 5])
+    np.testing.assert_array_equal(library.peakMz, [150.0, 250.0, 100.0, 300.0, 300.0])
+    np.testing.assert_array_equal(library.peakIntensity, [3.0, 4.0, 5.0, 1.0, 2.0])
+    np.testing.assert_array_equal(
+        library.peakMetadata["fragmentNumber"], [4, 5, 2, 3, 1]
+    )
+
+
+def test__zodiaq_library__to_zodiaq_library_dict(library, zodiaqLibDict):
+    assert library.to_zodiaq_library_dict() == zodiaqLibDict
+
+
+@pytest.mark.parametrize("invalidValue", [np.nan, 7, "id\0A"])
+def test__zodiaq_library__save__non_string_metadata_raises_error(library, invalidValue):
+    library.metadata["identification"][0] = invalidValue
+    saveDirectory = TemporaryDirectory(prefix="zodiaq_library_save_test_")
+    with pytest.raises(TypeError, match="'identification' library metadata"):
+        library.save(saveDirectory.name)
@@ -1,13 +1,20 @@
 import random
 import re
+import pytest
+import numpy as np
+from copy import deepcopy
 from pyteomics import mass
 from zodiaq.loaders.library.decoyGenerationFunctions import (
     shuffle_peptide_sequence_with_preserved_cleavage_points,
     calculate_similarities_between_strings,
     calculate_ion_mz,
-    add_decoys_to_zodiaq_library,
-    determine_if_decoys_should_be_generated,
+    calculate_ion_mzs,
+    add_decoys_to_library,
+    determine_if_decoys_should_be_generated_for_library,
 )
+from zodiaq.loaders.library.zodiaqLibrary import ZodiaqLibrary
+from zodiaq.loaders import peakPoolingFunctions
+from zodiaq.loaders.peakPoolingFunctions import numba_enhanced_merge_of_sorted_peak_runs
 from test_LibraryLoaderStrategyTable import assert_final_dict_output_matches_expected
 
 
@@ -156,9 +163,45 @@ def test__decoy_generation_functions__calculate_ion_mz__with_unimod_modification
     assert fragment2Mass == fragment2ExpectedMass
 
 
-def test__decoy_generation_functions__add_decoys_to_zodiaq_library():
+def test__decoy_generation_functions__calculate_ion_mzs__matches_calculate_ion_mz():
     random.seed(0)
-    zodiaqLibraryDict = {
+    aminoAcids = "ACDEFGHIKLMNPQRSTVWY"
+    modifications = ["(UniMod:4)", "(UniMod:35)", "(UniMod:21)", "(UniMod:1009)"]
+    for _ in range(200):
+        sequence = ""
+        for _ in range(random.randint(1, 25)):
+            sequence += random.choice(aminoAcids)
+            if random.random() < 0.2:
+                sequence += random.choice(modifications)
+        numResidues = len(re.findall(r"[A-Z]", sequence))
+        fragments = [
+            (type, position, charge)
+            for type in ["b", "y"]
+            for position in range(1, numResidues + 2)
+            for charge in [1, 2, 3]
+        ] + [("y", 0, 1)]
+        expectedMzs = [calculate_ion_mz(sequence, *fragment) for fragment in fragments]
+        assert calculate_ion_mzs(sequence, fragments).tolist() == expectedMzs
+
+
+def test__decoy_generation_functions__calculate_ion_mzs__with_many_modifications():
+    sequence = "M(UniMod:35)C(UniMod:4)AS(UniMod:21)C(UniMod:4)K"
+    fragments = [("y", i, 1) for i in range(1, 7)] + [("b", i, 2) for i in range(1, 7)]
+    expectedMzs = [calculate_ion_mz(sequence, *fragment) for fragment in fragments]
+    assert calculate_ion_mzs(sequence, fragments).tolist() == expectedMzs
+
+
+def test__decoy_generation_functions__calculate_ion_mzs__falls_back_for_other_residues():
+    sequence = "AUCR"
+    fragments = [("y", 2, 1), ("b", 3, 1)]
+    expectedMzs = [calculate_ion_mz(sequence, *fragment) for fragment in fragments]
+    assert calculate_ion_mzs(sequence, fragments).tolist() == expectedMzs
+    assert len(calculate_ion_mzs(sequence, [])) == 0
+
+
+@pytest.fixture
+def zodiaqLibraryDict():
+    return {
         (375.873226, "FANYIDKVR"): {
             "precursorCharge": 3,
             "identification": "FANYIDKVR",
@@ -191,25 +234,38 @@ def test__decoy_generation_functions__add_decoys_to_zodiaq_library():
             ],
         }
     }
-    outputDict = add_decoys_to_zodiaq_library(zodiaqLibraryDict.copy())
+
+
+def add_decoys_to_library_dict(zodiaqLibraryDict, **kwargs):
+    library = ZodiaqLibrary.from_zodiaq_library_dict(deepcopy(zodiaqLibraryDict))
+    return add_decoys_to_library(library, **kwargs).to_zodiaq_library_dict()
+
+
+def test__decoy_generation_functions__add_decoys_to_library(zodiaqLibraryDict):
+    outputDict = add_decoys_to_library_dict(zodiaqLibraryDict)
+    expectedTargetValue = deepcopy(zodiaqLibraryDict[(375.873226, "FANYIDKVR")])
+    expectedTargetValue["peaks"] = [
+        (mz, intensity, 1) for mz, intensity, _ in expectedTargetValue["peaks"]
+    ]
+    expectedTargetValue["zodiaqKeyIdx"] = 1
     expectedOutputDict = {
-        (375.873226, "INALDYKVR"): {
+        (375.873226, "ANMFVIKDR"): {
             "precursorCharge": 3,
-            "identification": "INALDYKVR_375.873226_DECOY",
+            "identification": "ANMFVIKDR_375.873226_DECOY",
             "proteinName": "1/DECOY_P08670",
             "peaks": [
-                (175.11895217407, 2926.18, 1),
-                (274.18736608706, 1647.689, 1),
-                (299.17138166975, 1071.177, 1),
-                (397.23197055067004, 2078.822, 1),
-                (402.28232910106, 4932.288, 1),
-                (432.750527443025, 1301.4617, 1),
-                (489.77199116359503, 1395.553, 1),
-                (565.34565763361, 10000.0, 1),
-                (680.37260065744, 8233.006, 1),
-                (793.4566646345701, 5096.472, 1),
+                (175.11895217407, 2926.18, 0),
+                (290.1458951979, 1647.689, 0),
+                (317.12780260561, 1071.177, 0),
+                (389.23451324089, 2078.822, 0),
+                (418.2408582119, 4932.288, 0),
+                (454.75475569738506, 1301.4617, 0),
+                (511.776219417955, 1395.553, 0),
+                (531.32492218903, 10000.0, 0),
+                (630.39333610202, 8233.006, 0),
+                (777.46175001501, 5096.472, 0),
             ],
-            "zodiaqKeyIdx": 1,
+            "zodiaqKeyIdx": 0,
             "isDecoy": 1,
             "fragmentTypes": [
                 ("y", 1, 1),
@@ -223,28 +279,72 @@ def test__decoy_generation_functions__add_decoys_to_zodiaq_library():
                 ("y", 5, 1),
                 ("y", 6, 1),
             ],
-        }
-    } | zodiaqLibraryDict.copy()
+        },
+        (375.873226, "FANYIDKVR"): expectedTargetValue,
+    }
+    assert list(outputDict) == list(expectedOutputDict)
     assert_final_dict_output_matches_expected(outputDict, expectedOutputDict)
 
 
-def test__decoy_generation_functions__add_decoys_to_zodiaq_library__ambiguous_peptides_ignored():
+def test__decoy_generation_functions__add_decoys_to_library__decoys_depend_only_on_seed_and_target(
+    zodiaqLibraryDict,
+):
+    largerLibraryDict = deepcopy(zodiaqLibraryDict)
+    otherTarget = deepcopy(zodiaqLibraryDict[(375.873226, "FANYIDKVR")])
+    otherTarget["identification"] = "LGEYGFQNALIVR"
+    largerLibraryDict[(400.0, "LGEYGFQNALIVR")] = otherTarget
+    random.seed(1)
+    outputDict = add_decoys_to_library_dict(zodiaqLibraryDict)
+    random.seed(2)
+    largerOutputDict = add_decoys_to_library_dict(largerLibraryDict)
+    decoyIdentifications = set(
+        value["identification"] for value in outputDict.values() if value["isDecoy"]
+    )
+    assert decoyIdentifications.issubset(
+        value["identification"] for value in largerOutputDict.values()
+    )
+    otherSeedOutputDict = add_decoys_to_library_dict(zodiaqLibraryDict, decoySeed=1)
+    assert set(otherSeedOutputDict) != set(outputDict)
+
+
+def test__decoy_generation_functions__add_decoys_to_library__identical_for_any_number_of_workers(
+    zodiaqLibraryDict,
+):
+    random.seed(0)
+    aminoAcids = "AGKR"
+    target = zodiaqLibraryDict[(375.873226, "FANYIDKVR")]
+    libraryDict = {}
+    for i in range(20):
+        peptide = "".join(random.choice(aminoAcids) for _ in range(5)) + "K"
+        value = deepcopy(target)
+        value["identification"] = peptide
+        libraryDict[(400.0 + i % 2, peptide)] = value
+    serialOutputDict = add_decoys_to_library_dict(libraryDict)
+    for numWorkers in [2, 3]:
+        parallelOutputDict = add_decoys_to_library_dict(
+            libraryDict, numWorkers=numWorkers
+        )
+        assert parallelOutputDict == serialOutputDict
+        assert list(parallelOutputDict) == list(serialOutputDict)
+
+
+def test__decoy_generation_functions__add_decoys_to_library__ambiguous_peptides_ignored():
     zodiaqLibraryDict = {
         (375.873226, "AAAAAAAAKAAABR"): {
             "precursorCharge": 3,
             "identification": "FANYIDKVR",
             "proteinName": "1/P08670",
             "peaks": [
-                (175.11895217407, 2926.18, 1),
-                (274.18736608706, 1647.689, 1),
-                (299.17138166975, 1071.177, 1),
-                (397.23197055067004, 2078.822, 1),
-                (402.28232910106, 4932.288, 1),
-                (432.750527443025, 1301.4617, 1),
-                (489.77199116359503, 1395.553, 1),
-                (565.34565763361, 10000.0, 1),
-                (680.37260065744, 8233.006, 1),
-                (793.4566646345701, 5096.472, 1),
+                (175.11895217407, 2926.18, 0),
+                (274.18736608706, 1647.689, 0),
+                (299.17138166975, 1071.177, 0),
+                (397.23197055067004, 2078.822, 0),
+                (402.28232910106, 4932.288, 0),
+                (432.750527443025, 1301.4617, 0),
+                (489.77199116359503, 1395.553, 0),
+                (565.34565763361, 10000.0, 0),
+                (680.37260065744, 8233.006, 0),
+                (793.4566646345701, 5096.472, 0),
             ],
             "zodiaqKeyIdx": 0,
             "isDecoy": 0,
@@ -262,103 +362,75 @@ def test__decoy_generation_functions__add_decoys_to_zodiaq_library__ambiguous_pe
             ],
         }
     }
-    random.seed(0)
-    outputDict = add_decoys_to_zodiaq_library(zodiaqLibraryDict)
+    outputDict = add_decoys_to_library_dict(zodiaqLibraryDict)
     assert_final_dict_output_matches_expected(outputDict, zodiaqLibraryDict)
+    assert list(outputDict) == list(zodiaqLibraryDict)
 
 
-def test__decoy_generation_functions__determine_if_decoys_should_be_generated():
-    zodiaqLibraryDict_shouldGenerate = {
-        (375.873226, "FANYIDKVR"): {
-            "precursorCharge": 3,
-            "identification": "FANYIDKVR",
-            "proteinName": "1/P08670",
-            "peaks": [
-                (175.118953, 2926.18, 0),
-                (274.187367, 1647.689, 0),
-                (333.155733, 1071.177, 0),
-                (397.231972, 2078.822, 0),
-                (402.282331, 4932.288, 0),
-                (454.253437, 1301.4617, 0),
-                (489.771994, 1395.553, 0),
-                (517.309275, 10000.0, 0),
-                (630.393339, 8233.006, 0),
-                (793.456668, 5096.472, 0),
-            ],
-            "zodiaqKeyIdx": 0,
-            "isDecoy": 0,
-            "fragmentTypes": [
-                ("y", 1, 1),
-                ("y", 2, 1),
-                ("b", 3, 1),
-                ("y", 6, 2),
-                ("y", 3, 1),
-                ("y", 7, 2),
-                ("y", 8, 2),
-                ("y", 4, 1),
-                ("y", 5, 1),
-                ("y", 6, 1),
-            ],
-        }
-    }
-    zodiaqLibraryDict_shouldNotGenerate_hasDecoys = {
-        (375.873226, "INALDYKVR"): {
-            "precursorCharge": 3,
-            "identification": "INALDYKVR_375.873226_DECOY",
-            "proteinName": "1/DECOY_P08670",
-            "peaks": [
-                (175.201, 2926.18, 1),
-                (274.332, 1647.689, 1),
-                (299.33872, 1071.177, 1),
-                (397.46125, 2078.822, 1),
-                (402.5043, 4932.288, 1),
-                (433.00019999999995, 1301.4617, 1),
-                (490.05150000000003, 1395.553, 1),
-                (565.6775, 10000.0, 1),
-                (680.7649, 8233.006, 1),
-                (793.9225, 5096.472, 1),
-            ],
-            "zodiaqKeyIdx": 1,
-            "isDecoy": 1,
-            "fragmentTypes": [
-                ("y", 1, 1),
-                ("y", 2, 1),
-                ("b", 3, 1),
-                ("y", 6, 2),
-                ("y", 3, 1),
-                ("y", 7, 2),
-                ("y", 8, 2),
-                ("y", 4, 1),
-                ("y", 5, 1),
-                ("y", 6, 1),
-            ],
-        }
-    } | zodiaqLibraryDict_shouldGenerate
-    zodiaqLibraryDict_shouldNotGenerate_hasNoDecoysButNoFragmentTypes = {
-        (375.873226, "FANYIDKVR"): {
-            "precursorCharge": 3,
-            "identification": "FANYIDKVR",
-            "proteinName": "1/P08670",
-            "peaks": [
-                (175.118953, 2926.18, 0),
-                (274.187367, 1647.689, 0),
-                (333.155733, 1071.177, 0),
-                (397.231972, 2078.822, 0),
-                (402.282331, 4932.288, 0),
-                (454.253437, 1301.4617, 0),
-                (489.771994, 1395.553, 0),
-                (517.309275, 10000.0, 0),
-                (630.393339, 8233.006, 0),
-                (793.456668, 5096.472, 0),
-            ],
-            "zodiaqKeyIdx": 0,
-            "isDecoy": 0,
-        }
-    }
-    assert determine_if_decoys_should_be_generated(zodiaqLibraryDict_shouldGenerate)
-    assert not determine_if_decoys_should_be_generated(
-        zodiaqLibraryDict_shouldNotGenerate_hasDecoys
+def test__decoy_generation_functions__determine_if_decoys_should_be_generated_for_library(
+    zodiaqLibraryDict,
+):
+    library_shouldGenerate = ZodiaqLibrary.from_zodiaq_library_dict(
+        deepcopy(zodiaqLibraryDict)
+    )
+    library_shouldNotGenerate_hasDecoys = add_decoys_to_library(library_shouldGenerate)
+    zodiaqLibraryDict_hasNoFragmentTypes = deepcopy(zodiaqLibraryDict)
+    del zodiaqLibraryDict_hasNoFragmentTypes[(375.873226, "FANYIDKVR")]["fragmentTypes"]
+    library_shouldNotGenerate_hasNoDecoysButNoFragmentTypes = (
+        ZodiaqLibrary.from_zodiaq_library_dict(zodiaqLibraryDict_hasNoFragmentTypes)
+    )
+    assert determine_if_decoys_should_be_generated_for_library(library_shouldGenerate)
+    assert not determine_if_decoys_should_be_generated_for_library(
+        library_shouldNotGenerate_hasDecoys
+    )
+    assert not determine_if_decoys_should_be_generated_for_library(
+        library_shouldNotGenerate_hasNoDecoysButNoFragmentTypes
     )
-    assert not determine_if_decoys_should_be_generated(
-        zodiaqLibraryDict_shouldNotGenerate_hasNoDecoysButNoFragmentTypes
+
+
+def test__decoy_generation_functions__add_decoys_to_library__decoy_peaks_are_pooled_by_merge(
+    zodiaqLibraryDict, monkeypatch
+):
+    random.seed(0)
+    aminoAcids = "ACDEFGHILMNQSTVWY"
+    target = zodiaqLibraryDict[(375.873226, "FANYIDKVR")]
+    libraryDict = {}
+    for i in range(10):
+        peptide = "".join(random.choice(aminoAcids) for _ in range(9)) + "K"
+        value = deepcopy(target)
+        value["identification"] = peptide
+        libraryDict[(400.0, peptide)] = value
+    library = add_decoys_to_library(ZodiaqLibrary.from_zodiaq_library_dict(libraryDict))
+    isDecoy = library.metadata["isDecoy"].astype(bool)
+    assert np.any(isDecoy)
+    for zodiaqKeyIdx, peptide in enumerate(library.metadata["peptide"]):
+        peakStart = library.peakOffsets[zodiaqKeyIdx]
+        peakStop = library.peakOffsets[zodiaqKeyIdx + 1]
+        peakMz = library.peakMz[peakStart:peakStop]
+        assert np.all(np.diff(peakMz) >= 0)
+        if isDecoy[zodiaqKeyIdx]:
+            fragmentTypes = list(
+                zip(
+                    *(
+                        library.peakMetadata[name][peakStart:peakStop].tolist()
+                        for name in ["fragmentType", "fragmentNumber", "fragmentCharge"]
+                    )
+                )
+            )
+            assert peakMz.tolist() == calculate_ion_mzs(peptide, fragmentTypes).tolist()
+
+    mergedPeakRuns = []
+
+    def merge_of_sorted_peak_runs(peaks, runOffsets):
+        mergedPeakRuns.append(runOffsets)
+        return numba_enhanced_merge_of_sorted_peak_runs(peaks, runOffsets)
+
+    monkeypatch.setattr(
+        peakPoolingFunctions,
+        "numba_enhanced_merge_of_sorted_peak_runs",
+        merge_of_sorted_peak_runs,
     )
+    pooledPeaks = library.pool_peaks_of_spectra(0, len(library))
+    assert len(mergedPeakRuns) == 1
+    sortIdx = np.lexsort((pooledPeaks[:, 2], pooledPeaks[:, 1], pooledPeaks[:, 0]))
+    np.testing.assert_array_equal(pooledPeaks, pooledPeaks[sortIdx])
@@ -0,0 +1,133 @@
+from zodiaq.loaders.library.libraryCacheFunctions import (
+    calculate_file_content_hash,
+    create_library_cache_key,
+    get_library_cache_path,
+    write_to_cache,
+)
+from zodiaq.loaders.library.libraryLoaderContext import LibraryLoaderContext
+from zodiaq.loaders.library.libraryLoaderStrategyTable import (
+    LibraryLoaderStrategyTable,
+)
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+import numpy as np
+import pytest
+import shutil
+import os
+
+
+def get_parent_dir():
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def cacheDirectory():
+    return TemporaryDirectory(prefix="zodiaq_library_cache_test_")
+
+
+@pytest.fixture
+def libraryFile(cacheDirectory):
+    originalLibraryFile = os.path.join(
+        get_parent_dir(), "test_files", "sample_lib_table_spectrast_multiple.tsv"
+    )
+    libraryFile = os.path.join(cacheDirectory.name, "library.tsv")
+    shutil.copy(originalLibraryFile, libraryFile)
+    return libraryFile
+
+
+def assert_libraries_are_equal(expectedLibrary, library):
+    np.testing.assert_array_equal(expectedLibrary.precursorMz, library.precursorMz)
+    np.testing.assert_array_equal(expectedLibrary.peakOffsets, library.peakOffsets)
+    np.testing.assert_array_equal(expectedLibrary.peakMz, library.peakMz)
+    np.testing.assert_array_equal(expectedLibrary.peakIntensity, library.peakIntensity)
+    assert expectedLibrary.metadata.keys() == library.metadata.keys()
+    for name in expectedLibrary.metadata:
+        np.testing.assert_array_equal(
+            expectedLibrary.metadata[name], library.metadata[name]
+        )
+
+
+def test__library_cache_functions__cache_key_depends_on_file_hash_and_parameters(
+    libraryFile,
+):
+    fileHash = calculate_file_content_hash(libraryFile)
+    parameters = LibraryLoaderStrategyTable().get_loader_parameters(isTest=False)
+    cacheKey = create_library_cache_key(fileHash, parameters)
+    assert cacheKey == create_library_cache_key(fileHash, dict(parameters))
+    assert cacheKey != create_library_cache_key(fileHash, {**parameters, "isTest": 1})
+    with open(libraryFile, "a") as f:
+        f.write("\n")
+    assert cacheKey != create_library_cache_key(
+        calculate_file_content_hash(libraryFile), parameters
+    )
+
+
+def test__library_cache_functions__get_library_cache_path_defaults_to_library_directory(
+    libraryFile, cacheDirectory
+):
+    otherDirectory = TemporaryDirectory(prefix="zodiaq_library_cache_test_")
+    cacheKey = "0123456789abcdef0123"
+    assert get_library_cache_path(libraryFile, cacheKey) == os.path.join(
+        cacheDirectory.name, "library.tsv.zodiaqlib-0123456789abcdef"
+    )
+    assert get_library_cache_path(
+        libraryFile, cacheKey, otherDirectory.name
+    ) == os.path.join(otherDirectory.name, "library.tsv.zodiaqlib-0123456789abcdef")
+
+
+def test__library_cache_functions__cached_library_matches_uncached_library(
+    libraryFile,
+):
+    uncachedLibrary = LibraryLoaderContext(libraryFile).load_zodiaq_library()
+    firstCachedLibrary = LibraryLoaderContext(
+        libraryFile, isCached=True
+    ).load_zodiaq_library()
+    assert_libraries_are_equal(uncachedLibrary, firstCachedLibrary)
+    with patch.object(
+        LibraryLoaderStrategyTable, "load_zodiaq_library_from_file"
+    ) as loadFromFile:
+        secondCachedLibrary = LibraryLoaderContext(
+            libraryFile, isCached=True
+        ).load_zodiaq_library()
+        loadFromFile.assert_not_called()
+    assert isinstance(secondCachedLibrary.peakMz, np.memmap)
+    assert_libraries_are_equal(uncachedLibrary, secondCachedLibrary)
+
+
+def test__library_cache_functions__cache_is_replaced_when_library_file_changes(
+    libraryFile, cacheDirectory
+):
+    otherDirectory = TemporaryDirectory(prefix="zodiaq_library_cache_test_")
+    LibraryLoaderContext(
+        libraryFile, isCached=True, cacheDirectory=otherDirectory.name
+    ).load_zodiaq_library()
+    originalCacheContents = os.listdir(otherDirectory.name)
+    assert len(originalCacheContents) == 1
+    with open(libraryFile) as f:
+        lines = f.readlines()
+    with open(libraryFile, "w") as f:
+        f.writelines(lines[:-1])
+    LibraryLoaderContext(
+        libraryFile, isCached=True, cacheDirectory=otherDirectory.name
+    ).load_zodiaq_library()
+    newCacheContents = os.listdir(otherDirectory.name)
+    assert len(newCacheContents) == 1
+    assert newCacheContents != originalCacheContents
+
+
+@pytest.mark.parametrize("saveError", [OSError, TypeError])
+def test__library_cache_functions__write_to_cache__removes_temporary_directory_when_saving_fails(
+    cacheDirectory, saveError
+):
+    class UnsavableData:
+        def save(self, directory, manifestEntries):
+            open(os.path.join(directory, "partial.npy"), "w").close()
+            raise saveError("save failed")
+
+    cachePath = os.path.join(cacheDirectory.name, "library.tsv.zodiaqlib-0")
+    if saveError is OSError:
+        write_to_cache(UnsavableData(), cachePath, {})
+    else:
+        with pytest.raises(saveError):
+            write_to_cache(UnsavableData(), cachePath, {})
+    assert os.listdir(cacheDirectory.name) == []
@@ -1,6 +1,7 @@
 from zodiaq.loaders.query import QueryLoaderStrategy
 from zodiaq.loaders.query import QueryLoaderStrategyMzxml
 import pytest
+import numpy as np
 import os
 import re
 from expectedPooledQueryPeaks import (
@@ -92,13 +93,11 @@ def test__query_loader_strategy_mzxml__pool_query_scans__single_scan(loader):
     singleScan = ["456"]
     with loader.get_query_file_reader() as reader:
         outputPool = loader.pool_peaks_of_query_scans(singleScan, reader)
-        for i in range(len(expectedOutputPoolSingleScan)):
-            assert outputPool[i] == expectedOutputPoolSingleScan[i]
+    np.testing.assert_array_equal(outputPool, np.array(expectedOutputPoolSingleScan))
 
 
 def test__query_loader_strategy_mzxml__pool_query_scans__multiple_scan(loader):
     multipleScans = ["1", "119"]
     with loader.get_query_file_reader() as reader:
         outputPool = loader.pool_peaks_of_query_scans(multipleScans, reader)
-        for i in range(len(expectedOutputPoolMultipleScans)):
-            assert outputPool[i] == expectedOutputPoolMultipleScans[i]
+    np.testing.assert_array_equal(outputPool, np.array(expectedOutputPoolMultipleScans))
@@ -0,0 +1,79 @@
+from zodiaq.loaders.query.queryCacheFunctions import load_query_peak_store_using_cache
+from zodiaq.loaders.query.queryPeakStore import QueryPeakStore
+from zodiaq.loaders import QueryLoaderContext
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+import numpy as np
+import pytest
+import shutil
+import os
+
+
+def get_parent_dir():
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def cacheDirectory():
+    return TemporaryDirectory(prefix="zodiaq_query_cache_test_")
+
+
+@pytest.fixture
+def queryFile(cacheDirectory):
+    originalQueryFile = os.path.join(
+        get_parent_dir(), "test_files", "sample_query_mzxml.mzXML"
+    )
+    queryFile = os.path.join(cacheDirectory.name, "query.mzXML")
+    shutil.copy(originalQueryFile, queryFile)
+    return queryFile
+
+
+def test__query_cache_functions__cached_query_context_matches_uncached_query_context(
+    queryFile,
+):
+    uncachedContext = QueryLoaderContext(queryFile)
+    cachedContext = QueryLoaderContext(queryFile, isCached=True)
+    assert (
+        uncachedContext.map_query_scan_ids_to_dia_mz_windows()
+        == cachedContext.map_query_scan_ids_to_dia_mz_windows()
+    )
+    assert (
+        uncachedContext.extract_metadata_from_query_scans()
+        == cachedContext.extract_metadata_from_query_scans()
+    )
+    for scans in [["456"], ["1", "119"], ["1", "119", "456"]]:
+        with uncachedContext.get_query_file_reader() as reader:
+            expectedPooledPeaks = uncachedContext.pool_peaks_of_query_scans(
+                scans, reader
+            )
+        with cachedContext.get_query_file_reader() as reader:
+            pooledPeaks = cachedContext.pool_peaks_of_query_scans(scans, reader)
+        np.testing.assert_array_equal(
+            np.array(expectedPooledPeaks, dtype=np.float64), pooledPeaks
+        )
+
+
+def test__query_cache_functions__query_file_is_decoded_once(queryFile):
+    firstPeakStore = load_query_peak_store_using_cache(queryFile)
+    with patch.object(QueryPeakStore, "from_mzxml") as fromMzxml:
+        secondPeakStore = load_query_peak_store_using_cache(queryFile)
+        fromMzxml.assert_not_called()
+    assert isinstance(secondPeakStore.peakMz, np.memmap)
+    np.testing.assert_array_equal(firstPeakStore.scanTable, secondPeakStore.scanTable)
+    np.testing.assert_array_equal(firstPeakStore.peakMz, secondPeakStore.peakMz)
+    np.testing.assert_array_equal(
+        firstPeakStore.peakIntensity, secondPeakStore.peakIntensity
+    )
+
+
+def test__query_cache_functions__cache_is_replaced_when_query_file_changes(queryFile):
+    otherDirectory = TemporaryDirectory(prefix="zodiaq_query_cache_test_")
+    load_query_peak_store_using_cache(queryFile, otherDirectory.name)
+    originalCacheContents = os.listdir(otherDirectory.name)
+    assert len(originalCacheContents) == 1
+    with open(queryFile, "a") as f:
+        f.write("\n")
+    load_query_peak_store_using_cache(queryFile, otherDirectory.name)
+    newCacheContents = os.listdir(otherDirectory.name)
+    assert len(newCacheContents) == 1
+    assert newCacheContents != originalCacheContents
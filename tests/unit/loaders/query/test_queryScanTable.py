@@ -0,0 +1,62 @@
+from zodiaq.loaders.query.queryScanTable import (
+    create_query_scan_table_from_mzxml,
+    map_scan_table_to_dia_mz_windows,
+    extract_metadata_from_scan_table,
+)
+from zodiaq.loaders.query import QueryLoaderStrategyMzxml
+from unittest.mock import patch
+from pyteomics import mzxml
+import numpy as np
+import pytest
+import os
+
+
+def get_parent_dir():
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def testFile():
+    return os.path.join(get_parent_dir(), "test_files", "sample_query_mzxml.mzXML")
+
+
+def test__query_scan_table__create_query_scan_table_from_mzxml(testFile):
+    scanTable = create_query_scan_table_from_mzxml(testFile)
+    assert list(scanTable["scan"]) == ["1", "119", "456"]
+    np.testing.assert_array_equal(
+        scanTable["precursorMz"], [781.400024414063, 781.400024414063, 517.27001953125]
+    )
+    np.testing.assert_array_equal(scanTable["windowWidth"], [2.0, 2.0, 2.0])
+    np.testing.assert_array_equal(scanTable["peaksCount"], [266, 660, 1578])
+    assert list(scanTable["compensationVoltage"]) == ["-30.0", "-40.0", "-70.0"]
+    assert scanTable["isCompensationVoltageNumeric"].all()
+
+
+def test__query_scan_table__outputs_match_direct_mzxml_reading(testFile):
+    scanTable = create_query_scan_table_from_mzxml(testFile)
+    expectedMetadata = {}
+    with mzxml.read(testFile) as spectra:
+        for spec in spectra:
+            expectedMetadata[spec["num"]] = {
+                "precursorMz": spec["precursorMz"][0]["precursorMz"],
+                "windowWidth": spec["precursorMz"][0]["windowWideness"],
+                "peaksCount": spec["peaksCount"],
+                "retentionTime": spec["retentionTime"],
+                "CV": spec["compensationVoltage"],
+            }
+    assert extract_metadata_from_scan_table(scanTable) == expectedMetadata
+    assert map_scan_table_to_dia_mz_windows(scanTable) == {
+        (781.400024414063, 2.0): ["1", "119"],
+        (517.27001953125, 2.0): ["456"],
+    }
+
+
+def test__query_scan_table__query_file_is_walked_once_per_loader(testFile):
+    loader = QueryLoaderStrategyMzxml(testFile)
+    with patch(
+        "zodiaq.loaders.query.queryLoaderStrategyMzxml.create_query_scan_table_from_mzxml",
+        wraps=create_query_scan_table_from_mzxml,
+    ) as createScanTable:
+        loader.map_query_scan_ids_to_dia_mz_windows()
+        loader.extract_metadata_from_query_scans()
+        assert createScanTable.call_count == 1
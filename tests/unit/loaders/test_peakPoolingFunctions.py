@@ -0,0 +1,56 @@
+from zodiaq.loaders.peakPoolingFunctions import pool_sorted_peak_runs
+import numpy as np
+
+
+def lexsort_pooled_peaks(peakMz, peakIntensity, peakTags):
+    pooledPeaks = np.column_stack([peakMz, peakIntensity, peakTags]).astype(np.float64)
+    sortIdx = np.lexsort((pooledPeaks[:, 2], pooledPeaks[:, 1], pooledPeaks[:, 0]))
+    return pooledPeaks[sortIdx]
+
+
+def create_peak_runs(runLengths, isSorted=True, seed=0):
+    rng = np.random.default_rng(seed)
+    peakMz, peakIntensity, peakTags = [], [], []
+    for tag, runLength in enumerate(runLengths):
+        mz = np.round(rng.uniform(100, 110, runLength), 1)
+        intensity = rng.integers(1, 4, runLength).astype(np.float64)
+        if isSorted:
+            sortIdx = np.lexsort((intensity, mz))
+            mz, intensity = mz[sortIdx], intensity[sortIdx]
+        peakMz.append(mz)
+        peakIntensity.append(intensity)
+        peakTags.append(np.full(runLength, tag))
+    runOffsets = np.zeros(len(runLengths) + 1, dtype=np.int64)
+    np.cumsum(runLengths, out=runOffsets[1:])
+    return (
+        np.concatenate(peakMz),
+        np.concatenate(peakIntensity),
+        np.concatenate(peakTags),
+        runOffsets,
+    )
+
+
+def test__peak_pooling_functions__pool_sorted_peak_runs__merges_sorted_runs():
+    for runLengths in [[10], [5, 0, 7], [3, 8, 2, 9, 4], [50] * 7]:
+        peakMz, peakIntensity, peakTags, runOffsets = create_peak_runs(runLengths)
+        pooledPeaks = pool_sorted_peak_runs(peakMz, peakIntensity, peakTags, runOffsets)
+        np.testing.assert_array_equal(
+            pooledPeaks, lexsort_pooled_peaks(peakMz, peakIntensity, peakTags)
+        )
+
+
+def test__peak_pooling_functions__pool_sorted_peak_runs__sorts_unsorted_runs():
+    peakMz, peakIntensity, peakTags, runOffsets = create_peak_runs(
+        [20, 30, 10], isSorted=False
+    )
+    pooledPeaks = pool_sorted_peak_runs(peakMz, peakIntensity, peakTags, runOffsets)
+    np.testing.assert_array_equal(
+        pooledPeaks, lexsort_pooled_peaks(peakMz, peakIntensity, peakTags)
+    )
+
+
+def test__peak_pooling_functions__pool_sorted_peak_runs__no_peaks_returns_empty_array():
+    pooledPeaks = pool_sorted_peak_runs(
+        np.empty(0), np.empty(0), np.empty(0), np.zeros(1, dtype=np.int64)
+    )
+    assert pooledPeaks.shape == (0, 3)
@@ -2,6 +2,7 @@ import pandas as pd
 from zodiaq.scoring.idpickerFunctions import (
     initialize__format_peptide_protein_connections,
     collapse__group_identically_connected_peptides_and_proteins,
+    group_nodes_by_identical_edges,
     separate__identify_and_label_independent_clusters,
     reduce__identify_minimum_number_of_most_connected_proteins,
     identify_high_confidence_proteins,
@@ -132,6 +133,33 @@ def test__idpicker_functions__collapse__group_identically_connected_peptides_and
     assert expectedOutput.equals(output)
 
 
+def test__idpicker_functions__group_nodes_by_identical_edges():
+    data = [
+        ("peptideB", "protein1"),
+        ("peptideA", "protein1"),
+        ("peptideB", "protein2"),
+        ("peptideA", "protein2"),
+        ("peptideC", "protein2"),
+    ]
+    df = pd.DataFrame(data, columns=["peptide", "protein"])
+    peptideGroups = group_nodes_by_identical_edges(df, isPeptideNodes=True)
+    proteinGroups = group_nodes_by_identical_edges(df, isPeptideNodes=False)
+    assert list(peptideGroups) == [
+        ("peptideA", "peptideB"),
+        ("peptideA", "peptideB"),
+        ("peptideA", "peptideB"),
+        ("peptideA", "peptideB"),
+        ("peptideC",),
+    ]
+    assert list(proteinGroups) == [
+        ("protein1",),
+        ("protein1",),
+        ("protein2",),
+        ("protein2",),
+        ("protein2",),
+    ]
+
+
 def test__idpicker_functions__separate__identify_and_label_independent_clusters():
     data = [
         ((1, 5), (7,)),
@@ -207,3 +235,26 @@ def test__idpicker_functions__identify_high_confidence_proteins():
     )
     proteins = identify_high_confidence_proteins(peptideProteinDf)
     assert expectedProteins == proteins
+
+
+def test__idpicker_functions__separate__identify_and_label_independent_clusters__long_chain_is_one_cluster():
+    numProteins = 5000
+    data = [((i,), (i,)) for i in range(numProteins)] + [
+        ((i,), (i + 1,)) for i in range(numProteins - 1)
+    ]
+    data.append(((numProteins,), (numProteins,)))
+    df = pd.DataFrame(data, columns=["peptide", "protein"])
+    clusters = separate__identify_and_label_independent_clusters(df)
+    expectedClusters = np.array([0] * (len(data) - 1) + [1])
+    np.testing.assert_array_equal(expectedClusters, clusters)
+
+
+def test__idpicker_functions__reduce__identify_minimum_number_of_most_connected_proteins__many_accepted_proteins_in_one_cluster():
+    numProteins = 5000
+    data = [((i,), (i,)) for i in range(numProteins)] + [
+        ((numProteins,), (i,)) for i in range(numProteins)
+    ]
+    df = pd.DataFrame(data, columns=["peptide", "protein"])
+    df["cluster"] = 0
+    proteins = reduce__identify_minimum_number_of_most_connected_proteins(df)
+    assert proteins == set((i,) for i in range(numProteins))
@@ -0,0 +1,65 @@
+import pandas as pd
+import numpy as np
+import pytest
+from zodiaq.scoring.proteinGroupVocabulary import ProteinGroupVocabulary
+
+
+def test__protein_group_vocabulary__from_protein_groups():
+    proteinGroups = pd.Series(
+        ["2/protein2/protein1", "1/protein1", "2/protein2/protein1", "1/protein3"]
+    )
+    vocabulary = ProteinGroupVocabulary.from_protein_groups(proteinGroups)
+    assert list(vocabulary.proteinGroups) == [
+        "2/protein2/protein1",
+        "1/protein1",
+        "1/protein3",
+    ]
+    assert list(vocabulary.proteins) == ["protein2", "protein1", "protein3"]
+    assert list(vocabulary.groupOffsets) == [0, 2, 3, 4]
+    assert list(vocabulary.groupProteinCodes) == [0, 1, 1, 2]
+
+
+def test__protein_group_vocabulary__expand_protein_groups():
+    vocabulary = ProteinGroupVocabulary.from_protein_groups(
+        pd.Series(["2/protein2/protein1", "1/protein1", "1/protein3"])
+    )
+    rowIdx, proteinCodes = vocabulary.expand_protein_groups(
+        pd.Series(["1/protein3", "2/protein2/protein1", "1/protein1"])
+    )
+    assert list(rowIdx) == [0, 1, 1, 2]
+    assert list(vocabulary.proteins[proteinCodes]) == [
+        "protein3",
+        "protein2",
+        "protein1",
+        "protein1",
+    ]
+
+
+def test__protein_group_vocabulary__encode_protein_groups__missing_group_raises_error():
+    vocabulary = ProteinGroupVocabulary.from_protein_groups(pd.Series(["1/protein1"]))
+    with pytest.raises(ValueError):
+        vocabulary.encode_protein_groups(pd.Series(["1/protein2"]))
+
+
+def test__protein_group_vocabulary__add_protein_groups():
+    vocabulary = ProteinGroupVocabulary.from_protein_groups(
+        pd.Series(["2/protein2/protein1", "1/protein3"])
+    )
+    extendedVocabulary = vocabulary.add_protein_groups(
+        pd.Series(["1/protein3", "2/protein1/protein3", "2/protein4/protein1"])
+    )
+    assert list(extendedVocabulary.proteinGroups) == [
+        "2/protein2/protein1",
+        "1/protein3",
+        "2/protein1/protein3",
+        "2/protein4/protein1",
+    ]
+    assert list(extendedVocabulary.proteins) == [
+        "protein2",
+        "protein1",
+        "protein3",
+        "protein4",
+    ]
+    assert list(extendedVocabulary.groupOffsets) == [0, 2, 3, 5, 7]
+    assert list(extendedVocabulary.groupProteinCodes) == [0, 1, 2, 1, 2, 3, 1]
+    assert len(vocabulary.proteinGroups) == 2
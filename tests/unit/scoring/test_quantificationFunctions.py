@@ -11,6 +11,7 @@ from zodiaq.scoring.quantificationFunctions import (
     maxlfq,
     ion_count_sum,
 )
+from zodiaq.scoring.proteinGroupVocabulary import ProteinGroupVocabulary
 
 
 @pytest.fixture
@@ -50,6 +51,30 @@ def test__quantification_functions__calculate_ion_count_for_each_protein_in_prot
     assert expectedOutputDf.equals(outputDf)
 
 
+def test__quantification_functions__calculate_ion_count_for_each_protein_in_protein_fdr_df__uses_peptide_vocabulary():
+    vocabulary = ProteinGroupVocabulary.from_protein_groups(
+        pd.Series(["1/protein1", "2/protein3/protein2", "1/protein2"])
+    )
+    inputData = [
+        ["1/protein1", 100.0],
+        ["1/protein1", 200.0],
+        ["1/protein1", 300.0],
+        ["2/protein2/protein3", 400.0],
+        ["2/protein2/protein3", 500.0],
+    ]
+    inputDf = pd.DataFrame(inputData, columns=["leadingProtein", "ionCount"])
+    expectedOutputData = [
+        ["protein1", 200.0],
+        ["protein2", 450.0],
+        ["protein3", 450.0],
+    ]
+    expectedOutputDf = pd.DataFrame(expectedOutputData, columns=["protein", "ionCount"])
+    outputDf = calculate_ion_count_for_each_protein_in_protein_fdr_df(
+        inputDf, vocabulary
+    )
+    assert expectedOutputDf.equals(outputDf)
+
+
 def test__quantification_functions__compile_ion_count_comparison_across_runs_df():
     columnName = "value"
     inputDf1 = pd.DataFrame(
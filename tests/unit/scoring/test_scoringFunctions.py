@@ -5,7 +5,6 @@ import numpy as np
 from math import isclose
 
 from zodiaq.scoring.scoringFunctions import (
-    score_library_to_query_matches,
     calculate_cosine_similarity_score,
     calculate_macc_score,
     determine_index_of_fdr_cutoff,
@@ -39,46 +38,15 @@ def test__score_functions__calculate_macc_score(vectorA, vectorB):
     assert score == expectedScore
 
 
-def test__score_functions__score_library_to_query_matches(vectorA, vectorB):
-    libraryIdx, queryIdx, ppmDiff = 1, 0, 0
-    matchesDf = pd.DataFrame(
-        index=vectorA.index,
-        columns=[
-            "libraryIdx",
-            "libraryIntensity",
-            "queryIdx",
-            "queryIntensity",
-        ],
-    )
-    matchesDf["libraryIdx"] = [libraryIdx for i in vectorA.index]
-    matchesDf["libraryIntensity"] = vectorA
-    matchesDf["queryIdx"] = [queryIdx for i in vectorA.index]
-    matchesDf["queryIntensity"] = vectorB
-    cosineScore = calculate_cosine_similarity_score(np.sqrt(vectorA), np.sqrt(vectorB))
-    expectedOutputDf = pd.DataFrame(
-        data=[[libraryIdx, queryIdx, cosineScore]],
-        columns=["libraryIdx", "queryIdx", "cosineScore"],
-    )
-    outputDf = score_library_to_query_matches(matchesDf)
-    assert expectedOutputDf.equals(outputDf)
-
-    lowScoreMatchesDf = matchesDf.copy()
-    lowScoreMatchesDf["libraryIdx"] = [libraryIdx - 1 for i in vectorA.index]
-    reverseVectorA = pd.Series(list(vectorA)[::-1])
-    lowScoreMatchesDf["libraryIntensity"] = reverseVectorA
-    lowCosineScore = calculate_cosine_similarity_score(
-        np.sqrt(reverseVectorA), np.sqrt(vectorB)
-    )
-    unsortedMatchesDf = pd.concat([lowScoreMatchesDf, matchesDf])
-    expectedOutputDf = pd.DataFrame(
-        data=[
-            [libraryIdx, queryIdx, cosineScore],
-            [libraryIdx - 1, queryIdx, lowCosineScore],
-        ],
-        columns=["libraryIdx", "queryIdx", "cosineScore"],
-    )
-    sortedOutputDf = score_library_to_query_matches(unsortedMatchesDf)
-    assert expectedOutputDf.equals(sortedOutputDf)
+def test__score_functions__calculate_macc_score__array_input_matches_scalar_input():
+    numMatchedPeaks = pd.Series([3, 7, 10, 1])
+    cosineScores = pd.Series([0.9, 0.95123, 0.999, 0.5])
+    scores = calculate_macc_score(numMatchedPeaks, cosineScores)
+    expectedScores = [
+        calculate_macc_score(int(numMatched), float(cosineScore))
+        for numMatched, cosineScore in zip(numMatchedPeaks, cosineScores)
+    ]
+    assert list(scores) == expectedScores
 
 
 def test__score_functions__calculate_fdr_rates_of_decoy_array():
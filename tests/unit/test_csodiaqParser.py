@@ -13,6 +13,7 @@ from zodiaq.zodiaqParser import (
     _IdentificationOutputDirectory,
     _ScoringOutputDirectory,
 )
+from zodiaq.utils import is_parquet_supported
 from unittest.mock import Mock
 from tempfile import TemporaryDirectory, NamedTemporaryFile
 
@@ -322,11 +323,25 @@ def test__zodiaq_parser__identification_output_directory_parsing_class__fails_wh
         dir=testDir.name,
         delete=False,
     )
-    errorOutput = "The -i or --input argument directory must contain .csv files that are outputs from the identification workflow in zoDIAq."
+    errorOutput = "The -i or --input argument directory must contain .csv or .parquet files that are outputs from the identification workflow in zoDIAq."
     with pytest.raises(argparse.ArgumentTypeError, match=re.escape(errorOutput)):
         identificationOutputDirectory(testDir.name)
 
 
+def test__zodiaq_parser__identification_output_directory_parsing_class__succeeds_when_directory_has_parquet_outputs(
+    identificationOutputDirectory,
+):
+    testDir = TemporaryDirectory(prefix="zodiaq_test_directory_")
+    testFile = NamedTemporaryFile(
+        prefix="zoDIAq-file_1",
+        suffix="fullOutput.parquet",
+        dir=testDir.name,
+        delete=False,
+    )
+    outputDict = identificationOutputDirectory(testDir.name)
+    assert outputDict["idFiles"] == [testFile.name.split("/")[-1]]
+
+
 @pytest.fixture
 def scoringOutputDirectory():
     return _ScoringOutputDirectory()
@@ -443,7 +458,7 @@ def test__zodiaq_parser__scoring_output_directory_parsing_class__fails_when_dire
     testFile2 = NamedTemporaryFile(
         prefix="zodiaq_test_file2_", suffix="FDR.csv", dir=testDir.name, delete=False
     )
-    errorOutput = "The -i or --input argument directory must contain .csv files that are outputs from the scoring workflow in zoDIAq (peptide or protein score outputs required)."
+    errorOutput = "The -i or --input argument directory must contain .csv or .parquet files that are outputs from the scoring workflow in zoDIAq (peptide or protein score outputs required)."
     with pytest.raises(argparse.ArgumentTypeError, match=re.escape(errorOutput)):
         scoringOutputDirectory(testDir.name)
 
@@ -622,6 +637,54 @@ def test__zodiaq_parser__set_args_from_command_line_input__id_succeeds_with_hist
     assert args["histogram"]
 
 
+def test__zodiaq_parser__set_args_from_command_line_input__id_succeeds_with_stream_correction_flag(
+    parser, idArgs
+):
+    args = vars(parser.parse_args(idArgs))
+    assert not args["streamCorrection"]
+    idArgs += ["-sc"]
+    args = vars(parser.parse_args(idArgs))
+    assert args["streamCorrection"]
+
+
+def test__zodiaq_parser__set_args_from_command_line_input__id_succeeds_with_max_memory(
+    parser, idArgs
+):
+    args = vars(parser.parse_args(idArgs))
+    assert not args["maxMemory"]
+    idArgs += ["-mm", "16"]
+    args = vars(parser.parse_args(idArgs))
+    assert args["maxMemory"] == 16
+
+
+def test__zodiaq_parser__set_args_from_command_line_input__id_succeeds_with_output_format(
+    parser, idArgs
+):
+    args = vars(parser.parse_args(idArgs))
+    assert args["outputFormat"] == "csv"
+    idArgs += ["-of", "parquet"]
+    args = vars(parser.parse_args(idArgs))
+    assert args["outputFormat"] == "parquet"
+
+
+def test__zodiaq_parser__set_args_from_command_line_input__id_fails_with_unknown_output_format(
+    parser, idArgs
+):
+    idArgs += ["-of", "xlsx"]
+    errorOutput = "argument -of/--outputFormat: invalid choice: 'xlsx'"
+    with pytest.raises(argparse.ArgumentTypeError, match=re.escape(errorOutput)):
+        args = vars(parser.parse_args(idArgs))
+
+
+def test__zodiaq_parser__set_args_from_command_line_input__id_fails_when_max_memory_below_minimum(
+    parser, idArgs
+):
+    idArgs += ["-mm", "0.01"]
+    errorOutput = "argument -mm/--maxMemory: The maxMemory argument must be a float greater than or equal to 0.1."
+    with pytest.raises(argparse.ArgumentTypeError, match=re.escape(errorOutput)):
+        args = vars(parser.parse_args(idArgs))
+
+
 def test__zodiaq_parser__set_args_from_command_line_input__id_fails_with_histogram_argument_added(
     parser, idArgs
 ):
@@ -648,6 +711,115 @@ def test__zodiaq_parser__set_args_from_command_line_input__id_fails_with_cancel_
         args = vars(parser.parse_args(idArgs))
 
 
+def test__zodiaq_parser__set_args_from_command_line_input__id_succeeds_with_library_cache_flag(
+    parser, idArgs
+):
+    args = vars(parser.parse_args(idArgs))
+    assert not args["libraryCache"]
+    assert args["cacheDirectory"] is None
+    idArgs += ["-lc"]
+    args = vars(parser.parse_args(idArgs))
+    assert args["libraryCache"]
+
+
+def test__zodiaq_parser__set_args_from_command_line_input__id_succeeds_with_query_cache_flag(
+    parser, idArgs
+):
+    args = vars(parser.parse_args(idArgs))
+    assert not args["queryCache"]
+    idArgs += ["-qc"]
+    args = vars(parser.parse_args(idArgs))
+    assert args["queryCache"]
+
+
+def test__zodiaq_parser__set_args_from_command_line_input__id_succeeds_with_cache_directory(
+    parser, idArgs
+):
+    cacheDirectory = TemporaryDirectory(prefix="zodiaq_cache_test_directory_")
+    idArgs += ["-lc", "-cd", cacheDirectory.name]
+    args = vars(parser.parse_args(idArgs))
+    assert args["cacheDirectory"] == cacheDirectory.name
+
+
+def test__zodiaq_parser__set_args_from_command_line_input__id_fails_when_cache_directory_does_not_exist(
+    parser, idArgs
+):
+    idArgs += ["-lc", "-cd", "this/path/does/not/exist"]
+    errorOutput = "The -cd or --cacheDirectory argument must be an existing directory."
+    with pytest.raises(argparse.ArgumentTypeError, match=re.escape(errorOutput)):
+        args = vars(parser.parse_args(idArgs))
+
+
+def test__zodiaq_parser__check_for_conflicting_args__cache_directory_without_cache_flag_warns(
+    parser, idArgs
+):
+    cacheDirectory = TemporaryDirectory(prefix="zodiaq_cache_test_directory_")
+    idArgs += ["-cd", cacheDirectory.name]
+    args = vars(parser.parse_args(idArgs))
+    with pytest.warns(UserWarning, match="cacheDirectory argument will only have"):
+        check_for_conflicting_args(args)
+
+
+def test__zodiaq_parser__check_for_conflicting_args__cache_directory_with_query_cache_flag_does_not_warn(
+    parser, idArgs
+):
+    cacheDirectory = TemporaryDirectory(prefix="zodiaq_cache_test_directory_")
+    idArgs += ["-qc", "-cd", cacheDirectory.name]
+    args = vars(parser.parse_args(idArgs))
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        check_for_conflicting_args(args)
+
+
+def test__zodiaq_parser__set_args_from_command_line_input__id_succeeds_with_workers(
+    parser, idArgs
+):
+    args = vars(parser.parse_args(idArgs))
+    assert args["workers"] == 1
+    idArgs += ["-wk", "4"]
+    args = vars(parser.parse_args(idArgs))
+    assert args["workers"] == 4
+
+
+def test__zodiaq_parser__set_args_from_command_line_input__id_fails_when_workers_less_than_1(
+    parser, idArgs
+):
+    idArgs += ["-wk", "0"]
+    errorOutput = "The workers argument must be an integer greater than or equal to 1."
+    with pytest.raises(argparse.ArgumentTypeError, match=re.escape(errorOutput)):
+        args = vars(parser.parse_args(idArgs))
+
+
+def test__zodiaq_parser__set_args_from_command_line_input__id_succeeds_with_file_workers(
+    parser, idArgs
+):
+    args = vars(parser.parse_args(idArgs))
+    assert args["fileWorkers"] == 1
+    idArgs += ["-fw", "4"]
+    args = vars(parser.parse_args(idArgs))
+    assert args["fileWorkers"] == 4
+
+
+def test__zodiaq_parser__set_args_from_command_line_input__id_fails_when_file_workers_less_than_1(
+    parser, idArgs
+):
+    idArgs += ["-fw", "0"]
+    errorOutput = (
+        "The fileWorkers argument must be an integer greater than or equal to 1."
+    )
+    with pytest.raises(argparse.ArgumentTypeError, match=re.escape(errorOutput)):
+        args = vars(parser.parse_args(idArgs))
+
+
+def test__zodiaq_parser__check_for_conflicting_args__workers_with_file_workers_warns(
+    parser, idArgs
+):
+    idArgs += ["-wk", "2", "-fw", "2"]
+    args = vars(parser.parse_args(idArgs))
+    with pytest.warns(UserWarning, match="workers argument will only have"):
+        check_for_conflicting_args(args)
+
+
 @pytest.fixture
 def scoreFiles():
     class fileObj:
@@ -721,6 +893,27 @@ def test__zodiaq_parser__set_args_from_command_line_input__score_fails_with_othe
         args = vars(parser.parse_args(scoreArgs))
 
 
+def test__zodiaq_parser__set_args_from_command_line_input__score_succeeds_with_file_workers(
+    parser, scoreArgs
+):
+    args = vars(parser.parse_args(scoreArgs))
+    assert args["fileWorkers"] == 1
+    scoreArgs += ["-fw", "2"]
+    args = vars(parser.parse_args(scoreArgs))
+    assert args["fileWorkers"] == 2
+
+
+def test__zodiaq_parser__set_args_from_command_line_input__score_fails_when_file_workers_less_than_1(
+    parser, scoreArgs
+):
+    scoreArgs += ["-fw", "0"]
+    errorOutput = (
+        "The fileWorkers argument must be an integer greater than or equal to 1."
+    )
+    with pytest.raises(argparse.ArgumentTypeError, match=re.escape(errorOutput)):
+        args = vars(parser.parse_args(scoreArgs))
+
+
 def test__zodiaq_parser__set_args_from_command_line_input__score_suceeds_with_maxlfq_protein_quant_method(
     parser, scoreArgs
 ):
@@ -910,6 +1103,15 @@ def test__zodiaq_parser__set_args_from_command_line_input__targeted_reanalysis_s
     assert args["heavyIsotope"]
 
 
+def test__zodiaq_parser__set_args_from_command_line_input__score_and_targeted_reanalysis_succeed_with_output_format(
+    parser, scoreArgs, reanalysisArgs
+):
+    scoreArgs += ["-of", "parquet"]
+    reanalysisArgs += ["-of", "parquet"]
+    assert vars(parser.parse_args(scoreArgs))["outputFormat"] == "parquet"
+    assert vars(parser.parse_args(reanalysisArgs))["outputFormat"] == "parquet"
+
+
 def test__zodiaq_parser__set_args_from_command_line_input__targeted_reanalysis_fails_with_heavy_isotope_argument_added(
     parser, reanalysisArgs
 ):
@@ -965,6 +1167,34 @@ def test__zodiaq_parser__check_for_conflicting_args__presence_of_histogram_tag_f
         check_for_conflicting_args(args)
 
 
+def test__zodiaq_parser__check_for_conflicting_args__presence_of_stream_correction_tag_fails_if_no_correction_tag_set(
+    parser, idArgs
+):
+    idArgs += ["-nc", "-sc"]
+    errorOutput = "The streamCorrection flag is invalidated by the noCorrection flag. Please inspect your input and remove one of the tags."
+    with pytest.raises(argparse.ArgumentTypeError, match=re.escape(errorOutput)):
+        args = vars(parser.parse_args(idArgs))
+        check_for_conflicting_args(args)
+
+
+def test__zodiaq_parser__set_args_from_command_line_input__warmup_succeeds(parser):
+    args = vars(parser.parse_args(["warmup"]))
+    assert args["command"] == "warmup"
+    check_for_conflicting_args(args)
+
+
+def test__zodiaq_parser__check_for_conflicting_args__parquet_output_format_fails_without_pyarrow(
+    parser, idArgs
+):
+    if is_parquet_supported():
+        pytest.skip("pyarrow is installed")
+    idArgs += ["-of", "parquet"]
+    errorOutput = "The parquet output format requires the pyarrow package. Please install it (pip install pyarrow) or use the csv output format."
+    with pytest.raises(argparse.ArgumentTypeError, match=re.escape(errorOutput)):
+        args = vars(parser.parse_args(idArgs))
+        check_for_conflicting_args(args)
+
+
 def test__zodiaq_parser__check_for_conflicting_args__presence_of_protein_arg_fails_if_no_protein_fdr_files_present(
     parser,
 ):
@@ -0,0 +1,47 @@
+import subprocess
+import sys
+import json
+
+startupTimeBudgetInSeconds = 2.0
+
+
+def find_modules_imported_by_subcommand(subcommandModules):
+    """
+    Imports the command line entry point, then the workflow modules a subcommand imports when it
+        runs, in a fresh interpreter. Returns the import time of the entry point and the top-level
+        packages loaded.
+    """
+    code = f"""
+import sys, json, time
+startTime = time.perf_counter()
+import zodiaq.zodiaq
+startupTime = time.perf_counter() - startTime
+for module in {subcommandModules!r}:
+    __import__(module)
+print(json.dumps({{"startupTime": startupTime, "modules": sorted(set(name.split(".")[0] for name in sys.modules))}}))
+"""
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def test__zodiaq_startup__entry_point_imports_no_workflow_dependencies():
+    result = find_modules_imported_by_subcommand([])
+    for package in ["PyQt5", "matplotlib", "sklearn", "pyteomics", "numba"]:
+        assert package not in result["modules"]
+    assert result["startupTime"] < startupTimeBudgetInSeconds
+
+
+def test__zodiaq_startup__scoring_imports_no_gui_plotting_or_identification_dependencies():
+    result = find_modules_imported_by_subcommand(
+        ["zodiaq.scoring", "zodiaq.targetedReanalysis"]
+    )
+    for package in ["PyQt5", "matplotlib", "sklearn", "pyteomics", "numba"]:
+        assert package not in result["modules"]
+
+
+def test__zodiaq_startup__identification_imports_no_gui_or_plotting_dependencies():
+    result = find_modules_imported_by_subcommand(["zodiaq.identification"])
+    for package in ["PyQt5", "matplotlib", "sklearn"]:
+        assert package not in result["modules"]
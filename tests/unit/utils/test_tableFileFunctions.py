@@ -0,0 +1,146 @@
+from zodiaq.utils import (
+    write_table_file,
+    write_table_file_in_chunks,
+    read_table_file,
+)
+from zodiaq.utils.tableFileFunctions import prepare_dataframe_for_parquet
+from tempfile import TemporaryDirectory
+import pandas as pd
+import numpy as np
+import os
+import pytest
+
+
+@pytest.fixture
+def outputDf():
+    return pd.DataFrame(
+        {
+            "peptide": ["PEPTIDE", "PEPTIDER", "PEPTIDE"],
+            "protein": ["1/prot1", "2/prot1/prot2", "1/prot1"],
+            "cosine": [0.9, 0.8, 0.7],
+            "retentionTime": [1.5, "", 2.5],
+            "CompensationVoltage": ["", "", ""],
+            "scan": [1, 2, 3],
+        }
+    )
+
+
+def test__table_file_functions__prepare_dataframe_for_parquet__mixed_numeric_column_becomes_float(
+    outputDf,
+):
+    df = prepare_dataframe_for_parquet(outputDf)
+    assert df["retentionTime"].dtype == np.float64
+    np.testing.assert_array_equal(df["retentionTime"], [1.5, np.nan, 2.5])
+    assert df["CompensationVoltage"].isna().all()
+    assert outputDf["retentionTime"].dtype == object
+
+
+def test__table_file_functions__prepare_dataframe_for_parquet__mixed_text_column_becomes_text():
+    df = pd.DataFrame({"retentionTime": [1.5, "-PT1S", ""]})
+    df = prepare_dataframe_for_parquet(df)
+    assert list(df["retentionTime"][:2]) == ["1.5", "-PT1S"]
+    assert pd.isna(df["retentionTime"][2])
+
+
+def test__table_file_functions__write_table_file__csv_round_trip(outputDf):
+    testDir = TemporaryDirectory(prefix="zodiaq_table_test_directory_")
+    fileHeader = os.path.join(testDir.name, "output")
+    filePath = write_table_file(outputDf, fileHeader)
+    assert filePath == fileHeader + ".csv"
+    df = read_table_file(filePath)
+    expectedDf = pd.read_csv(filePath)
+    pd.testing.assert_frame_equal(df, expectedDf)
+    assert list(df["peptide"]) == list(outputDf["peptide"])
+
+
+def test__table_file_functions__write_table_file_in_chunks__csv_matches_writing_whole_table(
+    outputDf,
+):
+    testDir = TemporaryDirectory(prefix="zodiaq_table_test_directory_")
+    wholeFilePath = write_table_file(outputDf, os.path.join(testDir.name, "whole"))
+    chunkedFilePath = write_table_file_in_chunks(
+        (outputDf.iloc[i : i + 2] for i in range(0, len(outputDf), 2)),
+        os.path.join(testDir.name, "chunked"),
+    )
+    with open(wholeFilePath) as wholeFile, open(chunkedFilePath) as chunkedFile:
+        assert wholeFile.read() == chunkedFile.read()
+
+
+def test__table_file_functions__write_table_file__parquet_matches_csv_round_trip(
+    outputDf,
+):
+    pytest.importorskip("pyarrow")
+    testDir = TemporaryDirectory(prefix="zodiaq_table_test_directory_")
+    csvDf = read_table_file(
+        write_table_file(outputDf, os.path.join(testDir.name, "output"))
+    )
+    parquetDf = read_table_file(
+        write_table_file(outputDf, os.path.join(testDir.name, "output"), "parquet")
+    )
+    chunkedDf = read_table_file(
+        write_table_file_in_chunks(
+            (outputDf.iloc[i : i + 2] for i in range(0, len(outputDf), 2)),
+            os.path.join(testDir.name, "chunked"),
+            "parquet",
+            outputDf,
+        )
+    )
+    pd.testing.assert_frame_equal(parquetDf, csvDf, check_dtype=False)
+    pd.testing.assert_frame_equal(chunkedDf, parquetDf)
+
+
+@pytest.mark.parametrize(
+    "retentionTimes",
+    [
+        [1.5, 2.5, "-PT1S", ""],
+        ["", "", 1.5, 2.5],
+        [1, 2, 1.5, ""],
+    ],
+)
+def test__table_file_functions__write_table_file_in_chunks__parquet_chunks_take_types_of_whole_table(
+    retentionTimes,
+):
+    pytest.importorskip("pyarrow")
+    testDir = TemporaryDirectory(prefix="zodiaq_table_test_directory_")
+    outputDf = pd.DataFrame(
+        {
+            "peptide": ["PEPTIDE", "PEPTIDER", "PEPTIDE", "PEPTIDES"],
+            "retentionTime": retentionTimes,
+            "scan": [1, 2, 3, 4],
+        }
+    )
+    parquetDf = read_table_file(
+        write_table_file(outputDf, os.path.join(testDir.name, "whole"), "parquet")
+    )
+    chunkedDf = read_table_file(
+        write_table_file_in_chunks(
+            (outputDf.iloc[i : i + 2] for i in range(0, len(outputDf), 2)),
+            os.path.join(testDir.name, "chunked"),
+            "parquet",
+            outputDf,
+        )
+    )
+    pd.testing.assert_frame_equal(chunkedDf, parquetDf)
+
+
+def test__table_file_functions__write_table_file_in_chunks__parquet_requires_schema(
+    outputDf,
+):
+    pytest.importorskip("pyarrow")
+    testDir = TemporaryDirectory(prefix="zodiaq_table_test_directory_")
+    with pytest.raises(ValueError, match="schemaDf"):
+        write_table_file_in_chunks(
+            [outputDf], os.path.join(testDir.name, "chunked"), "parquet"
+        )
+
+
+def test__table_file_functions__prepare_dataframe_for_parquet__text_in_numeric_schema_column_raises_error(
+    outputDf,
+):
+    pytest.importorskip("pyarrow")
+    from zodiaq.utils.tableFileFunctions import create_parquet_schema
+
+    schema = create_parquet_schema(outputDf)
+    df = outputDf.assign(retentionTime=["-PT1S", "", 2.5])
+    with pytest.raises(ValueError, match="retentionTime"):
+        prepare_dataframe_for_parquet(df, schema)
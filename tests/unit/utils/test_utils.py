@@ -150,3 +150,25 @@ def test__utils__confirm_proteins_in_list_are_in_appropriate_format__blank_value
         "",
     ]
     assert not confirm_proteins_in_list_are_in_appropriate_format(proteinList)
+
+
+@pytest.mark.parametrize(
+    "proteinList",
+    [
+        ["2/protein1/protein2", "10/" + "/".join(f"p{i}" for i in range(10))],
+        ["2/protein1/protein2", "extraStuff2/protein1/protein2"],
+        ["2/protein1/protein2", "2/protein1/protein2/"],
+        ["2/protein1/protein2", "gibberish"],
+        ["2/protein1/protein2", "1/protein1/protein2"],
+        ["2/protein1/protein2", ""],
+    ],
+)
+def test__utils__confirm_proteins_in_list_are_in_appropriate_format__vocabulary_matches_list(
+    proteinList,
+):
+    from zodiaq.scoring import ProteinGroupVocabulary
+
+    vocabulary = ProteinGroupVocabulary.from_protein_groups(pd.Series(proteinList))
+    assert confirm_proteins_in_list_are_in_appropriate_format(
+        proteinList, vocabulary
+    ) == confirm_proteins_in_list_are_in_appropriate_format(proteinList)